@@ -0,0 +1,66 @@
+"""order status event log
+
+Revision ID: b5d17e3a9c42
+Revises: a9d4f2b61c38
+Create Date: 2026-10-18 19:02:41.318526
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d17e3a9c42'
+down_revision: Union[str, Sequence[str], None] = 'a9d4f2b61c38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the type already exists for placeorder.order_status
+order_status = postgresql.ENUM(
+    'PLACED', 'CONFIRMED', 'SHIPPED', 'DELIVERED', 'CANCELLED',
+    name='orderstatusenum', create_type=False
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # placeorder and its enum type come from create_all , which also builds this table on a fresh database
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('placeorder') or inspector.has_table('order_events'):
+        return
+
+    op.create_table('order_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('from_status', order_status, nullable=True),
+    sa.Column('to_status', order_status, nullable=False),
+    sa.Column('actor', sa.String(length=32), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['placeorder.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_events_id'), 'order_events', ['id'], unique=False)
+    op.create_index('ix_order_events_order', 'order_events', ['order_id', 'id'], unique=False)
+
+    # orders placed before the log existed get their creation entry and , when they moved on ,
+    # one entry to their current status , so the last to_status of every order is its status
+    op.execute(
+        "INSERT INTO order_events (order_id, from_status, to_status, actor, created_at) "
+        "SELECT id, NULL, 'PLACED', 'vendor:' || vendor_id, created_at FROM placeorder ORDER BY id"
+    )
+    op.execute(
+        "INSERT INTO order_events (order_id, from_status, to_status, actor, created_at) "
+        "SELECT id, 'PLACED', order_status, NULL, updated_at FROM placeorder "
+        "WHERE order_status <> 'PLACED' ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_events_order', table_name='order_events', if_exists=True)
+    op.drop_index(op.f('ix_order_events_id'), table_name='order_events', if_exists=True)
+    op.drop_table('order_events', if_exists=True)
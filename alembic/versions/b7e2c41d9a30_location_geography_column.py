@@ -0,0 +1,75 @@
+"""location geography column
+
+Revision ID: b7e2c41d9a30
+Revises: 5e585c5316c2
+Create Date: 2026-10-18 11:02:13.410382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import geoalchemy2
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c41d9a30'
+down_revision: Union[str, Sequence[str], None] = '5e585c5316c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Store the geography cast once per row instead of once per searched row"""
+    op.add_column('locations', sa.Column(
+        'location_geog',
+        geoalchemy2.types.Geography(
+            geometry_type='POINT',
+            srid=4326,
+            spatial_index=False
+        ),
+        nullable=True
+    ))
+
+    # Existing trigger now fills both columns
+    op.execute('''
+        CREATE OR REPLACE FUNCTION update_location_geometry()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.location = ST_SetSRID(ST_MakePoint(NEW.longitude, NEW.latitude), 4326);
+            NEW.location_geog = NEW.location::geography;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    ''')
+
+    # Backfill existing records
+    op.execute('''
+        UPDATE locations
+        SET location_geog = ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography
+        WHERE longitude IS NOT NULL AND latitude IS NOT NULL;
+    ''')
+
+    # Covering GIST index , factory_id rides along for the join to factories
+    op.execute('''
+        CREATE INDEX IF NOT EXISTS idx_locations_location_geog
+        ON locations USING GIST (location_geog) INCLUDE (factory_id);
+    ''')
+    op.execute('ANALYZE locations;')
+
+
+def downgrade() -> None:
+    """Back to the geometry only trigger"""
+    op.execute('DROP INDEX IF EXISTS idx_locations_location_geog;')
+
+    op.execute('''
+        CREATE OR REPLACE FUNCTION update_location_geometry()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.location = ST_SetSRID(ST_MakePoint(NEW.longitude, NEW.latitude), 4326);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    ''')
+
+    op.drop_column('locations', 'location_geog')
@@ -0,0 +1,35 @@
+"""catalog version counters
+
+Revision ID: c7e3a5f19d28
+Revises: b5d17e3a9c42
+Create Date: 2026-10-18 19:47:12.604183
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e3a5f19d28'
+down_revision: Union[str, Sequence[str], None] = 'b5d17e3a9c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # no backfill , an entity without a row is at version 0
+    op.create_table('catalog_versions',
+    sa.Column('scope', sa.String(length=16), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'entity_id'),
+    if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_versions', if_exists=True)
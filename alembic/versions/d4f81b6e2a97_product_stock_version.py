@@ -0,0 +1,28 @@
+"""product stock version
+
+Revision ID: d4f81b6e2a97
+Revises: c7e3a5f19d28
+Create Date: 2026-10-18 21:05:38.219461
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f81b6e2a97'
+down_revision: Union[str, Sequence[str], None] = 'c7e3a5f19d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('stock_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'stock_version')
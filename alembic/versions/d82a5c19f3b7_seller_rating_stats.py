@@ -0,0 +1,137 @@
+"""seller rating stats
+
+Revision ID: d82a5c19f3b7
+Revises: c41f8a27e6d5
+Create Date: 2026-10-18 15:12:07.503921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd82a5c19f3b7'
+down_revision: Union[str, Sequence[str], None] = 'c41f8a27e6d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+STAR_VALUE = """
+    CASE {column}
+        WHEN 'ONE_STAR' THEN 1
+        WHEN 'TWO_STAR' THEN 2
+        WHEN 'THREE_STAR' THEN 3
+        WHEN 'FOUR_STAR' THEN 4
+        WHEN 'FIVE_STAR' THEN 5
+    END
+"""
+
+
+def upgrade() -> None:
+    """Keep per seller rating count , sum and histogram next to the ratings"""
+    # ratings was only ever created by create_all
+    if not sa.inspect(op.get_bind()).has_table('ratings'):
+        op.create_table('ratings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('vendor_id', sa.Integer(), nullable=False),
+        sa.Column('seller_id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Enum('ONE_STAR', 'TWO_STAR', 'THREE_STAR', 'FOUR_STAR', 'FIVE_STAR', name='ratingenum'), nullable=False),
+        sa.Column('review_text', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['seller_id'], ['sellers.id'], ),
+        sa.ForeignKeyConstraint(['vendor_id'], ['vendoruser.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_ratings_id'), 'ratings', ['id'], unique=False)
+
+    op.create_table('seller_rating_stats',
+    sa.Column('seller_id', sa.Integer(), nullable=False),
+    sa.Column('rating_count', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('star_1', sa.Integer(), nullable=False),
+    sa.Column('star_2', sa.Integer(), nullable=False),
+    sa.Column('star_3', sa.Integer(), nullable=False),
+    sa.Column('star_4', sa.Integer(), nullable=False),
+    sa.Column('star_5', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['seller_id'], ['sellers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('seller_id')
+    )
+
+    # one trigger for all three operations , an update is a delete of OLD plus an insert of NEW
+    op.execute(f'''
+        CREATE OR REPLACE FUNCTION update_seller_rating_stats()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            stars integer;
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                stars := {STAR_VALUE.format(column="OLD.rating")};
+                UPDATE seller_rating_stats SET
+                    rating_count = rating_count - 1,
+                    rating_sum = rating_sum - stars,
+                    star_1 = star_1 - (stars = 1)::int,
+                    star_2 = star_2 - (stars = 2)::int,
+                    star_3 = star_3 - (stars = 3)::int,
+                    star_4 = star_4 - (stars = 4)::int,
+                    star_5 = star_5 - (stars = 5)::int
+                WHERE seller_id = OLD.seller_id;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                stars := {STAR_VALUE.format(column="NEW.rating")};
+                INSERT INTO seller_rating_stats AS s
+                    (seller_id, rating_count, rating_sum, star_1, star_2, star_3, star_4, star_5)
+                VALUES (
+                    NEW.seller_id, 1, stars,
+                    (stars = 1)::int, (stars = 2)::int, (stars = 3)::int, (stars = 4)::int, (stars = 5)::int
+                )
+                ON CONFLICT (seller_id) DO UPDATE SET
+                    rating_count = s.rating_count + 1,
+                    rating_sum = s.rating_sum + stars,
+                    star_1 = s.star_1 + (stars = 1)::int,
+                    star_2 = s.star_2 + (stars = 2)::int,
+                    star_3 = s.star_3 + (stars = 3)::int,
+                    star_4 = s.star_4 + (stars = 4)::int,
+                    star_5 = s.star_5 + (stars = 5)::int;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    ''')
+
+    op.execute('''
+        CREATE TRIGGER trigger_update_seller_rating_stats
+            AFTER INSERT OR UPDATE OF rating, seller_id OR DELETE ON ratings
+            FOR EACH ROW
+            EXECUTE FUNCTION update_seller_rating_stats();
+    ''')
+
+    # backfill from the existing ratings
+    op.execute(f'''
+        INSERT INTO seller_rating_stats
+            (seller_id, rating_count, rating_sum, star_1, star_2, star_3, star_4, star_5)
+        SELECT
+            seller_id,
+            count(*),
+            sum(stars),
+            count(*) FILTER (WHERE stars = 1),
+            count(*) FILTER (WHERE stars = 2),
+            count(*) FILTER (WHERE stars = 3),
+            count(*) FILTER (WHERE stars = 4),
+            count(*) FILTER (WHERE stars = 5)
+        FROM (
+            SELECT seller_id, {STAR_VALUE.format(column="rating")} AS stars FROM ratings
+        ) AS r
+        GROUP BY seller_id;
+    ''')
+
+
+def downgrade() -> None:
+    """Remove trigger , function and stats table"""
+    op.execute('DROP TRIGGER IF EXISTS trigger_update_seller_rating_stats ON ratings;')
+    op.execute('DROP FUNCTION IF EXISTS update_seller_rating_stats();')
+    op.drop_table('seller_rating_stats')
@@ -0,0 +1,38 @@
+"""placeorder vendor created index
+
+Revision ID: e5b09d7c2a14
+Revises: d82a5c19f3b7
+Create Date: 2026-10-18 16:25:41.937105
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b09d7c2a14'
+down_revision: Union[str, Sequence[str], None] = 'd82a5c19f3b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index for keyset pages of a vendor's order history"""
+    # placeorder is created by create_all , which also builds the index on a fresh database
+    if not sa.inspect(op.get_bind()).has_table('placeorder'):
+        return
+
+    op.create_index(
+        'ix_placeorder_vendor_created',
+        'placeorder',
+        ['vendor_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_placeorder_vendor_created', table_name='placeorder', if_exists=True)
@@ -0,0 +1,38 @@
+"""placeorder seller status index
+
+Revision ID: f3c6e1a8b527
+Revises: e5b09d7c2a14
+Create Date: 2026-10-18 17:03:18.260447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c6e1a8b527'
+down_revision: Union[str, Sequence[str], None] = 'e5b09d7c2a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index for the seller incoming order feed"""
+    # placeorder is created by create_all , which also builds the index on a fresh database
+    if not sa.inspect(op.get_bind()).has_table('placeorder'):
+        return
+
+    op.create_index(
+        'ix_placeorder_seller_status_created',
+        'placeorder',
+        ['seller_id', 'order_status', 'created_at', 'id'],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_placeorder_seller_status_created', table_name='placeorder', if_exists=True)
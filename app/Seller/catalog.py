@@ -0,0 +1,72 @@
+import os
+from typing import Iterable, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as postgres_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Seller.models import CatalogVersion, Product
+from app.Utils.etag import make_etag
+load_dotenv()
+
+
+FACTORY = "factory"
+PRODUCT = "product"
+
+# caches may keep catalog pages but must revalidate them , which costs a 304
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, no-cache")
+
+
+async def bump_catalog(db : AsyncSession , factory_ids : Iterable[int] = () , product_ids : Iterable[int] = ()) :
+    """
+    Increments the version of every given factory and product , in the caller's transaction.
+
+    One upsert for all of them. Rows are sent in key order so two
+    transactions bumping overlapping sets lock them in the same order. A
+    factory's version covers everything its detail and product list pages
+    show , so product changes bump the product and its factory.
+    """
+    keys = sorted(
+        {(FACTORY, factory_id) for factory_id in factory_ids if factory_id is not None}
+        | {(PRODUCT, product_id) for product_id in product_ids if product_id is not None}
+    )
+    if not keys :
+        return
+
+    insert = postgres_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    bump = insert(CatalogVersion).values([
+        {"scope": scope, "entity_id": entity_id, "version": 1} for scope, entity_id in keys
+    ])
+    bump = bump.on_conflict_do_update(
+        index_elements=[CatalogVersion.scope, CatalogVersion.entity_id],
+        set_={"version": CatalogVersion.version + 1}
+    )
+    await db.execute(bump)
+
+
+async def catalog_version(db : AsyncSession , scope : str , entity_id : int) -> Tuple[int, int] :
+    """
+    Current (version , stock version) , one query. Read it before the data it validates.
+
+    The version is 0 for an entity that never changed. Stock changes only
+    move the products' own stock_version , for a factory their sum , which
+    grows with every order or cancel touching one of its products.
+    """
+    product_filter = Product.factory_id == entity_id if scope == FACTORY else Product.id == entity_id
+    version , stock = (await db.execute(
+        select(
+            select(CatalogVersion.version)
+            .where(CatalogVersion.scope == scope, CatalogVersion.entity_id == entity_id)
+            .scalar_subquery() ,
+            select(func.coalesce(func.sum(Product.stock_version), 0))
+            .where(product_filter)
+            .scalar_subquery()
+        )
+    )).one()
+    return version or 0 , stock
+
+
+def catalog_etag(*parts) -> str :
+    return make_etag("catalog", *parts)
@@ -0,0 +1,137 @@
+import json
+import os
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from pathlib import Path
+from types import MappingProxyType
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.Utils.cache import TTLCache
+from app.Utils.etag import make_etag
+load_dotenv()
+
+
+CITY_DATA_PATH = os.getenv("CITY_DATA_PATH", str(Path(__file__).resolve().parents[2] / "static" / "city.json"))
+# the file only changes with a deploy , so clients and CDNs may keep it for a day
+CITY_CACHE_CONTROL = os.getenv("CITY_CACHE_CONTROL", "public, max-age=86400")
+CITY_AUTOCOMPLETE_LIMIT = 10
+CITY_AUTOCOMPLETE_MAX_LIMIT = 50
+CITY_AUTOCOMPLETE_CACHE_SIZE = int(os.getenv("CITY_AUTOCOMPLETE_CACHE_SIZE", 4096))
+# share of the query's trigrams a city must contain to count as a fuzzy match
+CITY_TRIGRAM_THRESHOLD = float(os.getenv("CITY_TRIGRAM_THRESHOLD", 0.5))
+# shorter queries share a trigram with half the country , they only match by prefix
+CITY_TRIGRAM_MIN_LENGTH = 3
+
+
+def normalize(text : str) -> str :
+    """Case and accent folded , single spaced , so 'bengaluru' finds 'Bengaluru'"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+
+def trigrams(text : str) -> frozenset :
+    # padded in front only , a query is the start of what the user means to type
+    padded = f"  {text}"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def encode(payload) -> Tuple[bytes, str] :
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    return body, make_etag(body)
+
+
+class CityIndex :
+    """
+    static/city.json parsed once into read-only structures.
+
+    The state list , every state's cities and the list of all cities are
+    encoded to JSON once with their ETags , so those requests do no work
+    beyond the header check. Autocomplete runs a prefix range lookup on the
+    sorted , normalized city names and falls back to trigram matching for
+    typos and words inside a name ; its encoded answers are kept in a small
+    cache since the data never changes while the process runs.
+    """
+
+    def __init__(self, path : str = CITY_DATA_PATH) :
+        with open(path, "r") as file :
+            state_dict = json.load(file)
+
+        self.states = tuple(state_dict.keys())
+        self.cities_by_state = MappingProxyType({
+            state: tuple(cities) for state, cities in state_dict.items() if isinstance(cities, list)
+        })
+        self.all_cities = tuple(city for cities in self.cities_by_state.values() for city in cities)
+        self.city_sets = MappingProxyType({state: frozenset(cities) for state, cities in self.cities_by_state.items()})
+
+        # one entry per distinct name , sorted by its normalized form for bisect
+        names = sorted({(normalize(city), city) for city in self.all_cities})
+        self.names = tuple(name for _, name in names)
+        self.keys = tuple(key for key, _ in names)
+
+        postings = defaultdict(set)
+        for position, key in enumerate(self.keys) :
+            for gram in trigrams(key) :
+                postings[gram].add(position)
+        self.postings = MappingProxyType({gram: frozenset(positions) for gram, positions in postings.items()})
+
+        self.states_response = encode({"states": list(self.states)})
+        self.all_cities_response = encode({"cities": list(self.all_cities)})
+        self.state_responses = MappingProxyType({
+            state: encode({"cities": list(cities)}) for state, cities in self.cities_by_state.items()
+        })
+        self.empty_response = encode({"cities": []})
+        self._autocomplete = TTLCache(maxsize=CITY_AUTOCOMPLETE_CACHE_SIZE, ttl=float("inf"))
+
+    def cities_response(self, state : Optional[str] = None) -> Tuple[bytes, str] :
+        if not state :
+            return self.all_cities_response
+        return self.state_responses.get(state, self.empty_response)
+
+    def search(self, q : str , state : Optional[str] = None , limit : int = CITY_AUTOCOMPLETE_LIMIT) -> list :
+        """City names for a partial `q` , prefix matches first , then the closest trigram matches"""
+        key = normalize(q)
+        if not key :
+            return []
+        allowed = self.city_sets.get(state) if state else None
+        if state and allowed is None :
+            return []
+
+        def wanted(position : int) -> bool :
+            return allowed is None or self.names[position] in allowed
+
+        matches = []
+        start = bisect_left(self.keys, key)
+        for position in range(start, len(self.keys)) :
+            if not self.keys[position].startswith(key) or len(matches) >= limit :
+                break
+            if wanted(position) :
+                matches.append(position)
+
+        if len(matches) < limit and len(key) >= CITY_TRIGRAM_MIN_LENGTH :
+            query_grams = trigrams(key)
+            hits = Counter()
+            for gram in query_grams :
+                hits.update(self.postings.get(gram, ()))
+            taken = set(matches)
+            ranked = sorted(
+                (-count / len(query_grams), self.keys[position], position)
+                for position, count in hits.items()
+                if count / len(query_grams) >= CITY_TRIGRAM_THRESHOLD and position not in taken and wanted(position)
+            )
+            matches.extend(position for _, _, position in ranked[:limit - len(matches)])
+
+        return [self.names[position] for position in matches]
+
+    def search_response(self, q : str , state : Optional[str] = None , limit : int = CITY_AUTOCOMPLETE_LIMIT) -> Tuple[bytes, str] :
+        cache_key = (normalize(q), state, limit)
+        response = self._autocomplete.get(cache_key)
+        if response is None :
+            response = encode({"cities": self.search(q, state, limit)})
+            self._autocomplete.set(cache_key, response)
+        return response
+
+
+city_index = CityIndex()
@@ -0,0 +1,520 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from math import cos, floor, radians
+from typing import Iterable, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Seller.models import Factory, Location, Seller, SellerRatingStats
+from app.Seller.schema import FactoryLocationSchema, LocationSchema, NearbySellerResponseSchema
+from app.Utils.cache import TTLCache
+from app.Utils.database import DB_URL
+from app.Utils.geo import EARTH_RADIUS_KM, geohash_decode, geohash_encode, haversine_km, haversine_km_array
+load_dotenv()
+
+
+GEO_CACHE_PRECISION = int(os.getenv("GEO_CACHE_PRECISION", 6))
+GEO_CACHE_TTL = float(os.getenv("GEO_CACHE_TTL", 60))
+GEO_CACHE_SIZE = int(os.getenv("GEO_CACHE_SIZE", 4096))
+GEO_CANDIDATE_LIMIT = int(os.getenv("GEO_CANDIDATE_LIMIT", 500))
+NEARBY_RESULT_LIMIT = 20
+
+# "sql" runs the PostGIS query , "memory" serves searches from an in-process grid index
+GEO_SEARCH_ENGINE = os.getenv("GEO_SEARCH_ENGINE") or ("memory" if DB_URL.startswith("sqlite") else "sql")
+GEO_INDEX_CELL_DEG = float(os.getenv("GEO_INDEX_CELL_DEG", 0.1))
+GEO_INDEX_REFRESH = float(os.getenv("GEO_INDEX_REFRESH", 300))
+
+# candidate radii are snapped to these buckets so nearby searches share cache entries
+RADIUS_BUCKETS_KM = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+
+def radius_bucket(radius_km : float) -> float :
+    index = bisect_left(RADIUS_BUCKETS_KM, radius_km)
+    if index < len(RADIUS_BUCKETS_KM) :
+        return RADIUS_BUCKETS_KM[index]
+    return float(-(-radius_km // 1000) * 1000)
+
+
+def inner_radius_bucket(radius_km : float) -> float :
+    """Largest bucket not above `radius_km` , 0 when the ring has no hole worth excluding"""
+    index = bisect_right(RADIUS_BUCKETS_KM, radius_km)
+    if index == 0 :
+        return 0
+    if index == len(RADIUS_BUCKETS_KM) :
+        return float(radius_km // 1000 * 1000)
+    return RADIUS_BUCKETS_KM[index - 1]
+
+
+class SearchTile :
+    """
+    A geohash tile plus the candidate ring that covers the search ring from any point inside it.
+
+    The outer radius reaches `max_distance_km` from every point of the tile ,
+    the inner radius stays below `min_distance_km` from every point of it , so
+    locations closer to the centre than that are skipped in SQL.
+    """
+
+    def __init__(self, loc : LocationSchema, precision : int = GEO_CACHE_PRECISION) :
+        self.geohash = geohash_encode(loc.latitude, loc.longtitude, precision)
+        self.latitude, self.longitude, lat_err, lon_err = geohash_decode(self.geohash)
+
+        half_diagonal_km = haversine_km(
+            self.latitude, self.longitude, self.latitude + lat_err, self.longitude + lon_err
+        )
+        self.radius_km = radius_bucket(loc.max_distance_km + half_diagonal_km)
+        self.inner_km = inner_radius_bucket(loc.min_distance_km - half_diagonal_km)
+        self.city = loc.city.lower() if loc.city else None
+
+    @property
+    def key(self) :
+        return (self.geohash, self.radius_km, self.inner_km, self.city)
+
+    def offset_km(self, latitude : float, longitude : float) -> float :
+        return haversine_km(self.latitude, self.longitude, latitude, longitude)
+
+    def covers(self, latitude : float, longitude : float) -> bool :
+        return haversine_km(self.latitude, self.longitude, latitude, longitude) <= self.radius_km
+
+
+class TileCandidates :
+    """
+    Candidate locations of a tile , nearest to its centre first , fetched a page at a time.
+
+    `reach_km` is the centre distance of the last fetched row : every row
+    not fetched yet is at least that far from the centre. Once a page comes
+    back short every location in the tile's ring has been fetched.
+    """
+
+    def __init__(self) :
+        self.rows = []
+        self.reach_km = 0.0
+        self.complete = False
+        self._ids = set()
+
+    def extend(self, tile : SearchTile , rows : List[dict] , page_size : int) :
+        for row in rows :
+            # concurrent searches may fetch the same page , keep one copy
+            if row["location_id"] not in self._ids :
+                self._ids.add(row["location_id"])
+                self.rows.append(row)
+        if rows :
+            self.reach_km = max(self.reach_km, tile.offset_km(rows[-1]["latitude"], rows[-1]["longitude"]))
+        if len(rows) < page_size :
+            self.complete = True
+
+
+class NearbySearchCache :
+    """
+    Candidate locations per search tile.
+
+    Entries hold the locations of the tile's candidate ring nearest to its
+    centre , exact distances and the min/max ring are applied per request ,
+    so one DB query usually serves every search issued from the same
+    neighbourhood. A search that needs rows past what was fetched extends
+    the entry with the next page.
+    """
+
+    def __init__(self, maxsize : int = GEO_CACHE_SIZE, ttl : float = GEO_CACHE_TTL) :
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, tile : SearchTile) :
+        entry = self._cache.get(tile.key)
+        return entry[1] if entry else None
+
+    def set(self, tile : SearchTile, candidates : TileCandidates) :
+        self._cache.set(tile.key, (tile, candidates))
+
+    def invalidate_point(self, latitude : Optional[float], longitude : Optional[float]) :
+        """Drop every tile whose candidate radius reaches a location that was added or moved"""
+        if latitude is None or longitude is None :
+            return
+        for key, (tile, _) in self._cache.items() :
+            if tile.covers(latitude, longitude) :
+                self._cache.pop(key)
+
+    def clear(self) :
+        self._cache.clear()
+
+
+nearby_search_cache = NearbySearchCache()
+
+
+CANDIDATE_QUERY = """
+    WITH origin AS (
+        SELECT ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography AS geog
+    )
+    SELECT
+        l.id AS location_id,
+        l.factory_id,
+        l.latitude,
+        l.longitude,
+        l.address_line1,
+        l.city,
+        l.state,
+        l.country,
+        s.id AS seller_id,
+        s.email AS seller_name,
+        f.name AS factory_name,
+        f.factory_type AS factory_types,
+        f.shop_categories AS category,
+        COALESCE(rs.rating_count, 0) AS rating_count,
+        COALESCE(rs.rating_sum, 0) AS rating_sum
+    FROM origin
+    JOIN locations l ON ST_DWithin(l.location_geog, origin.geog, :radius_meters)
+    JOIN factories f ON l.factory_id = f.id
+    JOIN sellers s ON f.seller_id = s.id
+    LEFT JOIN seller_rating_stats rs ON rs.seller_id = s.id
+    {filters}
+    ORDER BY l.location_geog <-> origin.geog, l.id
+    LIMIT :candidate_limit OFFSET :candidate_offset
+"""
+
+
+def candidate_filters(tile : SearchTile) -> str :
+    conditions = []
+    if tile.inner_km :
+        conditions.append("NOT ST_DWithin(l.location_geog, origin.geog, :inner_meters)")
+    if tile.city :
+        conditions.append("LOWER(l.city) = :city")
+    return "WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+async def fetch_candidates(db : AsyncSession, tile : SearchTile, offset : int = 0, limit : int = GEO_CANDIDATE_LIMIT) -> List[dict] :
+    # location_geog is maintained by the trigger and GIST indexed , so neither
+    # the ring filter nor the KNN ordering casts per row
+    query = text(CANDIDATE_QUERY.format(filters=candidate_filters(tile)))
+    params = {
+        "latitude": tile.latitude,
+        "longitude": tile.longitude,
+        "radius_meters": tile.radius_km * 1_000,
+        "candidate_limit": limit,
+        "candidate_offset": offset,
+    }
+    if tile.inner_km :
+        params["inner_meters"] = tile.inner_km * 1_000
+    if tile.city:
+        params["city"] = tile.city
+
+    result = await db.execute(query, params)
+    return [dict(row._mapping) for row in result]
+
+
+def rank_candidates(candidates : TileCandidates, tile : SearchTile, loc : LocationSchema, limit : int = NEARBY_RESULT_LIMIT) :
+    """
+    Exact distance from the caller , min/max ring filter and the nearest factory per seller.
+
+    Returns (ranked rows , exact). Rows not fetched yet are at least
+    `reach_km - offset` from the caller , so the ranking is exact once its
+    last row is closer than that ; otherwise the caller fetches another page.
+    """
+    in_ring = []
+    for candidate in candidates.rows :
+        if not meets_rating(candidate, loc.min_rating) :
+            continue
+        distance_km = haversine_km(loc.latitude, loc.longtitude, candidate["latitude"], candidate["longitude"])
+        if loc.min_distance_km <= distance_km <= loc.max_distance_km :
+            in_ring.append((distance_km, candidate))
+
+    ranked = nearest_per_seller(in_ring, limit)
+    if candidates.complete :
+        return ranked, True
+
+    unseen_km = candidates.reach_km - tile.offset_km(loc.latitude, loc.longtitude)
+    exact = unseen_km > loc.max_distance_km or (len(ranked) == limit and ranked[-1][0] < unseen_km)
+    return ranked, exact
+
+
+def average_rating(row : dict) -> float :
+    # read from seller_rating_stats with the candidate , ratings itself is never touched
+    return row["rating_sum"] / row["rating_count"] if row["rating_count"] else 0.0
+
+
+def meets_rating(row : dict, min_rating : Optional[float]) -> bool :
+    return min_rating is None or average_rating(row) >= min_rating
+
+
+def nearest_per_seller(in_ring : Iterable, limit : int = NEARBY_RESULT_LIMIT) :
+    """(distance_km , row) of the nearest location of each seller , nearest first"""
+    nearest = {}
+    for distance_km, candidate in in_ring :
+        current = nearest.get(candidate["seller_id"])
+        if current is None or distance_km < current[0] :
+            nearest[candidate["seller_id"]] = (distance_km, candidate)
+
+    return sorted(nearest.values(), key=lambda item: item[0])[:limit]
+
+
+def to_nearby_seller(row : dict, distance_km : float) -> NearbySellerResponseSchema :
+    factory_location = FactoryLocationSchema(
+        latitude=row["latitude"],
+        longitude=row["longitude"],
+        address_line1=row["address_line1"],
+        city=row["city"],
+        state=row["state"],
+        country=row["country"],
+        full_address=f"{row['address_line1']}, {row['city']}, {row['state']}, {row['country']}"
+    )
+
+    return NearbySellerResponseSchema(
+        seller_id=row["seller_id"],
+        seller_name=row["seller_name"],
+        factory_id=row["factory_id"],
+        factory_name=row["factory_name"],
+        factory_type=row["factory_types"],
+        shop_categories=row["category"],
+        distance=distance_km,
+        average_rating=average_rating(row),
+        total_ratings=row["rating_count"],
+        factory_location=factory_location
+    )
+
+
+# Search engines , both expose search() and rows_changed() so the service does not care which one runs
+
+class SqlGeoSearchEngine :
+    """PostGIS candidate query behind the geohash tile cache"""
+
+    def __init__(self, cache : NearbySearchCache = nearby_search_cache) :
+        self.cache = cache
+
+    async def search(self, db : AsyncSession, loc : LocationSchema) :
+        tile = SearchTile(loc)
+        candidates = self.cache.get(tile)
+        if candidates is None :
+            candidates = TileCandidates()
+
+        while True :
+            ranked, exact = rank_candidates(candidates, tile, loc)
+            if exact :
+                break
+            # dense areas can hold more locations than a page before enough distinct sellers turn up
+            page = await fetch_candidates(db, tile, offset=len(candidates.rows))
+            candidates.extend(tile, page, GEO_CANDIDATE_LIMIT)
+            self.cache.set(tile, candidates)
+
+        return [to_nearby_seller(candidate, distance_km) for distance_km, candidate in ranked]
+
+    async def rows_changed(self, db : AsyncSession, location_ids=(), factory_ids=(), seller_ids=(), points=()) :
+        if factory_ids or seller_ids :
+            # seller and factory names are part of every cached search row
+            self.cache.clear()
+        for latitude, longitude in points :
+            self.cache.invalidate_point(latitude, longitude)
+
+
+INDEX_QUERY = (
+    select(
+        Location.id.label("location_id"),
+        Location.factory_id,
+        Location.latitude,
+        Location.longitude,
+        Location.address_line1,
+        Location.city,
+        Location.state,
+        Location.country,
+        Seller.id.label("seller_id"),
+        Seller.email.label("seller_name"),
+        Factory.name.label("factory_name"),
+        Factory.factory_type.label("factory_types"),
+        Factory.shop_categories.label("category"),
+        func.coalesce(SellerRatingStats.rating_count, 0).label("rating_count"),
+        func.coalesce(SellerRatingStats.rating_sum, 0).label("rating_sum"),
+    )
+    .join(Factory, Location.factory_id == Factory.id)
+    .join(Seller, Factory.seller_id == Seller.id)
+    .outerjoin(SellerRatingStats, SellerRatingStats.seller_id == Seller.id)
+    .where(Location.latitude.is_not(None), Location.longitude.is_not(None))
+)
+
+
+def index_row(row) -> dict :
+    row = dict(row)
+    # match the enum names the raw SQL path returns
+    factory_type = row["factory_types"]
+    row["factory_types"] = getattr(factory_type, "name", factory_type)
+    return row
+
+
+class GridIndex :
+    """
+    Fixed size lat/long grid over location rows.
+
+    Coordinates live in numpy arrays addressed by slot , so a query gathers the
+    slots of the cells overlapping the search box and computes every distance
+    in one vectorized call. Freed slots are reused on the next insert.
+    """
+
+    def __init__(self, cell_deg : float = GEO_INDEX_CELL_DEG) :
+        self.cell_deg = cell_deg
+        self._lon_cells = round(360 / cell_deg)
+        self._cells = defaultdict(set)
+        self._slot_of = {}
+        self._cell_of = {}
+        self._rows = []
+        self._free = []
+        self._lat = np.empty(0)
+        self._lon = np.empty(0)
+
+    def __len__(self) :
+        return len(self._slot_of)
+
+    def _cell(self, latitude : float, longitude : float) :
+        return floor(latitude / self.cell_deg), floor(longitude / self.cell_deg) % self._lon_cells
+
+    def _allocate(self) -> int :
+        if self._free :
+            return self._free.pop()
+
+        slot = len(self._rows)
+        self._rows.append(None)
+        if slot >= len(self._lat) :
+            capacity = max(64, 2 * len(self._lat))
+            self._lat = np.resize(self._lat, capacity)
+            self._lon = np.resize(self._lon, capacity)
+        return slot
+
+    def upsert(self, row : dict) :
+        self.remove(row["location_id"])
+
+        slot = self._allocate()
+        cell = self._cell(row["latitude"], row["longitude"])
+        self._rows[slot] = row
+        self._lat[slot] = radians(row["latitude"])
+        self._lon[slot] = radians(row["longitude"])
+        self._slot_of[row["location_id"]] = slot
+        self._cell_of[row["location_id"]] = cell
+        self._cells[cell].add(slot)
+
+    def remove(self, location_id : int) :
+        slot = self._slot_of.pop(location_id, None)
+        if slot is None :
+            return
+
+        cell = self._cell_of.pop(location_id)
+        self._cells[cell].discard(slot)
+        if not self._cells[cell] :
+            del self._cells[cell]
+        self._rows[slot] = None
+        self._free.append(slot)
+
+    def _slots_near(self, latitude : float, longitude : float, max_km : float) :
+        lat_span = max_km / (EARTH_RADIUS_KM * np.pi / 180)
+        lat_min, lat_max = latitude - lat_span, latitude + lat_span
+        lon_scale = cos(radians(min(89.0, abs(latitude) + lat_span)))
+        lon_span = lat_span / lon_scale if lat_max < 90 and lat_min > -90 else 180
+
+        if lon_span >= 180 :
+            rows = range(floor(max(-90.0, lat_min) / self.cell_deg), floor(min(90.0, lat_max) / self.cell_deg) + 1)
+            columns = range(self._lon_cells)
+        else :
+            rows = range(floor(lat_min / self.cell_deg), floor(lat_max / self.cell_deg) + 1)
+            columns = [
+                column % self._lon_cells
+                for column in range(floor((longitude - lon_span) / self.cell_deg), floor((longitude + lon_span) / self.cell_deg) + 1)
+            ]
+
+        # a wide box is cheaper to answer by walking the occupied cells instead
+        if len(rows) * len(columns) > len(self._cells) :
+            row_range, column_set = (rows.start, rows.stop), set(columns)
+            cells = [
+                slots for (row, column), slots in self._cells.items()
+                if row_range[0] <= row < row_range[1] and column in column_set
+            ]
+        else :
+            cells = [self._cells[(row, column)] for row in rows for column in columns if (row, column) in self._cells]
+
+        return np.fromiter((slot for slots in cells for slot in slots), dtype=np.int64)
+
+    def query(self, latitude : float, longitude : float, min_km : float, max_km : float) :
+        """Rows within the min/max ring with their distances in kilometres"""
+        slots = self._slots_near(latitude, longitude, max_km)
+        if not len(slots) :
+            return []
+
+        distances = haversine_km_array(latitude, longitude, self._lat[slots], self._lon[slots])
+        in_ring = (distances >= min_km) & (distances <= max_km)
+        return [(float(distance), self._rows[slot]) for slot, distance in zip(slots[in_ring], distances[in_ring])]
+
+
+class MemoryGeoSearchEngine :
+    """
+    In-process grid index over every location with coordinates.
+
+    Loaded lazily on the first search , patched on location/factory/seller writes
+    and fully reloaded every GEO_INDEX_REFRESH seconds to pick up writes made
+    by other workers.
+    """
+
+    def __init__(self, cell_deg : float = GEO_INDEX_CELL_DEG, refresh_seconds : float = GEO_INDEX_REFRESH) :
+        self.cell_deg = cell_deg
+        self.refresh_seconds = refresh_seconds
+        self.index = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool :
+        return self.index is not None and time.monotonic() - self._loaded_at < self.refresh_seconds
+
+    async def load(self, db : AsyncSession) :
+        index = GridIndex(self.cell_deg)
+        result = await db.execute(INDEX_QUERY)
+        for row in result.mappings() :
+            index.upsert(index_row(row))
+
+        self.index = index
+        self._loaded_at = time.monotonic()
+
+    async def search(self, db : AsyncSession, loc : LocationSchema) :
+        if not self._is_fresh() :
+            async with self._lock :
+                if not self._is_fresh() :
+                    await self.load(db)
+
+        in_ring = self.index.query(loc.latitude, loc.longtitude, loc.min_distance_km, loc.max_distance_km)
+        if loc.city :
+            city = loc.city.lower()
+            in_ring = [(distance_km, row) for distance_km, row in in_ring if row["city"].lower() == city]
+        if loc.min_rating is not None :
+            in_ring = [(distance_km, row) for distance_km, row in in_ring if meets_rating(row, loc.min_rating)]
+        return [to_nearby_seller(row, distance_km) for distance_km, row in nearest_per_seller(in_ring)]
+
+    async def rows_changed(self, db : AsyncSession, location_ids=(), factory_ids=(), seller_ids=(), points=()) :
+        if self.index is None :
+            return
+
+        conditions = []
+        if location_ids :
+            conditions.append(Location.id.in_(location_ids))
+        if factory_ids :
+            conditions.append(Location.factory_id.in_(factory_ids))
+        if seller_ids :
+            conditions.append(Factory.seller_id.in_(seller_ids))
+        if not conditions :
+            return
+
+        result = await db.execute(INDEX_QUERY.where(or_(*conditions)))
+        fresh = {row["location_id"]: index_row(row) for row in result.mappings()}
+
+        # locations whose coordinates were cleared are no longer returned
+        for location_id in location_ids :
+            if location_id not in fresh :
+                self.index.remove(location_id)
+        for row in fresh.values() :
+            self.index.upsert(row)
+
+
+def build_geo_search_engine(name : str) :
+    if name == "sql" :
+        return SqlGeoSearchEngine()
+    if name == "memory" :
+        return MemoryGeoSearchEngine()
+    raise ValueError(f"Unknown GEO_SEARCH_ENGINE {name!r} , expected 'sql' or 'memory'")
+
+
+geo_search_engine = build_geo_search_engine(GEO_SEARCH_ENGINE)
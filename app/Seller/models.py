@@ -1,10 +1,11 @@
 from enum import Enum
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import JSON, Column, Integer, String, Float, ForeignKey, DateTime , Enum as SqlEnum, Text
+from sqlalchemy import DDL, JSON, Column, Index, Integer, String, Float, ForeignKey, DateTime , Enum as SqlEnum, Text, case, cast, event
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from app.Utils.database import Base
 from datetime import datetime
-from geoalchemy2 import Geometry
+from geoalchemy2 import Geography, Geometry
 
 
 
@@ -23,27 +24,31 @@ class Seller(Base):
     vendor = relationship("Vendoruser")
 
     ratings = relationship("Rating", back_populates="seller")  
+    # kept by the update_seller_rating_stats trigger , one row per rated seller.
+    # never loaded implicitly , add selectinload(Seller.rating_stats) where ratings are shown
+    rating_stats = relationship("SellerRatingStats", uselist=False, lazy="raise", viewonly=True)
     
     # Helper properties for rating calculations
     @property
     def average_rating(self):
         """Calculate average rating"""
-        if not self.ratings:
+        if not self.rating_stats:
             return 0.0
-        return sum(rating.rating.value for rating in self.ratings) / len(self.ratings)
+        return self.rating_stats.average_rating
     
     @property
     def total_ratings(self):
         """Get total number of ratings"""
-        return len(self.ratings)
+        if not self.rating_stats:
+            return 0
+        return self.rating_stats.rating_count
     
     @property
     def rating_distribution(self):
         """Get distribution of ratings (1-5 stars)"""
-        distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        for rating in self.ratings:
-            distribution[rating.rating.value] += 1
-        return distribution
+        if not self.rating_stats:
+            return {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        return self.rating_stats.rating_distribution
 
 class FactoryTypeEnum(str , Enum) :
     FACTORY = "factory"
@@ -93,6 +98,17 @@ class Location(Base):
     
     # Add geometry column for spatial indexing
     location = Column(Geometry('POINT', srid=4326))
+    # Geography copy kept by the update_location_geometry trigger , used for distance search
+    location_geog = Column(Geography('POINT', srid=4326, spatial_index=False))
+
+    __table_args__ = (
+        Index(
+            "idx_locations_location_geog",
+            location_geog,
+            postgresql_using="gist",
+            postgresql_include=["factory_id"],
+        ),
+    )
     # Relationship
     factory = relationship("Factory", back_populates="location")
 
@@ -112,6 +128,8 @@ class Product(Base):
     description = Column(String)
     price = Column(Float, nullable=False)
     stock_quantity = Column(Integer, nullable=False)
+    # bumped by every stock change in the same UPDATE , kept off catalog_versions so orders never lock the factory row
+    stock_version = Column(Integer, nullable=False, default=0, server_default="0")
     qunatity_unit = Column(SqlEnum(QuantifiableTypeEnum), nullable=False)  # e.g., 'unit', 'kilogram', 'gram', 'liter'
     category = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -144,4 +162,97 @@ class Rating(Base):
     # Relationships
     vendor = relationship("Vendoruser")  # Who gave the rating
     seller = relationship("Seller", back_populates="ratings")
-    # order = relationship("Order")  # Uncomment when you have Order model
\ No newline at end of file
+    # order = relationship("Order")  # Uncomment when you have Order model
+
+
+class SellerRatingStats(Base):
+    """
+    Running rating aggregates per seller.
+
+    Written only by the `update_seller_rating_stats` trigger on `ratings` , in
+    the same transaction as the rating insert , update or delete.
+    """
+    __tablename__ = "seller_rating_stats"
+
+    seller_id = Column(Integer, ForeignKey('sellers.id', ondelete="CASCADE"), primary_key=True)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    # per star histogram
+    star_1 = Column(Integer, nullable=False, default=0)
+    star_2 = Column(Integer, nullable=False, default=0)
+    star_3 = Column(Integer, nullable=False, default=0)
+    star_4 = Column(Integer, nullable=False, default=0)
+    star_5 = Column(Integer, nullable=False, default=0)
+
+    @hybrid_property
+    def average_rating(self):
+        if not self.rating_count:
+            return 0.0
+        return self.rating_sum / self.rating_count
+
+    @average_rating.expression
+    def average_rating(cls):
+        # usable in ORDER BY / WHERE , e.g. to rank search results by rating
+        return case(
+            (cls.rating_count > 0, cast(cls.rating_sum, Float) / cls.rating_count),
+            else_=0.0
+        )
+
+    @property
+    def rating_distribution(self):
+        return {1: self.star_1, 2: self.star_2, 3: self.star_3, 4: self.star_4, 5: self.star_5}
+
+
+# Postgres gets update_seller_rating_stats from the d82a5c19f3b7 migration. A
+# SQLite database is only ever built by create_all , so the same bookkeeping
+# is attached here as three plain SQLite triggers.
+SQLITE_STAR_VALUE = """
+    CASE {row}.rating
+        WHEN 'ONE_STAR' THEN 1
+        WHEN 'TWO_STAR' THEN 2
+        WHEN 'THREE_STAR' THEN 3
+        WHEN 'FOUR_STAR' THEN 4
+        WHEN 'FIVE_STAR' THEN 5
+    END
+"""
+
+
+def sqlite_rating_stats_change(row : str , sign : str) -> str :
+    stars = SQLITE_STAR_VALUE.format(row=row)
+    histogram = ",\n".join(f"star_{n} = star_{n} {sign} (({stars}) = {n})" for n in range(1, 6))
+    # a seller's row appears with its first rating
+    create = f"""
+        INSERT OR IGNORE INTO seller_rating_stats
+            (seller_id, rating_count, rating_sum, star_1, star_2, star_3, star_4, star_5)
+        VALUES ({row}.seller_id, 0, 0, 0, 0, 0, 0, 0);
+    """ if sign == "+" else ""
+    return f"""
+        {create}
+        UPDATE seller_rating_stats SET
+            rating_count = rating_count {sign} 1,
+            rating_sum = rating_sum {sign} ({stars}),
+            {histogram}
+        WHERE seller_id = {row}.seller_id;
+    """
+
+
+for statement in (
+    f"""CREATE TRIGGER IF NOT EXISTS seller_rating_stats_insert AFTER INSERT ON ratings
+        BEGIN {sqlite_rating_stats_change("NEW", "+")} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS seller_rating_stats_update AFTER UPDATE OF rating, seller_id ON ratings
+        BEGIN {sqlite_rating_stats_change("OLD", "-")} {sqlite_rating_stats_change("NEW", "+")} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS seller_rating_stats_delete AFTER DELETE ON ratings
+        BEGIN {sqlite_rating_stats_change("OLD", "-")} END""",
+) :
+    # after the whole metadata , both ratings and seller_rating_stats exist by then
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+
+class CatalogVersion(Base):
+    """Change counter of a factory or product , bumped in every transaction that changes what its pages show"""
+    __tablename__ = "catalog_versions"
+
+    # "factory" or "product"
+    scope = Column(String(16), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
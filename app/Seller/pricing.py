@@ -0,0 +1,78 @@
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+from app.Utils.cache import TTLCache
+load_dotenv()
+
+
+# off by default , every order then prices from the validation query
+PRICE_SNAPSHOT_CACHE = os.getenv("PRICE_SNAPSHOT_CACHE", "false").lower() in ("1", "true", "yes")
+PRICE_SNAPSHOT_TTL = float(os.getenv("PRICE_SNAPSHOT_TTL", 300))
+PRICE_SNAPSHOT_SIZE = int(os.getenv("PRICE_SNAPSHOT_SIZE", 1024))
+# charged on every order , clients may echo it but never choose it
+PLATFORM_FEE = float(os.getenv("PLATFORM_FEE", 10.0))
+
+
+def line_total(price : float , quantity : int) -> float :
+    return round(price * quantity, 2)
+
+
+def order_total(product_amount : float , platform_fee : float = PLATFORM_FEE) -> float :
+    return round(product_amount + platform_fee, 2)
+
+
+class PriceSnapshotCache :
+    """
+    Per-factory snapshot of product prices , keyed by product id.
+
+    Each factory has a version counter that the catalog write paths bump
+    after commit. A snapshot is only stored under the version that was
+    current before its query ran , so a write racing with an order can never
+    leave stale prices behind a newer version. The counters live in this
+    process ; with several workers the TTL bounds how long a price changed
+    elsewhere can be served.
+    """
+
+    def __init__(self, enabled : bool = PRICE_SNAPSHOT_CACHE , maxsize : int = PRICE_SNAPSHOT_SIZE , ttl : float = PRICE_SNAPSHOT_TTL) :
+        self.enabled = enabled
+        self.versions = defaultdict(int)
+        self.snapshots = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def version(self, factory_id : int) -> int :
+        return self.versions[factory_id]
+
+    def bump(self, factory_ids : Iterable[int]) :
+        for factory_id in set(factory_ids) :
+            if factory_id is None :
+                continue
+            self.versions[factory_id] += 1
+            self.snapshots.pop(factory_id)
+
+    def lookup(self, seller_id : int , factory_id : int , product_ids : List[int]) -> Optional[Dict[int, float]] :
+        """Prices of `product_ids` , or None unless the current snapshot of the seller's factory has all of them"""
+        if not self.enabled :
+            return None
+        snapshot = self.snapshots.get(factory_id)
+        if snapshot is None :
+            return None
+        version, owner_id, prices = snapshot
+        if version != self.versions[factory_id] or owner_id != seller_id :
+            return None
+        if any(product_id not in prices for product_id in product_ids) :
+            return None
+        return {product_id: prices[product_id] for product_id in product_ids}
+
+    def store(self, factory_id : int , version : int , seller_id : int , prices : Dict[int, float]) :
+        """Merges `prices` into the snapshot taken at `version` , dropped if the factory changed since"""
+        if not self.enabled or version != self.versions[factory_id] :
+            return
+        snapshot = self.snapshots.get(factory_id)
+        if snapshot is not None and snapshot[0] == version and snapshot[1] == seller_id :
+            prices = {**snapshot[2], **prices}
+        self.snapshots.set(factory_id, (version, seller_id, prices))
+
+
+price_snapshots = PriceSnapshotCache()
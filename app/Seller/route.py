@@ -1,81 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException, status , Response , Request
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, status , Response , Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.Seller.schema import LocationSchema, NearbySellerResponseSchema, SellerCreate, SellerFactoryDetailResponse, SellerProfileSchema, SellerProfileUpdateSchmea, SellerResponse, FactoryCreate, FactoryResponse, LocationCreate, LocationResponse, ProductBase, ProductResponse, SellerSearchSchemaResponse, StateResponseSchema, Token
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.Seller.schema import InvoiceBundleFormat, LocationSchema, NearbySellerResponseSchema, SellerCreate, SellerFactoryDetailResponse, SellerProfileSchema, SellerProfileUpdateSchmea, SellerResponse, FactoryCreate, FactoryResponse, LocationCreate, LocationResponse, ProductBase, ProductResponse, SellerOrderFeedSchema, SellerSearchSchemaResponse, StateResponseSchema, Token
+from app.Seller.cities import CITY_AUTOCOMPLETE_LIMIT, CITY_AUTOCOMPLETE_MAX_LIMIT
 from app.Seller.service import  SellerOrderService, SellerService
 from typing import List, Optional
 from app.Utils.database import get_db  
+from app.Utils.export import ExportFormat
 from app.Utils.authservice import get_current_user
+from app.Utils.pagination import MAX_PAGE_SIZE, PAGE_SIZE
+from app.Vendor.models import OrderStatusEnum
 seller_router = APIRouter()
 
 @seller_router.post("/create/"  , status_code= 200 , response_model=SellerResponse)
-async def create_seller(seller: SellerCreate , db: Session = Depends(get_db) , vendor = Depends(get_current_user)):
+async def create_seller(seller: SellerCreate , db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
     return await SellerService.create_seller(db , seller , vendor)
 
 
 @seller_router.post("/factories/", response_model=FactoryResponse)
-async def create_factory(factory: FactoryCreate, db: Session = Depends(get_db), vendor = Depends(get_current_user)):
+async def create_factory(factory: FactoryCreate, db: AsyncSession = Depends(get_db), vendor = Depends(get_current_user)):
     
     return await SellerService.create_factory(db, factory)
 
 @seller_router.post("/factories/locations/", response_model=LocationResponse)
-async def create_location(location: LocationCreate, db: Session = Depends(get_db) , vendor = Depends(get_current_user)):
+async def create_location(location: LocationCreate, db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
 
     return await SellerService.create_location(db, location)
 
 @seller_router.post("/products/create/")
-async def create_product(product: List[ProductBase], db: Session = Depends(get_db) , vendor = Depends(get_current_user)):
+async def create_product(product: List[ProductBase], db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
     
     return await SellerService.create_product(db, product)
 
+# streamed catalog export of one of the logged in seller's factories ,
+# declared before /products/{product_id} so "export" is not read as an id
+@seller_router.get("/products/export/", status_code=200)
+async def export_products(
+    factory_id : int ,
+    export_format : ExportFormat = Query(ExportFormat.NDJSON , alias="format") ,
+    vendor = Depends(get_current_user)
+):
+    return await SellerService.export_products_for_seller(vendor , export_format , factory_id)
+
 @seller_router.get("/products/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
-    return await SellerService.get_product_by_id(db, product_id)
+async def get_product(product_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    return await SellerService.get_product_by_id(db, product_id, request, response)
 
 @seller_router.get("/products/", response_model=List[ProductResponse])
-async def get_products(factory_id : int ,seller_id : Optional[int] = None , db: Session = Depends(get_db)):
-    return await SellerService.get_product_list(db , factory_id , seller_id)
+async def get_products(request : Request , response : Response , factory_id : int ,seller_id : Optional[int] = None , db: AsyncSession = Depends(get_db)):
+    return await SellerService.get_product_list(db , factory_id , seller_id , request , response)
 
 @seller_router.get("/products-list/", response_model=List[ProductResponse])
-async def get_products_for_seller(db: Session = Depends(get_db) , vendor = Depends(get_current_user)):
+async def get_products_for_seller(db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
     if not vendor :
         raise HTTPException(status_code=400 , detail= "vendor Detail Not Found")
     return await SellerService.get_product_list_for_seller(db , vendor)
 
+@seller_router.get("/products-list/export/", status_code=200)
+async def export_products_for_seller(
+    export_format : ExportFormat = Query(ExportFormat.NDJSON , alias="format") ,
+    vendor = Depends(get_current_user)
+):
+    return await SellerService.export_products_for_seller(vendor , export_format)
+
 @seller_router.get("/profile/", response_model= SellerProfileSchema)
-async def seller_profile(db: Session = Depends(get_db) , vendor = Depends(get_current_user)):
+async def seller_profile(db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
     if not vendor :
         raise HTTPException(status_code=400 , detail= "Seller Detail Not Found")
     return await SellerService.get_seller_profile(db , vendor)
 
 
 @seller_router.get("/seller-detail/{factory_id}")
-async def seller_detail_search(factory_id : int , db: Session = Depends(get_db)):
-    return await SellerService.get_seller_factory_details(db , factory_id)
+async def seller_detail_search(factory_id : int , request : Request , db: AsyncSession = Depends(get_db)):
+    return await SellerService.get_seller_factory_details(db , factory_id , request)
 
 # seller search api 
 @seller_router.post("/search/", status_code=200 , response_model=List[NearbySellerResponseSchema])
-async def seller_search_by_loc(loc : LocationSchema , db: Session = Depends(get_db)):
+async def seller_search_by_loc(loc : LocationSchema , db: AsyncSession = Depends(get_db)):
    
     return await SellerService.get_nearby_sellers(db , loc)
 
 # Seller Detail Update Api 
 @seller_router.put("/edit/profile/", status_code=200 , response_model=dict)
-async def update_seller_profile(update_data : SellerProfileUpdateSchmea  , db: Session = Depends(get_db)) :
+async def update_seller_profile(update_data : SellerProfileUpdateSchmea  , db: AsyncSession = Depends(get_db)) :
     return await SellerService.update_seller_profile(db , update_data)
 
 
-@seller_router.post("/placed-orders/", status_code=200)
-async def placed_order_for_seller(db: Session = Depends(get_db) , vendor = Depends(get_current_user)):
+@seller_router.post("/placed-orders/", status_code=200 , response_model=SellerOrderFeedSchema)
+async def placed_order_for_seller(
+    db: AsyncSession = Depends(get_db) ,
+    vendor = Depends(get_current_user) ,
+    order_status : OrderStatusEnum = Query(OrderStatusEnum.PLACED) ,
+    cursor : Optional[str] = Query(None , description="next_cursor of the previous page") ,
+    since : Optional[str] = Query(None , description="latest_cursor of the last poll , returns only newer orders") ,
+    limit : int = Query(PAGE_SIZE , ge=1 , le=MAX_PAGE_SIZE)
+):
    
-    return await SellerOrderService.my_orders(db , vendor) 
+    return await SellerOrderService.my_orders(db , vendor , order_status , cursor , since , limit) 
+
+@seller_router.post("/orders/{order_id}/accept/", status_code=200)
+async def accept_order(order_id : int , expected_delivery : date , db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
+    return await SellerOrderService.accept_incoming_order(order_id , expected_delivery , db , vendor)
+
+@seller_router.post("/orders/{order_id}/reject/", status_code=200)
+async def reject_order(order_id : int , db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
+    return await SellerOrderService.reject_incoming_order(order_id , db , vendor)
+
+# Month end invoice bundle for the logged in seller
+@seller_router.get("/invoices/export/", status_code=200)
+async def export_invoices(
+    start_date : date ,
+    end_date : date ,
+    bundle_format : InvoiceBundleFormat = Query(InvoiceBundleFormat.ZIP, alias="format") ,
+    db: AsyncSession = Depends(get_db) ,
+    vendor = Depends(get_current_user)
+):
+    return await SellerOrderService.export_invoices(db , vendor , start_date , end_date , bundle_format)
 
 # State List APi
 @seller_router.get("/states/", status_code=200)
-async def get_states_list():
-    return await SellerService.get_states() 
+async def get_states_list(request : Request):
+    return await SellerService.get_states(request) 
 
-# city list Api 
+# city list Api , `q` turns it into autocomplete
 @seller_router.get("/cities/", status_code=200)
-async def get_cities_list(state : Optional[str] = None):
-    return await SellerService.get_cities_by_state(state) 
\ No newline at end of file
+async def get_cities_list(
+    request : Request ,
+    state : Optional[str] = None ,
+    q : Optional[str] = Query(None , max_length=100 , description="start of a city name") ,
+    limit : int = Query(CITY_AUTOCOMPLETE_LIMIT , ge=1 , le=CITY_AUTOCOMPLETE_MAX_LIMIT)
+):
+    return await SellerService.get_cities_by_state(request , state , q , limit) 
\ No newline at end of file
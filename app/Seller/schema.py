@@ -2,6 +2,7 @@ from enum import Enum
 from typing import Optional, List
 from datetime import datetime
 from app.Seller.models import FactoryTypeEnum , QuantifiableTypeEnum , ShopCategoryEnum
+from app.Vendor.schema import PlaceOrderSchema
 from pydantic import BaseModel, EmailStr, Field, validator
 
 
@@ -92,6 +93,11 @@ class TokenData(BaseModel) :
     class Config :
         from_attributes = True
 
+class CurrentUser(TokenData) :
+    """Authenticated principal resolved once per token subject"""
+    vendor_id : Optional[int] = None
+    seller_id : Optional[int] = None
+
 class VendorDetailSchema(BaseModel) :
     id : int
     name : str
@@ -147,6 +153,8 @@ class LocationSchema(BaseModel) :
     min_distance_km: Optional[float] = Field(default=0)
     max_distance_km: Optional[float] = Field(default=500)  # override as needed
     city: Optional[str] = None
+    # only sellers whose average rating reaches this , unrated sellers count as 0
+    min_rating: Optional[float] = Field(default=None, ge=0, le=5)
 
 class SellerSearchSchemaResponse(BaseModel) :
     seller : SellerProfileSchema
@@ -177,6 +185,8 @@ class NearbySellerResponseSchema(BaseModel):
     factory_type : str
     shop_categories : Optional[List[ShopCategoryEnum]] =  None
     distance: float
+    average_rating: float = 0.0
+    total_ratings: int = 0
     factory_location: FactoryLocationSchema
 
     class Config:
@@ -340,3 +350,19 @@ class SellerProfileUpdateSchmea(BaseModel) :
     location : Optional[LocationUpdateSchema] = None
     products : Optional[List[ProductUpdateSchema]] = None
 
+
+# Bulk invoice export formats
+class InvoiceBundleFormat(str, Enum) :
+    ZIP = "zip"
+    PDF = "pdf"
+
+
+# Incoming order feed of a seller
+class SellerOrderFeedSchema(BaseModel) :
+    orders : List[PlaceOrderSchema] = []
+    # older page , pass back as `cursor`
+    next_cursor : Optional[str] = None
+    # newest order seen so far , pass back as `since` to poll for new orders only
+    latest_cursor : Optional[str] = None
+    # a `since` poll hit the page limit , poll again right away
+    has_more : bool = False
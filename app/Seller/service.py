@@ -1,15 +1,19 @@
 from cmath import acos, cos, sin
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 import json
+import logging
 from math import radians
 import random
 
-from sqlalchemy import case, func, select, text
+from sqlalchemy import case, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.Seller.models import *
 from app.Seller.schema import *
 from app.Seller.schema import SellerFactoryDetailResponse  # Add this import if the class is defined in schema.py
-from sqlalchemy.orm import Session, joinedload, selectinload
-from fastapi import HTTPException, status 
+from sqlalchemy.orm import joinedload, selectinload
+from fastapi import HTTPException, Request, Response, status 
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
@@ -19,30 +23,45 @@ from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
 
-from app.Utils.generate_invoice import generate_invoice_pdf
+from app.Seller.catalog import CATALOG_CACHE_CONTROL, FACTORY, PRODUCT, bump_catalog, catalog_etag, catalog_version
+from app.Seller.cities import CITY_AUTOCOMPLETE_LIMIT, CITY_CACHE_CONTROL, city_index
+from app.Seller.geo_search import geo_search_engine
+from app.Seller.pricing import price_snapshots
+from app.Utils.authservice import invalidate_principal, invalidate_vendor_status
+from app.Seller.stock import cancel_order
+from app.Vendor.lifecycle import transition
+from app.Utils.events import order_event, order_events
+from app.Utils.database import AsyncSessions
+from app.Utils.etag import json_bytes_response, not_modified, set_validators
+from app.Utils.export import ExportFormat, csv_chunk, export_response, ndjson_chunk, stream_partitions
+from app.Utils.fastjson import FAST_JSON_RESPONSES, json_response, row_serializer
+from app.Utils.response_cache import response_cache
+from app.Utils.pagination import PAGE_SIZE, feed_page, feed_result, feed_window, keyset_page, latest_feed_cursor, page_result
+from app.Utils.generate_invoice import generate_invoice_pdf, invoice_renderer, load_invoice_payloads, stream_invoice_zip
 from app.Vendor.models import OrderStatusEnum, PlaceOrder, Vendoruser
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# FAST_JSON_RESPONSES path of the product lists , rows in ProductResponse order
+product_serializer = row_serializer(ProductResponse)
+
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM") 
 TIMELIMIT = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
 
 class SellerService :
     @staticmethod
-    async def get_states() :
+    async def get_states(request : Request) :
         try :
-            with open("static/city.json" , 'r') as file :
-                json_struct = file.read()
-
-            state_dict = json.loads(json_struct)
-
-            return StateResponseSchema(states = list(state_dict.keys()))
+            body, etag = city_index.states_response
+            return json_bytes_response(request , body , etag , CITY_CACHE_CONTROL)
 
         except HTTPException as httperror :
             raise httperror
@@ -50,23 +69,15 @@ class SellerService :
             raise HTTPException(status_code= 500 , detail= str(e))
         
     @staticmethod
-    async def get_cities_by_state(state) :
+    async def get_cities_by_state(request : Request , state : Optional[str] = None , q : Optional[str] = None , limit : int = CITY_AUTOCOMPLETE_LIMIT) :
         try :
-            with open("static/city.json" , 'r') as file :
-                json_struct = file.read()
+            # with q , autocomplete within the state or across all cities
+            if q :
+                body, etag = city_index.search_response(q , state , limit)
+            else :
+                body, etag = city_index.cities_response(state)
 
-            state_dict = json.loads(json_struct)
-
-            if state:
-                cities = state_dict.get(state, [])
-            else:
-                # Flatten all cities from all states into a single list
-                cities = []
-                for city_list in state_dict.values():
-                    if isinstance(city_list, list):
-                        cities.extend(city_list)
-
-            return CityResponseSchema(cities=cities)
+            return json_bytes_response(request , body , etag , CITY_CACHE_CONTROL)
 
         except HTTPException as httperror :
             raise httperror
@@ -75,121 +86,166 @@ class SellerService :
 
 
     @staticmethod
-    async def create_seller(db: Session, seller: SellerCreate , vendor):
+    async def create_seller(db: AsyncSession, seller: SellerCreate , vendor):
         try :
-            db_user = db.query(Seller).filter(Seller.email == seller.email).first()
+            db_user = (await db.execute(select(Seller).where(Seller.email == seller.email))).scalar_one_or_none()
             if db_user:
                 raise HTTPException(status_code=400, detail="Email already registered")
             
-            vendor_detail  = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
-            if not vendor_detail:
+            if not vendor.vendor_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Vendor Not Found"
                 )
             
             seller_dict = seller.dict()
-            seller_dict["vendor_id"] = vendor_detail.id
+            seller_dict["vendor_id"] = vendor.vendor_id
 
             db_seller = Seller(**seller_dict)
             db.add(db_seller)
-            db.commit()
-            db.refresh(db_seller)
+            await db.commit()
+            await db.refresh(db_seller, attribute_names=["factories", "products"])
+
+            # the cached principal has no seller id yet
+            invalidate_principal(vendor.email)
+            invalidate_vendor_status(email=vendor.email)
 
             return db_seller
         except SQLAlchemyError as db_error:
-            db.rollback()
+            await db.rollback()
             raise db_error
         except HTTPException as error :
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code= 500 , detail= str(e))
         
     @staticmethod
-    async def create_factory(db: Session, factory: FactoryCreate):
+    async def create_factory(db: AsyncSession, factory: FactoryCreate):
         try :
             db_factory = Factory(**factory.dict())
             db.add(db_factory)
-            db.commit()
-            db.refresh(db_factory)
+            await db.commit()
+            invalidate_vendor_status(seller_ids=[db_factory.seller_id])
+            await db.refresh(db_factory, attribute_names=["location"])
 
             return db_factory
         except SQLAlchemyError as db_error:
-            db.rollback()
+            await db.rollback()
             raise db_error
         except HTTPException as error :
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code= 500 , detail= str(e))
         
     @staticmethod
-    async def create_location(db: Session, location: LocationCreate):
+    async def create_location(db: AsyncSession, location: LocationCreate):
         try :
             db_location = Location(**location.dict())
             db.add(db_location)
-            db.commit()
-            db.refresh(db_location)
+            await bump_catalog(db , factory_ids=[db_location.factory_id])
+            await db.commit()
+            await db.refresh(db_location)
+
+            seller_id = (await db.execute(select(Factory.seller_id).where(Factory.id == db_location.factory_id))).scalar_one_or_none()
+            invalidate_vendor_status(seller_ids=[seller_id])
+
+            await geo_search_engine.rows_changed(
+                db ,
+                location_ids=[db_location.id] ,
+                points=[(db_location.latitude , db_location.longitude)]
+            )
             return db_location
         
         except SQLAlchemyError as db_error:
-            db.rollback()
+            await db.rollback()
             raise db_error
         except HTTPException as error :
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code= 500 , detail= str(e))
         
     @staticmethod
-    async def create_product(db: Session, product: List[ProductBase]):
+    async def create_product(db: AsyncSession, product: List[ProductBase]):
         try :
             product_dicts = [products.dict() for products in product]
 
-            db.bulk_insert_mappings(Product, product_dicts)
-            db.commit()
+            await db.execute(insert(Product), product_dicts)
+            await bump_catalog(db , factory_ids={products["factory_id"] for products in product_dicts})
+            await db.commit()
+            invalidate_vendor_status(seller_ids={products["seller_id"] for products in product_dicts})
+            price_snapshots.bump(products["factory_id"] for products in product_dicts)
             return {"status": "success", "inserted": len(product_dicts)}
         
         except SQLAlchemyError as db_error:
-            db.rollback()
+            await db.rollback()
             raise db_error
         except HTTPException as error :
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code= 500 , detail= str(e))
         
     @staticmethod
-    async def get_product_by_id(db: Session, product_id: int):
+    async def get_product_by_id(db: AsyncSession, product_id: int, request: Optional[Request] = None, response: Optional[Response] = None):
         try :
-            product = db.query(Product).filter(Product.id == product_id).first()
+            # version first , a write landing before the row is read only costs the client a refetch
+            etag = catalog_etag(PRODUCT , product_id , *await catalog_version(db , PRODUCT , product_id))
+            if request is not None :
+                unchanged = not_modified(request , etag , CATALOG_CACHE_CONTROL)
+                if unchanged is not None :
+                    return unchanged
+
+            product = await db.get(Product, product_id)
             if not product:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+            set_validators(response , etag , CATALOG_CACHE_CONTROL)
             return product
         
+        except HTTPException as error :
+            raise error
         except SQLAlchemyError as db_error:
             raise HTTPException(status_code=500, detail=str(db_error))
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
         
     @staticmethod
-    async def get_product_list( db: Session ,factory_id : int , seller_id : Optional[int] = None ):
+    async def get_product_list( db: AsyncSession ,factory_id : int , seller_id : Optional[int] = None , request : Optional[Request] = None , response : Optional[Response] = None ):
         try :
             if not factory_id :
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Factory ID is required")
             
-            query = db.query(Product).filter(Product.factory_id == factory_id)
+            # answered from the factory versions alone when the client's copy is current
+            etag = catalog_etag(FACTORY , factory_id , seller_id , *await catalog_version(db , FACTORY , factory_id))
+            if request is not None :
+                unchanged = not_modified(request , etag , CATALOG_CACHE_CONTROL)
+                if unchanged is not None :
+                    return unchanged
+
+            # stable order , the same version always renders the same bytes
+            query = select(Product).where(Product.factory_id == factory_id).order_by(Product.id)
             if seller_id:
-                query = query.filter(Product.seller_id == seller_id)
+                query = query.where(Product.seller_id == seller_id)
+
+            if FAST_JSON_RESPONSES :
+                rows = (await db.execute(query.with_only_columns(*product_serializer.select_columns(Product)))).all()
+                return json_response(
+                    [product_serializer.dump(row) for row in rows] ,
+                    headers={"ETag": etag , "Cache-Control": CATALOG_CACHE_CONTROL}
+                )
 
-            products = query.all()
+            products = (await db.execute(query)).scalars().all()
+            set_validators(response , etag , CATALOG_CACHE_CONTROL)
             return products
         
+        except HTTPException as error :
+            raise error
         except SQLAlchemyError as db_error:
             raise HTTPException(status_code=500, detail=str(db_error))
         except Exception as e:
@@ -197,14 +253,21 @@ class SellerService :
         
     
     @staticmethod
-    async def get_product_list_for_seller( db: Session , vendor : TokenData):
+    async def get_product_list_for_seller( db: AsyncSession , vendor : CurrentUser):
         try :
-            vendor_data = db.query(Vendoruser).filter(Seller.email == vendor.email).first()
-            if not vendor_data :
+            if not vendor.vendor_id :
                 raise HTTPException(status_code= 400 , detail="Seller Data Not Found")
             
-            seller_data = db.query(Seller).filter(Seller.vendor_id == vendor_data.id).first()
-            return seller_data.products
+            if not vendor.seller_id :
+                return []
+
+            query = select(Product).where(Product.seller_id == vendor.seller_id)
+            if FAST_JSON_RESPONSES :
+                rows = (await db.execute(query.with_only_columns(*product_serializer.select_columns(Product)))).all()
+                return json_response([product_serializer.dump(row) for row in rows])
+
+            products = await db.execute(query)
+            return products.scalars().all()
         
         except SQLAlchemyError as db_error:
             raise HTTPException(status_code=500, detail=str(db_error))
@@ -212,13 +275,60 @@ class SellerService :
             raise HTTPException(status_code=500, detail=str(e))
         
     @staticmethod
-    async def get_seller_profile(db: Session , vendor : TokenData) :
+    async def export_products(export_format : ExportFormat , factory_id : Optional[int] = None , seller_id : Optional[int] = None) :
+        """Streams every matching product as NDJSON or CSV , memory stays at one batch whatever the catalog size"""
+        try :
+            if not factory_id and not seller_id :
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Factory ID is required")
+
+            query = select(*product_serializer.select_columns(Product)).order_by(Product.id)
+            if factory_id :
+                query = query.where(Product.factory_id == factory_id)
+            if seller_id :
+                query = query.where(Product.seller_id == seller_id)
+
+            filename = f"products_factory_{factory_id}" if factory_id else f"products_seller_{seller_id}"
+            return export_response(SellerService.product_export_chunks(query , export_format) , export_format , filename)
+
+        except HTTPException as error :
+            raise error
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @staticmethod
+    async def export_products_for_seller(vendor : CurrentUser , export_format : ExportFormat , factory_id : Optional[int] = None) :
+        # always filtered on the principal's seller , another seller's factory exports nothing
+        if not vendor.seller_id :
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seller Detail Not Found")
+        return await SellerService.export_products(export_format , factory_id=factory_id , seller_id=vendor.seller_id)
+
+    @staticmethod
+    async def product_export_chunks(query , export_format : ExportFormat) :
+        # one chunk per cursor batch , rows in ProductResponse field order
+        if export_format == ExportFormat.CSV :
+            yield csv_chunk([product_serializer.columns])
+        async for rows in stream_partitions(query) :
+            if export_format == ExportFormat.NDJSON :
+                yield ndjson_chunk(product_serializer.dump(row) for row in rows)
+            else :
+                yield csv_chunk(rows)
+
+    @staticmethod
+    async def get_seller_profile(db: AsyncSession , vendor : CurrentUser) :
         try :
-            vendor_data = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
-            if not vendor_data :
+            if not vendor.vendor_id :
                 raise HTTPException(status_code= 400 , detail="Seller Data Not Found")
             
-            seller_data = db.query(Seller).filter(Seller.vendor_id == vendor_data.id).first()
+            seller_query = (
+                select(Seller)
+                .options(
+                    selectinload(Seller.factories).selectinload(Factory.location),
+                    selectinload(Seller.products),
+                    joinedload(Seller.vendor),
+                )
+                .where(Seller.id == vendor.seller_id)
+            )
+            seller_data = (await db.execute(seller_query)).scalar_one_or_none()
 
             return seller_data
         except SQLAlchemyError as db_error:
@@ -227,8 +337,40 @@ class SellerService :
             raise HTTPException(status_code=500, detail=str(e))
         
     @staticmethod
-    async def get_seller_factory_details(db: Session , factory_id : int) :
+    async def get_seller_factory_details(db: AsyncSession , factory_id : int , request : Optional[Request] = None) :
         try :
+            version , stock = await catalog_version(db , FACTORY , factory_id)
+            etag = catalog_etag(FACTORY , factory_id , "detail" , version , stock)
+            if request is not None :
+                unchanged = not_modified(request , etag , CATALOG_CACHE_CONTROL)
+                if unchanged is not None :
+                    return unchanged
+
+            # the key moves with the version , so a write never has to delete anything
+            body = await response_cache.get_or_load(
+                f"factory-detail:{factory_id}:{version}:{stock}" ,
+                lambda : SellerService.render_factory_details(factory_id)
+            )
+            return Response(
+                content=body ,
+                media_type="application/json" ,
+                headers={"ETag": etag , "Cache-Control": CATALOG_CACHE_CONTROL}
+            )
+
+        except HTTPException as http_error :
+            raise http_error
+        except SQLAlchemyError as db_error:
+            raise HTTPException(status_code=500, detail=str(db_error))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @staticmethod
+    async def render_factory_details(factory_id : int) -> bytes :
+        """
+        The factory detail page as JSON bytes. Runs on its own session , a load
+        shared by concurrent requests must not depend on the one that started it.
+        """
+        async with AsyncSessions() as db :
             query = (
                 select(Factory)
                 .options(
@@ -239,7 +381,7 @@ class SellerService :
                 .where(Factory.id == factory_id)
             )
             
-            factory = db.execute(query).unique().scalar_one_or_none()
+            factory = (await db.execute(query)).unique().scalar_one_or_none()
             
             if not factory:
                 raise HTTPException(status_code=400 ,detail="Factory With This Id Doesnt Exist")
@@ -248,9 +390,10 @@ class SellerService :
             products_query = (
                 select(Product)
                 .where(Product.factory_id == factory_id)
+                .order_by(Product.id)
             )
             
-            factory_products = db.execute(products_query).scalars().all()
+            factory_products = (await db.execute(products_query)).scalars().all()
             
             # Construct response
             feature_seller = FeatureSeller(
@@ -269,137 +412,14 @@ class SellerService :
             return SellerFactoryDetailResponse(
                 seller=feature_seller,
                 factory=feature_factory
-            )
-
-        except HTTPException as http_error :
-            raise http_error
-        except SQLAlchemyError as db_error:
-            raise HTTPException(status_code=500, detail=str(db_error))
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            ).model_dump_json().encode()
         
         
     @staticmethod
-    async def get_nearby_sellers(db : Session , loc : LocationSchema ) :
+    async def get_nearby_sellers(db : AsyncSession , loc : LocationSchema ) :
         try :
-
-            min_radius_meters = loc.min_distance_km * 1_000
-            max_radius_meters = loc.max_distance_km * 1_000
-
-            location_filters = ["l.location IS NOT NULL"]
-
-            if loc.city:
-                location_filters.append("LOWER(l.city) = LOWER(:city)")
-            
-            # Distance filter using ST_DWithin for efficient spatial index usage
-            location_filters.append("""
-                ST_DWithin(
-                    l.location::geography,
-                    ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography,
-                    :max_radius_meters
-                )
-            """)
-
-            location_where = " AND ".join(location_filters)
-            expanded_limit = min(200, max(50, (loc.max_distance_km // 10) * 20))
-            # KNN Algorithmic query to find nearby sellers , within logn time
-            query = text(f"""
-            WITH filtered_locations AS (
-                SELECT 
-                    l.id,
-                    l.factory_id,
-                    l.latitude,
-                    l.longitude,
-                    l.address_line1,
-                    l.city,
-                    l.state,
-                    l.country,
-                    l.location,
-                    ST_Distance(
-                        l.location::geography, 
-                        ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography
-                    ) / 1000 AS distance_km
-                FROM locations l
-                WHERE {location_where}
-                ORDER BY l.location <-> ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)
-                LIMIT :expanded_limit
-            ),
-            filtered_with_distance AS (
-                SELECT *
-                FROM filtered_locations
-                WHERE distance_km BETWEEN :min_distance_km AND :max_distance_km
-            ),
-            seller_results AS (
-                SELECT DISTINCT ON (s.id)
-                    s.id AS seller_id,
-                    s.email AS seller_name,
-                    f.id AS factory_id,
-                    f.name AS factory_name,
-                    f.factory_type AS factory_types,
-                    f.shop_categories AS category,
-                    fl.latitude AS factory_latitude,
-                    fl.longitude AS factory_longitude,
-                    fl.address_line1,
-                    fl.city,
-                    fl.state,
-                    fl.country,
-                    fl.distance_km
-                FROM filtered_with_distance fl
-                JOIN factories f ON fl.factory_id = f.id
-                JOIN sellers s ON f.seller_id = s.id
-                ORDER BY s.id, fl.distance_km
-            )
-            SELECT * FROM seller_results
-            ORDER BY distance_km
-            LIMIT :final_limit
-        """)
-            params = {
-            "latitude": loc.latitude,
-            "longitude": loc.longtitude,  # Note: consider renaming to longitude
-            "min_distance_km": loc.min_distance_km,
-            "max_distance_km": loc.max_distance_km,
-            "max_radius_meters": max_radius_meters,
-            "expanded_limit": expanded_limit,
-            "final_limit": 20
-        }
-            if loc.city:
-                params["city"] = loc.city
-
-            result = db.execute(query, params)
-            
-            seller_data = result.fetchall()
-
-            if not seller_data:
-                return []
-
-            validated_results = []
-            for row in seller_data:
-                # Create factory location object
-                factory_location = FactoryLocationSchema(
-                    latitude=row.factory_latitude,
-                    longitude=row.factory_longitude,
-                    address_line1=row.address_line1,
-                    city=row.city,
-                    state=row.state,
-                    country=row.country,
-                    full_address=f"{row.address_line1}, {row.city}, {row.state}, {row.country}"
-                )
-                
-                # Create seller response object
-                seller_response = NearbySellerResponseSchema(
-                    seller_id=row.seller_id,
-                    seller_name=row.seller_name,
-                    factory_id=row.factory_id,
-                    factory_name=row.factory_name,
-                    factory_type = row.factory_types,
-                    shop_categories = row.category ,
-                    distance=row.distance_km,
-                    factory_location=factory_location
-                )
-                
-                validated_results.append(seller_response)
-        
-            return validated_results
+            # GEO_SEARCH_ENGINE picks the PostGIS tile cached query or the in-process grid index
+            return await geo_search_engine.search(db , loc)
             
         except SQLAlchemyError as db_error:
             raise HTTPException(status_code=500, detail=str(db_error))
@@ -408,22 +428,30 @@ class SellerService :
         
     # update seller profile
     @staticmethod
-    async def update_seller_profile(db : Session , update_data : SellerProfileUpdateSchmea) : 
+    async def update_seller_profile(db : AsyncSession , update_data : SellerProfileUpdateSchmea) : 
         try :
+            moved_points = []
+            repriced_factory_ids = set()
+            # factories whose detail page shows something changed here
+            changed_factory_ids = set()
+            changed_product_ids = set()
 
             if update_data.seller :
                 # update seller profile 
-                seller = db.query(Seller).filter(Seller.id == update_data.seller.id).first()
+                seller = await db.get(Seller, update_data.seller.id)
                 if not seller:
                     raise HTTPException(status_code=400, detail="Seller Details not found")
                 clean_data = update_data.seller.dict(exclude_unset=True, exclude={"id"})
                 for key, value in clean_data.items():
                     setattr(seller, key, value)
+                changed_factory_ids.update((await db.execute(
+                    select(Factory.id).where(Factory.seller_id == seller.id)
+                )).scalars().all())
                 
 
             if update_data.factories :
                 # update factory details 
-                factory = db.query(Factory).filter(Factory.id == update_data.factories.id).first()
+                factory = await db.get(Factory, update_data.factories.id)
                 if not factory :
                     raise HTTPException(status_code=400, detail="Factory Details not found")
                 
@@ -431,33 +459,54 @@ class SellerService :
 
                 for key, value in clean_data.items():
                     setattr(factory, key, value)
+                changed_factory_ids.add(factory.id)
                 
     
             if update_data.location :
                 # update location details 
-                location = db.query(Location).filter(Location.id == update_data.location.id).first()
+                location = await db.get(Location, update_data.location.id)
                 if not location :
                     raise HTTPException(status_code=400, detail="Location Details not found")
                 
 
                 clean_data = update_data.location.dict(exclude_unset=True, exclude={"id"})
 
+                # searches that could see the old or the new position are stale
+                moved_points.append((location.latitude , location.longitude))
                 for key, value in clean_data.items():
                     setattr(location , key, value)
+                moved_points.append((location.latitude , location.longitude))
+                changed_factory_ids.add(location.factory_id)
 
             if update_data.products :
                 # update product details 
                 products_dict_list = [product.dict(exclude_unset=True) for product in update_data.products]
-                db.bulk_update_mappings(Product, products_dict_list)
-
-            db.commit()
+                # price snapshots of the factories holding these products go stale
+                repriced_factory_ids.update((await db.execute(
+                    select(Product.factory_id).where(Product.id.in_([product["id"] for product in products_dict_list]))
+                )).scalars().all())
+                await db.execute(update(Product), products_dict_list)
+                changed_factory_ids.update(repriced_factory_ids)
+                changed_product_ids.update(product["id"] for product in products_dict_list)
+
+            await bump_catalog(db , factory_ids=changed_factory_ids , product_ids=changed_product_ids)
+            await db.commit()
+            price_snapshots.bump(repriced_factory_ids)
+
+            await geo_search_engine.rows_changed(
+                db ,
+                location_ids=[update_data.location.id] if update_data.location else [] ,
+                factory_ids=[update_data.factories.id] if update_data.factories else [] ,
+                seller_ids=[update_data.seller.id] if update_data.seller else [] ,
+                points=moved_points
+            )
 
             return {"message" : "Seller Profile Updated Successfully"}
         except SQLAlchemyError as db_error:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=500, detail=str(db_error))
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
         
 
@@ -467,80 +516,200 @@ class SellerService :
 class SellerOrderService :
 
     @staticmethod
-    async def my_orders(db : Session , vendor) :
+    async def my_orders(
+        db : AsyncSession ,
+        vendor ,
+        order_status : OrderStatusEnum = OrderStatusEnum.PLACED ,
+        cursor : Optional[str] = None ,
+        since : Optional[str] = None ,
+        limit : int = PAGE_SIZE
+    ) :
+        """
+        Incoming orders of the seller , one keyset page at a time.
+
+        Without `since` the newest orders come first and `cursor` walks back
+        in time ; with `since` only orders not delivered yet are returned ,
+        oldest first , so a dashboard can poll for what is new. That includes
+        orders committed late behind the cursor , see `feed_page`.
+        """
         try :
-            vendor_detail  = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
-            if not vendor_detail:
+            if not vendor.vendor_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Vendor Not Found"
                 )
-            seller_detail = db.query(Seller).filter(Seller.vendor_id == vendor_detail.id).first()
-
-            if not seller_detail :
+            if not vendor.seller_id :
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Seller Detail Not Found"
                 )
             
-            fetch_orders = db.query(PlaceOrder).filter(
-                PlaceOrder.seller_id == seller_detail.id ,
-                PlaceOrder.order_status == OrderStatusEnum.PLACED
+            # served by ix_placeorder_seller_status_created
+            incoming = (
+                PlaceOrder.seller_id == vendor.seller_id ,
+                PlaceOrder.order_status == order_status
+            )
+            fetch_orders = (
+                select(PlaceOrder)
+                .options(selectinload(PlaceOrder.ordered_products))
+                .where(*incoming)
             )
 
-            return fetch_orders.all()
+            if since :
+                fetch_orders = feed_page(fetch_orders , PlaceOrder.created_at , PlaceOrder.id , since , limit)
+                orders = (await db.execute(fetch_orders)).scalars().all()
+                orders, latest_cursor, has_more = feed_result(orders , limit , since)
+                return SellerOrderFeedSchema(orders=orders , latest_cursor=latest_cursor , has_more=has_more)
+
+            fetch_orders = keyset_page(fetch_orders , PlaceOrder.created_at , PlaceOrder.id , cursor , limit)
+            orders = (await db.execute(fetch_orders)).scalars().all()
+            orders, next_cursor = page_result(orders , limit)
+
+            # only the first page knows the newest order
+            latest_cursor = None
+            if not cursor :
+                window = []
+                if next_cursor :
+                    # older orders of the lookback window are behind next_cursor , not sent by the first poll
+                    window = (await db.execute(feed_window(
+                        select(PlaceOrder.id , PlaceOrder.created_at).where(*incoming) ,
+                        PlaceOrder.created_at ,
+                        orders[0].created_at
+                    ))).all()
+                latest_cursor = latest_feed_cursor(orders , window)
+            return SellerOrderFeedSchema(orders=orders , next_cursor=next_cursor , latest_cursor=latest_cursor)
 
+        except HTTPException as error :
+            raise error
         except SQLAlchemyError as db_error:
             raise HTTPException(status_code=500, detail=str(db_error))
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
         
-    async def accept_incoming_order(order_id : int , expected_delivery : date , db : Session , vendor)  :
+    @staticmethod
+    async def accept_incoming_order(order_id : int , expected_delivery : date , db : AsyncSession , vendor)  :
         try :
-            vendor_detail  = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
-            if not vendor_detail:
+            if not vendor.vendor_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Vendor Not Found"
                 )
-            seller_detail = db.query(Seller).filter(Seller.vendor_id == vendor_detail.id).first()
-
-            if not seller_detail :
+            if not vendor.seller_id :
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Seller Detail Not Found"
                 )
             
-            order_detail = db.query(PlaceOrder).filter(PlaceOrder.id == order_id).first()
+            # only a placed order of this seller can be confirmed
+            confirmed = await transition(
+                db ,
+                order_id ,
+                OrderStatusEnum.CONFIRMED ,
+                PlaceOrder.seller_id == vendor.seller_id ,
+                actor=f"seller:{vendor.seller_id}" ,
+                order_otp=str(random.randint(1000 , 999999)) ,
+                delivery_date=expected_delivery
+            )
+
+            await db.commit()
+            await order_events.publish(order_event("order.confirmed", confirmed))
+
+            # the order is confirmed from here on , a failed render must not report the accept as failed.
+            # the invoice download renders it on demand , once per order version in the invoice process pool
+            message = "Order confirmed and invoice generated"
+            try :
+                await generate_invoice_pdf(db , order_id)
+            except Exception :
+                logger.exception(f"Invoice of order {order_id} not rendered on accept , left to the download")
+                message = "Order confirmed , invoice is generated on download"
+
+            return {"message": message, "invoice_url": f"/vendor/orders/{order_id}/invoice/"}
+        except HTTPException as error :
+            await db.rollback()
+            raise error
+        except SQLAlchemyError as db_error:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=str(db_error))
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        
 
-            if not order_detail :
+    @staticmethod
+    async def export_invoices(db : AsyncSession , vendor , start_date : date , end_date : date , bundle_format : InvoiceBundleFormat) :
+        try :
+            if not vendor.seller_id :
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Order Detail Not Found"
+                    detail="Seller Detail Not Found"
+                )
+            if end_date < start_date :
+                raise HTTPException(status_code=400 , detail="end_date must not be before start_date")
+
+            # end date is inclusive for the caller
+            invoices = await load_invoice_payloads(
+                db ,
+                vendor.seller_id ,
+                datetime.combine(start_date , time.min) ,
+                datetime.combine(end_date + timedelta(days=1) , time.min)
+            )
+            if not invoices :
+                raise HTTPException(status_code=404 , detail="No orders in this date range")
+
+            filename = f"invoices_{vendor.seller_id}_{start_date}_{end_date}"
+
+            if bundle_format == InvoiceBundleFormat.PDF :
+                path = await invoice_renderer.render_bundle(invoices)
+                return FileResponse(
+                    path ,
+                    media_type="application/pdf" ,
+                    filename=f"{filename}.pdf" ,
+                    background=BackgroundTask(path.unlink , missing_ok=True)
                 )
-            
-            order_detail.order_status = OrderStatusEnum.CONFIRMED
-            order_detail.order_otp = random.randint(1000 , 999999)
-            order_detail.delivery_date = expected_delivery
-
-            db.commit()
 
-            file_path = f"invoice_order_{order_id}.pdf"
-            await generate_invoice_pdf(order_detail, file_path=file_path)
+            return StreamingResponse(
+                stream_invoice_zip(invoices) ,
+                media_type="application/zip" ,
+                headers={"Content-Disposition": f'attachment; filename="{filename}.zip"'}
+            )
 
-            return {"message": "Order confirmed and invoice generated", "invoice_path": file_path}
+        except HTTPException as http_error :
+            raise http_error
         except SQLAlchemyError as db_error:
             raise HTTPException(status_code=500, detail=str(db_error))
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
-        
 
-    async def reject_incoming_order(order_id : int , db : Session , vendor) :
+    @staticmethod
+    async def reject_incoming_order(order_id : int , db : AsyncSession , vendor) :
         try :
-            pass
+            if not vendor.seller_id :
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Seller Detail Not Found"
+                )
+
+            # a seller can only turn down orders it has not accepted , reserved stock is released
+            rejected = await cancel_order(
+                db ,
+                order_id ,
+                (OrderStatusEnum.PLACED ,) ,
+                PlaceOrder.seller_id == vendor.seller_id ,
+                actor=f"seller:{vendor.seller_id}"
+            )
+
+            await db.commit()
+            await order_events.publish(order_event("order.rejected", rejected))
 
+            return {"message" : "Order rejected" , "order_id" : order_id}
+
+        except HTTPException as error :
+            await db.rollback()
+            raise error
         except SQLAlchemyError as db_error:
+            await db.rollback()
             raise HTTPException(status_code=500, detail=str(db_error))
         except Exception as e:
+            await db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
         
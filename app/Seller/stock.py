@@ -0,0 +1,81 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Seller.models import Product
+from app.Vendor.lifecycle import transition
+from app.Vendor.models import OrderedProductsDetail, OrderStatusEnum
+
+
+def order_quantities(ordered_products : Iterable) -> Dict[int, int] :
+    """Total quantity per product id , repeated lines of one product are merged"""
+    quantities = defaultdict(int)
+    for line in ordered_products :
+        quantities[line.product] += line.quantity
+    return dict(quantities)
+
+
+async def reserve_stock(db : AsyncSession , quantities : Dict[int, int]) -> List[int] :
+    """
+    Takes stock for every product of an order in one conditional UPDATE.
+
+    A row is only decremented while it still holds enough stock , the check
+    and the write happen in the same statement so concurrent orders cannot
+    both pass it. Raises 409 listing the products that ran short ; the
+    caller rolls back , undoing the rows that did get decremented. Each row's
+    stock_version moves with it , which is what catalog ETags see of stock.
+    """
+    requested = case(quantities, value=Product.id)
+    reserve = (
+        update(Product)
+        .where(Product.id.in_(quantities), Product.stock_quantity >= requested)
+        .values(stock_quantity=Product.stock_quantity - requested, stock_version=Product.stock_version + 1)
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    )
+    reserved = set((await db.execute(reserve)).scalars().all())
+
+    short = sorted(set(quantities) - reserved)
+    if short :
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Insufficient stock for products {short}"
+        )
+    return sorted(reserved)
+
+
+async def release_stock(db : AsyncSession , order_id : int) :
+    """Gives the line item quantities of an order back to stock , one UPDATE with a correlated sum"""
+    order_lines = select(OrderedProductsDetail.product).where(OrderedProductsDetail.order_id == order_id)
+    returned = (
+        select(func.coalesce(func.sum(OrderedProductsDetail.quantity), 0))
+        .where(
+            OrderedProductsDetail.order_id == order_id,
+            OrderedProductsDetail.product == Product.id
+        )
+        .scalar_subquery()
+    )
+    release = (
+        update(Product)
+        .where(Product.id.in_(order_lines))
+        .values(stock_quantity=Product.stock_quantity + returned, stock_version=Product.stock_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(release)
+
+
+async def cancel_order(db : AsyncSession , order_id : int , from_statuses : Iterable , *criteria , actor : Optional[str] = None) :
+    """
+    Moves an order to CANCELLED and returns its stock , in the caller's transaction.
+
+    The transition only succeeds from the status it read , so an order
+    cancelled twice in parallel only releases its stock once. Returns the
+    (id , vendor_id , seller_id , order_status) row , raises 404 / 409 like
+    `transition`.
+    """
+    row = await transition(db , order_id , OrderStatusEnum.CANCELLED , *criteria , from_statuses=from_statuses , actor=actor)
+    await release_stock(db , order_id)
+    return row
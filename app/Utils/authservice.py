@@ -1,7 +1,11 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException, Request, status 
 from app.Seller.models import *
 from app.Seller.schema import *
+from app.Vendor.models import Vendoruser
+from app.Utils.cache import TTLCache
+from app.Utils.database import get_db
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -23,7 +27,68 @@ TIMELIMIT = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
 
 
 
-def get_current_user(request : Request):
+# Resolved principals keyed by token subject (email) , saves the vendor/seller lookups on every request
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", 2048)),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", 300)),
+)
+
+def invalidate_principal(email : str) :
+    """Drop the cached principal , call it whenever vendor or seller ids of a user change"""
+    principal_cache.pop(email)
+
+# Profile completion per user (email) , short lived since other workers only see their own invalidations
+vendor_status_cache = TTLCache(
+    maxsize=int(os.getenv("VENDOR_STATUS_CACHE_SIZE", 2048)),
+    ttl=float(os.getenv("VENDOR_STATUS_CACHE_TTL", 30)),
+)
+# seller id -> email of the cached status , so seller side writes can find the entry
+vendor_status_owners = TTLCache(
+    maxsize=int(os.getenv("VENDOR_STATUS_CACHE_SIZE", 2048)),
+    ttl=float(os.getenv("VENDOR_STATUS_CACHE_TTL", 30)),
+)
+
+def cache_vendor_status(email : str , seller_id , vendor_status) :
+    vendor_status_cache.set(email, vendor_status)
+    if seller_id is not None :
+        vendor_status_owners.set(seller_id, email)
+
+def invalidate_vendor_status(email : str = None , seller_ids = ()) :
+    """Drop cached profile completion , call it after shop , location , factory or product inserts"""
+    if email is not None :
+        vendor_status_cache.pop(email)
+    for seller_id in seller_ids :
+        owner = vendor_status_owners.pop(seller_id)
+        if owner is not None :
+            vendor_status_cache.pop(owner)
+
+async def resolve_principal(db : AsyncSession , email : str , name : str) -> CurrentUser :
+    cached = principal_cache.get(email)
+    if cached is not None :
+        return cached.model_copy(update={"name": name})
+
+    # vendor and seller ids in one round trip
+    query = (
+        select(Vendoruser.id, Seller.id)
+        .outerjoin(Seller, Seller.vendor_id == Vendoruser.id)
+        .where(Vendoruser.email == email)
+        .order_by(Seller.id)
+        .limit(1)
+    )
+    row = (await db.execute(query)).first()
+
+    principal = CurrentUser(
+        email=email,
+        name=name,
+        vendor_id=row[0] if row else None,
+        seller_id=row[1] if row else None
+    )
+    # unknown users are not cached so a fresh sign up is visible right away
+    if row :
+        principal_cache.set(email, principal)
+    return principal
+
+async def get_current_user(request : Request , db : AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -31,7 +96,6 @@ def get_current_user(request : Request):
     )
 
     token = request.cookies.get("access_token")  
-    print(token)
     if token is None:
         raise HTTPException(status_code=401, detail="Token not found in cookies")
 
@@ -41,7 +105,7 @@ def get_current_user(request : Request):
         name = payload.get("name")
         if email is None or name is None:
             raise credentials_exception
-        return TokenData(email=email, name=name)
     except JWTError:
         raise credentials_exception
-        
\ No newline at end of file
+
+    return await resolve_principal(db , email , name)
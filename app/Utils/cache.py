@@ -0,0 +1,56 @@
+from collections import OrderedDict
+import time
+
+
+_MISSING = object()
+
+
+class TTLCache :
+    """
+    Small in-process LRU cache whose entries also expire after `ttl` seconds.
+
+    Every worker keeps its own copy, so it is only meant for data that can be
+    safely served slightly stale or that is invalidated on the write path.
+    """
+
+    def __init__(self, maxsize : int = 1024, ttl : float = 300) :
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key, default=None) :
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING :
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic() :
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value) :
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize :
+            self._data.popitem(last=False)
+
+    def pop(self, key) :
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def items(self) :
+        """Snapshot of live (key, value) pairs , safe to mutate the cache while iterating"""
+        now = time.monotonic()
+        return [(key, value) for key, (expires_at, value) in list(self._data.items()) if expires_at >= now]
+
+    def clear(self) :
+        self._data.clear()
+
+    def __contains__(self, key) :
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) :
+        return len(self._data)
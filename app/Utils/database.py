@@ -1,7 +1,8 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-import os 
+import os
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -11,21 +12,40 @@ DB_URL = os.getenv("DATABASE_URL")
 
 connect_args = {"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
 
+# Async driver for every dialect we run on : asyncpg for postgres , aiosqlite for local sqlite
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url : str) -> str :
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+ASYNC_DB_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DB_URL)
+
 # initilizing engine
+# sync engine is kept for metadata create_all , alembic and sqlite scripts
 
 engine = create_engine(DB_URL , connect_args=connect_args)
 
+# async engine used by every request handler
+
+async_engine = create_async_engine(ASYNC_DB_URL , pool_pre_ping=True)
+
 # initializing session
 
 Sessions = sessionmaker(autoflush=False , autocommit = False , bind=engine)
 
-# Initializing Base model 
+# expire_on_commit is off so returned objects can be serialized after commit without lazy IO
+AsyncSessions = async_sessionmaker(async_engine , class_=AsyncSession , autoflush=False , expire_on_commit=False)
+
+# Initializing Base model
 
 Base = declarative_base()
 
-def get_db():
-    db = Sessions()
-    try:
+async def get_db():
+    async with AsyncSessions() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
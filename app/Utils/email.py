@@ -1,23 +1,40 @@
+import asyncio
 import logging
 import smtplib
+import time
 from typing import Optional, List
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from asyncio import sleep
-from functools import wraps
+from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Utils.database import AsyncSessions
+from app.Vendor.models import EmailOutbox, EmailStatusEnum
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
-EMAIL_HOST = "smtp.gmail.com"
-EMAIL_PORT = 587
+EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 EMAIL_FROM = os.getenv("EMAIL_FROM")
-EMAIL_USE_TLS = True
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() == "true"
+
+# outbox worker tuning
+EMAIL_OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "true").lower() == "true"
+EMAIL_OUTBOX_BATCH = int(os.getenv("EMAIL_OUTBOX_BATCH", 50))
+EMAIL_OUTBOX_POLL = float(os.getenv("EMAIL_OUTBOX_POLL", 5))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+EMAIL_RETRY_BASE = float(os.getenv("EMAIL_RETRY_BASE", 30))
+EMAIL_SMTP_IDLE = float(os.getenv("EMAIL_SMTP_IDLE", 60))
+# sent and failed rows are deleted after this many days , checked every EMAIL_OUTBOX_PURGE_INTERVAL seconds
+EMAIL_OUTBOX_RETENTION_DAYS = float(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", 7))
+EMAIL_OUTBOX_PURGE_INTERVAL = float(os.getenv("EMAIL_OUTBOX_PURGE_INTERVAL", 3600))
 
 
 
@@ -26,132 +43,280 @@ class EmailException(Exception):
     """Custom exception for email sending errors"""
     pass
 
-async def send_email_with_retry(
+
+def enqueue_email(
+    db: AsyncSession,
     recipient: str | List[str],
     subject: str,
     body: str,
-    is_html: bool = False,
-    max_retries: int = 3,
-    retry_delay: int = 5
-) -> bool:
+    is_html: bool = False
+) -> List[EmailOutbox]:
     """
-    Send email with retry logic and comprehensive error handling.
-    
-    Args:
-        recipient: Single email address or list of addresses
-        subject: Email subject line
-        body: Email body content (plain text or HTML)
-        is_html: Whether body contains HTML content
-        max_retries: Maximum number of retry attempts
-        retry_delay: Delay in seconds between retries
-    
-    Returns:
-        bool: True if email sent successfully, False otherwise
-        
-    Raises:
-        EmailException: If all retry attempts fail
+    Adds outbox rows to the caller's session , nothing is sent until the
+    caller commits and the outbox worker picks them up.
     """
-    # Convert single recipient to list
     recipients = [recipient] if isinstance(recipient, str) else recipient
-    
-    for attempt in range(1, max_retries + 1):
-        try:
-            # Create message
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = EMAIL_FROM
-            message['To'] = ', '.join(recipients)
-            
-            # Attach body content
-            mime_type = 'html' if is_html else 'plain'
-            message.attach(MIMEText(body, mime_type, 'utf-8'))
-            
-            # Create SMTP connection
-            with smtplib.SMTP(
-                EMAIL_HOST, 
-                EMAIL_PORT,
-                timeout=30
-            ) as server:
-                server.ehlo()
-                
-                if EMAIL_USE_TLS:
-                    server.starttls()
-                    server.ehlo()
-                
-                server.login(
-                    EMAIL_USER, 
-                   EMAIL_PASSWORD
-                )
-                
-                # Send email
+    rows = [
+        EmailOutbox(recipient=address, subject=subject, body=body, is_html=is_html)
+        for address in recipients
+    ]
+    db.add_all(rows)
+    return rows
+
+
+def build_message(row: EmailOutbox) -> MIMEMultipart:
+    message = MIMEMultipart('alternative')
+    message['Subject'] = row.subject
+    message['From'] = EMAIL_FROM
+    message['To'] = row.recipient
+
+    mime_type = 'html' if row.is_html else 'plain'
+    message.attach(MIMEText(row.body, mime_type, 'utf-8'))
+    return message
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Rejected recipients and 5xx replies will not succeed on retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        # a 4xx refusal (full mailbox , greylisting) is worth another attempt
+        return all(500 <= code < 600 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+class SMTPSender:
+    """
+    Keeps one authenticated SMTP connection open across messages.
+
+    STARTTLS and login happen once per connection instead of once per mail ;
+    an idle connection is probed with NOOP and transparently reopened when
+    the server dropped it. Blocking , so it runs in a worker thread.
+    """
+
+    def __init__(
+        self,
+        host: str = EMAIL_HOST,
+        port: int = EMAIL_PORT,
+        user: Optional[str] = EMAIL_USER,
+        password: Optional[str] = EMAIL_PASSWORD,
+        use_tls: bool = EMAIL_USE_TLS,
+        idle_timeout: float = EMAIL_SMTP_IDLE
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.idle_timeout = idle_timeout
+        self._server = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        server.ehlo()
+        if self.use_tls:
+            server.starttls()
+            server.ehlo()
+        if self.user:
+            server.login(self.user, self.password)
+        return server
+
+    def _connection(self):
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            try:
+                self._server.noop()
+            except smtplib.SMTPException:
+                self.close()
+
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+
+    def send(self, message):
+        # one reconnect if the server closed a connection we thought was alive
+        for attempt in (1, 2):
+            server = self._connection()
+            try:
                 server.send_message(message)
-                
-            logger.info(
-                f"Email sent successfully to {recipients} "
-                f"on attempt {attempt}"
-            )
-            return True
-            
-        except smtplib.SMTPAuthenticationError as e:
-            logger.error(
-                f"SMTP authentication failed on attempt {attempt}: {str(e)}"
-            )
-            # Don't retry authentication errors
-            raise EmailException(
-                f"Email authentication failed: {str(e)}"
-            )
-            
-        except smtplib.SMTPRecipientsRefused as e:
-            logger.error(
-                f"Recipients refused on attempt {attempt}: {str(e)}"
-            )
-            raise EmailException(
-                f"Invalid recipient email address: {str(e)}"
-            )
-            
-        except smtplib.SMTPException as e:
-            logger.error(
-                f"SMTP error on attempt {attempt}/{max_retries}: {str(e)}"
-            )
-            if attempt < max_retries:
-                await sleep(retry_delay)
-            else:
-                raise EmailException(
-                    f"Failed to send email after {max_retries} attempts: {str(e)}"
-                )
-                
-        except ConnectionError as e:
-            logger.error(
-                f"Connection error on attempt {attempt}/{max_retries}: {str(e)}"
-            )
-            if attempt < max_retries:
-                await sleep(retry_delay)
-            else:
-                raise EmailException(
-                    f"Failed to connect to email server: {str(e)}"
-                )
-                
-        except TimeoutError as e:
-            logger.error(
-                f"Timeout error on attempt {attempt}/{max_retries}: {str(e)}"
+                self._last_used = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if attempt == 2:
+                    raise
+
+    def send_batch(self, messages) -> List[Optional[Exception]]:
+        """Sends in order , returns one error (or None) per message"""
+        results = []
+        for index, message in enumerate(messages):
+            try:
+                self.send(message)
+                results.append(None)
+            except (smtplib.SMTPAuthenticationError, smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected) as error:
+                # the server is unusable , the rest of the batch fails the same way
+                self.close()
+                results.extend([error] * (len(messages) - index))
+                break
+            except smtplib.SMTPException as error:
+                # refused recipient or rejected data , the connection is still good
+                results.append(error)
+            except OSError as error:
+                self.close()
+                results.extend([error] * (len(messages) - index))
+                break
+        return results
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+class EmailOutboxWorker:
+    """
+    Background task draining `email_outbox`.
+
+    Due rows are claimed with FOR UPDATE SKIP LOCKED so several app workers
+    can run it side by side , sent over the shared SMTPSender connection and
+    their retry state (attempts , exponential next_attempt_at , last_error)
+    is committed back to the same rows.
+
+    Bodies can carry secrets such as password reset links , so a row's body
+    is blanked once it is sent or given up on , and finished rows are
+    purged after EMAIL_OUTBOX_RETENTION_DAYS.
+    """
+
+    def __init__(
+        self,
+        sender: Optional[SMTPSender] = None,
+        batch_size: int = EMAIL_OUTBOX_BATCH,
+        poll_interval: float = EMAIL_OUTBOX_POLL,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        retry_base: float = EMAIL_RETRY_BASE,
+        retention_days: float = EMAIL_OUTBOX_RETENTION_DAYS,
+        purge_interval: float = EMAIL_OUTBOX_PURGE_INTERVAL,
+        session_factory=AsyncSessions
+    ):
+        self.sender = sender or SMTPSender()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retention_days = retention_days
+        self.purge_interval = purge_interval
+        self.session_factory = session_factory
+        self._last_purge = 0.0
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.sender.close)
+
+    def wake(self):
+        """Call after committing new outbox rows to skip the poll delay"""
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            if time.monotonic() - self._last_purge >= self.purge_interval:
+                try:
+                    await self.purge()
+                except Exception:
+                    logger.exception("Email outbox purge failed")
+                self._last_purge = time.monotonic()
+
+            try:
+                processed = await self.process_batch()
+            except Exception:
+                logger.exception("Email outbox batch failed")
+                processed = 0
+
+            # a full batch means more mail is probably due
+            if processed >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def claim_query(self):
+        """Due rows , locked for this worker and skipped by the others until it commits"""
+        return (
+            select(EmailOutbox)
+            .where(
+                EmailOutbox.status == EmailStatusEnum.PENDING,
+                EmailOutbox.next_attempt_at <= datetime.utcnow()
             )
-            if attempt < max_retries:
-                await sleep(retry_delay * 2)
-            else:
-                raise EmailException(
-                    f"Email sending timed out after {max_retries} attempts"
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+
+    async def process_batch(self) -> int:
+        async with self.session_factory() as db:
+            rows = (await db.execute(self.claim_query())).scalars().all()
+            if not rows:
+                return 0
+
+            messages = [build_message(row) for row in rows]
+            results = await asyncio.to_thread(self.sender.send_batch, messages)
+
+            now = datetime.utcnow()
+            for row, error in zip(rows, results):
+                row.attempts += 1
+                if error is None:
+                    row.status = EmailStatusEnum.SENT
+                    row.sent_at = now
+                    row.last_error = None
+                    row.body = ""
+                    continue
+
+                row.last_error = f"{type(error).__name__}: {error}"
+                if is_permanent_failure(error) or row.attempts >= self.max_attempts:
+                    row.status = EmailStatusEnum.FAILED
+                    row.body = ""
+                    logger.error(f"Email {row.id} to {row.recipient} failed: {row.last_error}")
+                else:
+                    row.next_attempt_at = now + timedelta(seconds=self.retry_base * 2 ** (row.attempts - 1))
+                    logger.warning(
+                        f"Email {row.id} to {row.recipient} attempt {row.attempts} failed , "
+                        f"retrying at {row.next_attempt_at}"
+                    )
+
+            await db.commit()
+            return len(rows)
+
+    async def purge(self) -> int:
+        """Deletes sent and failed rows older than the retention window"""
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(EmailOutbox).where(
+                    EmailOutbox.status.in_([EmailStatusEnum.SENT, EmailStatusEnum.FAILED]),
+                    EmailOutbox.created_at < cutoff
                 )
-                
-        except Exception as e:
-            logger.error(
-                f"Unexpected error on attempt {attempt}/{max_retries}: "
-                f"{type(e).__name__}: {str(e)}"
             )
-            if attempt < max_retries:
-                await sleep(retry_delay)
-            else:
-                raise EmailException(
-                    f"Unexpected error sending email: {str(e)}"
-                )
-    
-    return False
+            await db.commit()
+            return result.rowcount
+
+
+email_outbox_worker = EmailOutboxWorker()
@@ -0,0 +1,47 @@
+from hashlib import sha256
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str :
+    """Strong validator over `parts` , a response body or the versions it was built from"""
+    digest = sha256()
+    for part in parts :
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(request : Request , etag : str) -> bool :
+    """If-None-Match check , weak comparison as RFC 9110 asks for GET"""
+    header = request.headers.get("if-none-match")
+    if not header :
+        return False
+    if header.strip() == "*" :
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in header.split(","))
+
+
+def not_modified(request : Request , etag : str , cache_control : str) -> Optional[Response] :
+    """The 304 answer when the client already holds `etag` , otherwise None"""
+    if etag_matches(request, etag) :
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
+
+
+def json_bytes_response(request : Request , body : bytes , etag : str , cache_control : str) -> Response :
+    """Serves pre-encoded JSON with its validator , or a bodyless 304 when the client's copy is current"""
+    return not_modified(request, etag, cache_control) or Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
+def set_validators(response : Optional[Response] , etag : str , cache_control : str) :
+    """Adds the validator headers to the response FastAPI builds from a route's return value"""
+    if response is not None :
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = cache_control
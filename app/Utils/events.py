@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Iterable, Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+from app.Utils.database import DB_URL
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+# postgres fans events out to every app worker , memory stays inside this process
+ORDER_EVENTS_TRANSPORT = os.getenv("ORDER_EVENTS_TRANSPORT") or ("memory" if DB_URL.startswith("sqlite") else "postgres")
+ORDER_EVENTS_CHANNEL = os.getenv("ORDER_EVENTS_CHANNEL", "order_events")
+ORDER_EVENTS_QUEUE_SIZE = int(os.getenv("ORDER_EVENTS_QUEUE_SIZE", 100))
+ORDER_EVENTS_HEARTBEAT = float(os.getenv("ORDER_EVENTS_HEARTBEAT", 15))
+ORDER_EVENTS_RECONNECT = float(os.getenv("ORDER_EVENTS_RECONNECT", 2))
+
+
+def principal_keys(vendor_id : Optional[int] = None , seller_id : Optional[int] = None) -> list :
+    """Routing keys of a principal , a vendor user may also own a seller account"""
+    keys = []
+    if vendor_id :
+        keys.append(f"vendor:{vendor_id}")
+    if seller_id :
+        keys.append(f"seller:{seller_id}")
+    return keys
+
+
+def order_event(event_type : str , order) -> dict :
+    return {
+        "type": event_type,
+        "order_id": order.id,
+        "vendor_id": order.vendor_id,
+        "seller_id": order.seller_id,
+        "order_status": order.order_status.value if order.order_status else None,
+        "at": datetime.utcnow().isoformat(),
+        "keys": principal_keys(order.vendor_id, order.seller_id),
+    }
+
+
+class Subscription :
+    """Bounded queue of one open stream , the oldest event is dropped when a client falls behind"""
+
+    def __init__(self, keys : Iterable[str] , maxsize : int = ORDER_EVENTS_QUEUE_SIZE) :
+        self.keys = list(keys)
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event : dict) :
+        if self.queue.full() :
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout : float) -> Optional[dict] :
+        try :
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError :
+            return None
+
+
+class MemoryTransport :
+    """Delivers straight to this process , the stand-in for tests and single worker setups"""
+
+    def __init__(self) :
+        self.deliver = None
+
+    async def start(self, deliver) :
+        self.deliver = deliver
+
+    async def publish(self, payload : str) :
+        if self.deliver is not None :
+            self.deliver(payload)
+
+    async def stop(self) :
+        self.deliver = None
+
+
+class PostgresTransport :
+    """
+    LISTEN/NOTIFY on one dedicated asyncpg connection per worker.
+
+    Every worker hears every notification , including its own , so local
+    subscribers are fed only from the listener. The connection is reopened
+    in the background if it drops ; events sent meanwhile are lost , clients
+    re-sync through the paginated order endpoints.
+    """
+
+    def __init__(self, dsn : str , channel : str = ORDER_EVENTS_CHANNEL) :
+        self.dsn = dsn
+        self.channel = channel
+        self.deliver = None
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    async def start(self, deliver) :
+        self.deliver = deliver
+        self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self) :
+        while True :
+            closed = asyncio.Event()
+            try :
+                connection = await asyncpg.connect(self.dsn)
+                connection.add_termination_listener(lambda _ : closed.set())
+                await connection.add_listener(self.channel, lambda _connection, _pid, _channel, payload : self.deliver(payload))
+                self._connection = connection
+                await closed.wait()
+            except asyncio.CancelledError :
+                raise
+            except Exception :
+                logger.exception("Order event listener failed")
+            finally :
+                self._connection = None
+            await asyncio.sleep(ORDER_EVENTS_RECONNECT)
+
+    async def publish(self, payload : str) :
+        if self._connection is None :
+            logger.warning("Order event dropped , listener connection is not ready")
+            return
+        # asyncpg runs one query at a time per connection
+        async with self._lock :
+            await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def stop(self) :
+        if self._task is not None :
+            self._task.cancel()
+            try :
+                await self._task
+            except asyncio.CancelledError :
+                pass
+            self._task = None
+        if self._connection is not None :
+            await self._connection.close()
+            self._connection = None
+
+
+class OrderEventBroker :
+    """In-process fan-out of order events to the open SSE streams of each principal"""
+
+    def __init__(self, transport) :
+        self.transport = transport
+        self._subscribers = {}
+
+    async def start(self) :
+        await self.transport.start(self._deliver)
+
+    async def stop(self) :
+        await self.transport.stop()
+
+    def subscribe(self, keys : Iterable[str]) -> Subscription :
+        subscription = Subscription(keys)
+        for key in subscription.keys :
+            self._subscribers.setdefault(key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription : Subscription) :
+        for key in subscription.keys :
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None :
+                subscribers.discard(subscription)
+                if not subscribers :
+                    del self._subscribers[key]
+
+    def _deliver(self, payload : str) :
+        event = json.loads(payload)
+        # one copy per stream even when both of its keys match
+        targets = set()
+        for key in event.pop("keys", []) :
+            targets.update(self._subscribers.get(key, ()))
+        for subscription in targets :
+            subscription.put(event)
+
+    async def publish(self, event : dict) :
+        """Call after commit ; a failed publish never fails the request that caused it"""
+        try :
+            await self.transport.publish(json.dumps(event))
+        except Exception :
+            logger.exception("Failed to publish order event")
+
+
+def build_transport(name : str) :
+    if name == "memory" :
+        return MemoryTransport()
+    if name == "postgres" :
+        scheme, sep, rest = DB_URL.partition("://")
+        return PostgresTransport(f"postgresql{sep}{rest}")
+    raise ValueError(f"Unknown ORDER_EVENTS_TRANSPORT {name!r} , expected 'postgres' or 'memory'")
+
+
+order_events = OrderEventBroker(build_transport(ORDER_EVENTS_TRANSPORT))
+
+
+async def stream_order_events(request , keys : Iterable[str]) :
+    """Server-Sent Events for one client , with comment heartbeats so proxies keep the stream open"""
+    subscription = order_events.subscribe(keys)
+    try :
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected() :
+            event = await subscription.get(ORDER_EVENTS_HEARTBEAT)
+            if event is None :
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally :
+        order_events.unsubscribe(subscription)
@@ -0,0 +1,72 @@
+import csv
+import io
+import os
+from datetime import date, datetime
+from enum import Enum
+from typing import AsyncIterator, Iterable, Sequence
+
+from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
+
+from app.Utils.database import AsyncSessions
+from app.Utils.fastjson import dumps
+load_dotenv()
+
+
+# rows fetched per server side cursor round trip , also the rows per written chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+
+class ExportFormat(str, Enum) :
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+async def stream_partitions(statement , batch_size : int = EXPORT_BATCH_SIZE) -> AsyncIterator[Sequence] :
+    """
+    Rows of `statement` in batches of `batch_size` from a server side cursor.
+
+    Runs on its own session : a streamed body outlives the request's session ,
+    which is closed once the route returns. Closing the generator , as
+    happens when the client goes away , closes the cursor and the session.
+    """
+    async with AsyncSessions() as db :
+        result = await db.stream(statement.execution_options(yield_per=batch_size))
+        async for partition in result.partitions() :
+            yield partition
+
+
+def ndjson_chunk(records : Iterable) -> bytes :
+    return b"".join(dumps(record) + b"\n" for record in records)
+
+
+def csv_value(value) :
+    if value is None :
+        return ""
+    if isinstance(value, Enum) :
+        return value.value
+    if isinstance(value, (datetime, date)) :
+        return value.isoformat()
+    return value
+
+
+def csv_chunk(rows : Iterable[Sequence]) -> bytes :
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def export_response(chunks : AsyncIterator[bytes] , export_format : ExportFormat , filename : str) -> StreamingResponse :
+    extension = "ndjson" if export_format == ExportFormat.NDJSON else "csv"
+    return StreamingResponse(
+        chunks ,
+        media_type=MEDIA_TYPES[export_format] ,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    )
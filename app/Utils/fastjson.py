@@ -0,0 +1,89 @@
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from typing import Iterable, Optional, Type
+
+from dotenv import load_dotenv
+from fastapi import Response
+from pydantic import BaseModel
+load_dotenv()
+
+try :
+    import orjson
+except ImportError :
+    orjson = None
+
+
+# off by default , list endpoints then go through response_model validation as before
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def _default(value) :
+    if isinstance(value, Enum) :
+        return value.value
+    if isinstance(value, (datetime, date)) :
+        return value.isoformat()
+    if isinstance(value, Decimal) :
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_stdlib(payload) -> bytes :
+    return json.dumps(payload, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def dumps(payload) -> bytes :
+    """
+    JSON bytes , the same text FastAPI's JSONResponse writes for these types.
+
+    orjson gets the same `default` as the stdlib path , so both accept the
+    same payloads ; scripts/check_json_encoders.py compares their output.
+    """
+    if orjson is not None :
+        return orjson.dumps(payload, default=_default)
+    return dumps_stdlib(payload)
+
+
+class RowSerializer :
+    """
+    Turns SQL result rows straight into the dicts a schema serializes to.
+
+    The dump function is generated once per schema , a dict literal that
+    reads each field from its position in the row , so a page of rows costs
+    one call per row instead of an ORM object , a validation pass and an
+    encoder walk. The row must select `columns` in order ; fields named in
+    `nested` are not read from the row but passed by keyword , already
+    dumped. Values are trusted as the database returns them , nothing is
+    validated.
+    """
+
+    def __init__(self, schema : Type[BaseModel] , nested : Iterable[str] = ()) :
+        self.schema = schema
+        self.nested = tuple(nested)
+        fields = tuple(schema.model_fields)
+        self.columns = tuple(name for name in fields if name not in self.nested)
+
+        items = ", ".join(
+            f"{name!r}: {name}" if name in self.nested else f"{name!r}: row[{self.columns.index(name)}]"
+            for name in fields
+        )
+        params = "".join(f", {name}" for name in self.nested)
+        namespace = {}
+        exec(compile(f"def dump(row{params}):\n    return {{{items}}}\n", f"<{schema.__name__} serializer>", "exec"), namespace)
+        self.dump = namespace["dump"]
+
+    def select_columns(self, model) -> list :
+        """Columns of `model` in the order `dump` reads them"""
+        return [getattr(model, name) for name in self.columns]
+
+
+@lru_cache(maxsize=None)
+def row_serializer(schema : Type[BaseModel] , nested : tuple = ()) -> RowSerializer :
+    return RowSerializer(schema, nested)
+
+
+def json_response(payload , headers : Optional[dict] = None) -> Response :
+    return Response(content=dumps(payload), media_type="application/json", headers=headers)
@@ -1,16 +1,118 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
-from io import BytesIO
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
 from datetime import datetime
+from pathlib import Path
+import asyncio
+import io
+import os
+import zipfile
+from dotenv import load_dotenv
+from pypdf import PdfWriter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-async def generate_invoice_pdf(place_order):
+from app.Seller.models import Product
+from app.Vendor.models import OrderedProductsDetail, PlaceOrder
+load_dotenv()
+
+
+INVOICE_DIR = Path(os.getenv("INVOICE_DIR", "invoices"))
+INVOICE_WORKERS = int(os.getenv("INVOICE_WORKERS", 2))
+
+
+def invoice_orders_query() :
+    return select(PlaceOrder).options(
+        joinedload(PlaceOrder.vendor),
+        joinedload(PlaceOrder.seller),
+        joinedload(PlaceOrder.factory),
+    )
+
+
+async def load_invoice_items(db : AsyncSession , order_ids) :
+    """Line items of many orders in one query , grouped by order id"""
+    items_query = (
+        select(
+            OrderedProductsDetail.order_id,
+            Product.name,
+            OrderedProductsDetail.quantity,
+            OrderedProductsDetail.total_price
+        )
+        .join(Product, OrderedProductsDetail.product == Product.id)
+        .where(OrderedProductsDetail.order_id.in_(order_ids))
+        .order_by(OrderedProductsDetail.id)
+    )
+    items = defaultdict(list)
+    for order_id, name, quantity, total_price in await db.execute(items_query) :
+        items[order_id].append((name, quantity, total_price))
+    return items
+
+
+async def load_invoice_payload(db : AsyncSession , order_id : int) :
     """
-    Takes a PlaceOrder instance and returns a PDF invoice as BytesIO stream.
+    Everything an invoice prints , as plain picklable data.
+
+    Two queries : the order with vendor/seller/factory joined , and its line
+    items joined to product names.
     """
+    order_query = invoice_orders_query().where(PlaceOrder.id == order_id)
+    place_order = (await db.execute(order_query)).scalar_one_or_none()
+    if place_order is None :
+        return None
+
+    items = await load_invoice_items(db , [order_id])
+    return build_invoice_payload(place_order , items[order_id])
+
+
+async def load_invoice_payloads(db : AsyncSession , seller_id : int , start : datetime , end : datetime) :
+    """Invoices of a seller created in [start , end) , still two queries whatever the order count"""
+    order_query = (
+        invoice_orders_query()
+        .where(
+            PlaceOrder.seller_id == seller_id,
+            PlaceOrder.created_at >= start,
+            PlaceOrder.created_at < end
+        )
+        .order_by(PlaceOrder.created_at, PlaceOrder.id)
+    )
+    orders = (await db.execute(order_query)).scalars().all()
+    if not orders :
+        return []
+
+    items = await load_invoice_items(db , [order.id for order in orders])
+    return [build_invoice_payload(order , items[order.id]) for order in orders]
+
+
+def build_invoice_payload(place_order , items) -> dict :
+    return {
+        "id": place_order.id,
+        "vendor_id": place_order.vendor_id,
+        "seller_id": place_order.seller_id,
+        "vendor": place_order.vendor.name,
+        "seller": place_order.seller.email,
+        "factory": place_order.factory.name,
+        "order_status": place_order.order_status.value,
+        "payment_method": place_order.payment_method.value,
+        "order_otp": place_order.order_otp,
+        "delivery_date": place_order.delivery_date,
+        "created_at": place_order.created_at,
+        "updated_at": place_order.updated_at,
+        "product_ammount": place_order.product_ammount,
+        "platform_fee": place_order.platform_fee,
+        "total_amount": place_order.total_amount,
+        "products": [
+            {"name": name, "quantity": quantity, "price": total_price}
+            for name, quantity, total_price in items
+        ],
+    }
 
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
+
+def draw_invoice(c , invoice : dict) :
+    """Draws one invoice onto the canvas , ending with showPage so canvases can hold several"""
     width, height = A4
 
     # Header
@@ -20,23 +122,23 @@ async def generate_invoice_pdf(place_order):
     # Order Info
     c.setFont("Helvetica", 12)
     y = height - 100
-    c.drawString(50, y, f"Order ID: {place_order.id}")
+    c.drawString(50, y, f"Order ID: {invoice['id']}")
     y -= 20
-    c.drawString(50, y, f"Vendor: {place_order.vendor.name}")
+    c.drawString(50, y, f"Vendor: {invoice['vendor']}")
     y -= 20
-    c.drawString(50, y, f"Seller: {place_order.seller.name}")
+    c.drawString(50, y, f"Seller: {invoice['seller']}")
     y -= 20
-    c.drawString(50, y, f"Factory: {place_order.factory.name}")
+    c.drawString(50, y, f"Factory: {invoice['factory']}")
     y -= 20
-    c.drawString(50, y, f"Order Status: {place_order.order_status.value}")
+    c.drawString(50, y, f"Order Status: {invoice['order_status']}")
     y -= 20
-    c.drawString(50, y, f"Payment Method: {place_order.payment_method.value}")
+    c.drawString(50, y, f"Payment Method: {invoice['payment_method']}")
     y -= 20
-    c.drawString(50, y, f"Order OTP: {place_order.order_otp or 'N/A'}")
+    c.drawString(50, y, f"Order OTP: {invoice['order_otp'] or 'N/A'}")
     y -= 20
-    c.drawString(50, y, f"Delivery Date: {place_order.delivery_date.strftime('%Y-%m-%d') if place_order.delivery_date else 'N/A'}")
+    c.drawString(50, y, f"Delivery Date: {invoice['delivery_date'].strftime('%Y-%m-%d') if invoice['delivery_date'] else 'N/A'}")
     y -= 20
-    c.drawString(50, y, f"Created At: {place_order.created_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    c.drawString(50, y, f"Created At: {invoice['created_at'].strftime('%Y-%m-%d %H:%M:%S')}")
 
     # Product Table Header
     y -= 40
@@ -48,33 +150,191 @@ async def generate_invoice_pdf(place_order):
     # Product List
     y -= 20
     c.setFont("Helvetica", 12)
-    for product in place_order.products:
+    for product in invoice["products"]:
         if y < 100:
             c.showPage()
             y = height - 50
+            c.setFont("Helvetica", 12)
 
-        c.drawString(50, y, product.name)
-        c.drawString(250, y, str(product.quantity if hasattr(product, 'quantity') else 1))
-        c.drawString(350, y, f"₹{product.price if hasattr(product, 'price') else 0.0:.2f}")
+        c.drawString(50, y, product["name"])
+        c.drawString(250, y, str(product["quantity"] or 1))
+        c.drawString(350, y, f"₹{product['price'] or 0.0:.2f}")
         y -= 20
 
     # Summary
     y -= 40
     c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, f"Product Amount: ₹{place_order.product_ammount:.2f}")
+    c.drawString(50, y, f"Product Amount: ₹{invoice['product_ammount']:.2f}")
     y -= 20
-    c.drawString(50, y, f"Platform Fee: ₹{place_order.platform_fee:.2f}")
+    c.drawString(50, y, f"Platform Fee: ₹{invoice['platform_fee']:.2f}")
     y -= 20
-    c.drawString(50, y, f"Total Amount: ₹{place_order.total_amount:.2f}")
+    c.drawString(50, y, f"Total Amount: ₹{invoice['total_amount']:.2f}")
 
     # Footer
     y -= 40
     c.setFont("Helvetica-Oblique", 10)
     c.drawString(50, y, "Thank you for your order!")
 
-    # Finalize PDF
     c.showPage()
+
+
+def render_pdf(invoices : list , path : str) -> str :
+    """
+    Runs inside a worker process , draws the invoices as consecutive pages of
+    one PDF. Writes to a temp file and renames so readers never see half a PDF.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    c = canvas.Canvas(tmp_path, pagesize=A4)
+    for invoice in invoices :
+        draw_invoice(c , invoice)
     c.save()
+    os.replace(tmp_path, path)
+    return path
+
+
+def render_invoice_file(invoice : dict , path : str) -> str :
+    return render_pdf([invoice] , path)
+
+
+def merge_pdf_files(paths : list , path : str) -> str :
+    """Runs inside a worker process , concatenates already rendered PDFs page by page"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    writer = PdfWriter()
+    for source in paths :
+        writer.append(source)
+    with open(tmp_path, "wb") as output :
+        writer.write(output)
+    writer.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+class InvoiceRenderer :
+    """
+    Renders invoices in a process pool and keeps them on disk.
+
+    Files are addressed by order id and `updated_at` , so an invoice is only
+    rendered again after its PlaceOrder row changed ; stale versions of the
+    same order are removed once the new one is written.
+    """
 
-    buffer.seek(0)
-    return buffer
+    def __init__(self, directory : Path = INVOICE_DIR , workers : int = INVOICE_WORKERS) :
+        self.directory = directory
+        self.workers = workers
+        self._executor = None
+        self._pending = {}
+
+    def _get_executor(self) :
+        if self._executor is None :
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def path_for(self, invoice : dict) -> Path :
+        version = invoice["updated_at"].isoformat() if invoice["updated_at"] else ""
+        digest = sha256(f"{invoice['id']}:{version}".encode()).hexdigest()[:16]
+        return self.directory / f"invoice_order_{invoice['id']}_{digest}.pdf"
+
+    async def get_or_render(self, invoice : dict) -> Path :
+        path = self.path_for(invoice)
+        if path.exists() :
+            return path
+
+        # concurrent downloads of the same version share one render
+        pending = self._pending.get(path)
+        if pending is None :
+            pending = asyncio.ensure_future(self._render_to(invoice , path))
+            self._pending[path] = pending
+            pending.add_done_callback(lambda _ : self._pending.pop(path, None))
+        return await asyncio.shield(pending)
+
+    async def _render_to(self, invoice : dict , path : Path) -> Path :
+        loop = asyncio.get_running_loop()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        await loop.run_in_executor(self._get_executor(), render_invoice_file, invoice, str(path))
+
+        for stale in self.directory.glob(f"invoice_order_{invoice['id']}_*.pdf") :
+            if stale != path :
+                stale.unlink(missing_ok=True)
+        return path
+
+    async def render_many(self, invoices : list) :
+        """
+        Yields (invoice , path) in order , rendering through the cache in
+        batches that keep every worker busy.
+        """
+        batch_size = self.workers * 2
+        for start in range(0, len(invoices), batch_size) :
+            batch = invoices[start:start + batch_size]
+            paths = await asyncio.gather(*(self.get_or_render(invoice) for invoice in batch))
+            for invoice, path in zip(batch, paths) :
+                yield invoice, path
+
+    async def render_bundle(self, invoices : list) -> Path :
+        """
+        One multi page PDF outside the cache , the caller deletes it once streamed.
+
+        Every invoice is rendered in parallel through the cache , so a bundle
+        reuses the files earlier downloads left behind ; the merge only copies
+        their pages.
+        """
+        paths = [str(path) async for _, path in self.render_many(invoices)]
+        path = self.directory / f"bundle_{os.urandom(8).hex()}.pdf"
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._get_executor(), merge_pdf_files, paths, str(path))
+        return path
+
+    def shutdown(self) :
+        if self._executor is not None :
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+invoice_renderer = InvoiceRenderer()
+
+
+class ZipChunkStream(io.RawIOBase) :
+    """Write only sink for ZipFile , drained after each member so only one PDF is buffered at a time"""
+
+    def __init__(self) :
+        self._chunks = []
+
+    def writable(self) :
+        return True
+
+    def write(self, data) :
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes :
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_invoice_zip(invoices : list) :
+    """
+    Yields a ZIP of invoice PDFs chunk by chunk.
+
+    Invoices are rendered through the cache by `render_many` , and
+    compression runs in a thread so the loop keeps serving requests.
+    """
+    stream = ZipChunkStream()
+    archive = zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED)
+
+    async for invoice, path in invoice_renderer.render_many(invoices) :
+        await asyncio.to_thread(archive.write, path, f"invoice_order_{invoice['id']}.pdf")
+        yield stream.drain()
+
+    await asyncio.to_thread(archive.close)
+    yield stream.drain()
+
+
+async def generate_invoice_pdf(db : AsyncSession , order_id : int) :
+    """
+    Returns the path of the current invoice for an order , rendering it only
+    when the cached file is missing or older than the order row.
+    """
+    invoice = await load_invoice_payload(db , order_id)
+    if invoice is None :
+        return None
+    return await invoice_renderer.get_or_render(invoice)
@@ -0,0 +1,73 @@
+from math import asin, cos, radians, sin, sqrt
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {char: index for index, char in enumerate(_BASE32)}
+
+
+def haversine_km(lat1 : float, lon1 : float, lat2 : float, lon2 : float) -> float :
+    """Great circle distance in kilometres between two WGS84 points"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def geohash_encode(latitude : float, longitude : float, precision : int = 6) -> str :
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits, bit_count, even = 0, 0, True
+
+    while len(geohash) < precision :
+        value, span = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (span[0] + span[1]) / 2
+        bits <<= 1
+        if value >= mid :
+            bits |= 1
+            span[0] = mid
+        else :
+            span[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5 :
+            geohash.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return "".join(geohash)
+
+
+def geohash_decode(geohash : str) :
+    """Returns (latitude, longitude, latitude_error, longitude_error) of the tile centre"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash :
+        value = _BASE32_INDEX[char]
+        for shift in range(4, -1, -1) :
+            span = lon_range if even else lat_range
+            mid = (span[0] + span[1]) / 2
+            if (value >> shift) & 1 :
+                span[0] = mid
+            else :
+                span[1] = mid
+            even = not even
+
+    latitude = (lat_range[0] + lat_range[1]) / 2
+    longitude = (lon_range[0] + lon_range[1]) / 2
+    return latitude, longitude, (lat_range[1] - lat_range[0]) / 2, (lon_range[1] - lon_range[0]) / 2
+
+
+def haversine_km_array(latitude : float, longitude : float, latitudes_rad, longitudes_rad) :
+    """Vectorized haversine from one point to numpy arrays of points given in radians"""
+    lat, lon = radians(latitude), radians(longitude)
+    a = (
+        np.sin((latitudes_rad - lat) / 2) ** 2
+        + cos(lat) * np.cos(latitudes_rad) * np.sin((longitudes_rad - lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
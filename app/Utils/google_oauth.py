@@ -0,0 +1,195 @@
+import asyncio
+import re
+import time
+import os
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from jose import jwt
+from jose.exceptions import JWTError
+load_dotenv()
+
+
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
+# point at a local stub server to exercise the flow offline
+GOOGLE_DISCOVERY_URL = os.getenv("GOOGLE_DISCOVERY_URL", "https://accounts.google.com/.well-known/openid-configuration")
+
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", 10))
+GOOGLE_HTTP_CONNECT_TIMEOUT = float(os.getenv("GOOGLE_HTTP_CONNECT_TIMEOUT", 3))
+GOOGLE_HTTP_MAX_CONNECTIONS = int(os.getenv("GOOGLE_HTTP_MAX_CONNECTIONS", 20))
+GOOGLE_HTTP_KEEPALIVE = int(os.getenv("GOOGLE_HTTP_KEEPALIVE", 10))
+GOOGLE_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GOOGLE_HTTP_KEEPALIVE_EXPIRY", 60))
+
+# used when the response carries no Cache-Control max-age
+GOOGLE_DOCUMENT_TTL = int(os.getenv("GOOGLE_DOCUMENT_TTL", 3600))
+# an unknown `kid` forces a JWKS refetch at most this often
+GOOGLE_JWKS_MIN_REFRESH = int(os.getenv("GOOGLE_JWKS_MIN_REFRESH", 60))
+
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+# Google signs ID tokens with RS256 only
+GOOGLE_ID_TOKEN_ALGORITHMS = ["RS256"]
+
+
+class GoogleOAuthError(Exception):
+    """Token exchange or ID token verification failed"""
+    pass
+
+
+def max_age(response : httpx.Response , default : int) -> int :
+    match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+    return int(match.group(1)) if match else default
+
+
+class CachedDocument :
+    """A JSON document kept until its Cache-Control max-age runs out"""
+
+    def __init__(self) :
+        self.value = None
+        self.expires_at = 0.0
+        self.fetched_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def fresh(self) -> bool :
+        return self.value is not None and time.monotonic() < self.expires_at
+
+    def store(self, response : httpx.Response) :
+        now = time.monotonic()
+        self.value = response.json()
+        self.fetched_at = now
+        self.expires_at = now + max_age(response, GOOGLE_DOCUMENT_TTL)
+
+
+class GoogleOAuthClient :
+    """
+    Google sign in over one pooled , keep-alive HTTP client.
+
+    The discovery document and JWKS are cached for as long as Google's
+    Cache-Control allows , so a login costs a single token exchange and the
+    returned ID token is verified locally instead of calling userinfo.
+    """
+
+    def __init__(
+        self,
+        discovery_url : str = GOOGLE_DISCOVERY_URL,
+        client_id : Optional[str] = GOOGLE_CLIENT_ID,
+        client_secret : Optional[str] = GOOGLE_CLIENT_SECRET,
+        redirect_uri : Optional[str] = GOOGLE_REDIRECT_URI,
+        issuers : tuple = GOOGLE_ISSUERS
+    ) :
+        self.discovery_url = discovery_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.issuers = issuers
+        self._client = None
+        self._discovery = CachedDocument()
+        self._jwks = CachedDocument()
+
+    @property
+    def client(self) -> httpx.AsyncClient :
+        if self._client is None :
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(GOOGLE_HTTP_TIMEOUT, connect=GOOGLE_HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=GOOGLE_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=GOOGLE_HTTP_KEEPALIVE,
+                    keepalive_expiry=GOOGLE_HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._client
+
+    async def _fetch(self, document : CachedDocument , url : str , force : bool = False) -> dict :
+        if document.fresh() and not force :
+            return document.value
+
+        # one fetch per expiry , concurrent logins wait for it
+        async with document.lock :
+            if document.fresh() and not force :
+                return document.value
+            response = await self.client.get(url)
+            response.raise_for_status()
+            document.store(response)
+            return document.value
+
+    async def discovery(self) -> dict :
+        return await self._fetch(self._discovery, self.discovery_url)
+
+    async def jwks(self, force : bool = False) -> dict :
+        config = await self.discovery()
+        return await self._fetch(self._jwks, config["jwks_uri"], force=force)
+
+    async def signing_key(self, kid : str) -> dict :
+        keys = {key["kid"]: key for key in (await self.jwks())["keys"]}
+        if kid not in keys and time.monotonic() - self._jwks.fetched_at >= GOOGLE_JWKS_MIN_REFRESH :
+            # Google rotated its keys before our copy expired
+            keys = {key["kid"]: key for key in (await self.jwks(force=True))["keys"]}
+
+        if kid not in keys :
+            raise GoogleOAuthError("ID token signed with an unknown key")
+        return keys[kid]
+
+    async def exchange_code(self, code : str) -> dict :
+        config = await self.discovery()
+        response = await self.client.post(config["token_endpoint"], data={
+            "code": code,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "redirect_uri": self.redirect_uri,
+            "grant_type": "authorization_code"
+        })
+        if response.is_error :
+            raise GoogleOAuthError("Token exchange failed")
+        return response.json()
+
+    async def verify_id_token(self, id_token : str , access_token : Optional[str] = None) -> dict :
+        """Checks signature , audience , issuer and expiry against the cached JWKS"""
+        try :
+            header = jwt.get_unverified_header(id_token)
+            key = await self.signing_key(header.get("kid"))
+            claims = jwt.decode(
+                id_token,
+                key,
+                # pinned , the token's own header never picks how it is verified
+                algorithms=GOOGLE_ID_TOKEN_ALGORITHMS,
+                audience=self.client_id,
+                access_token=access_token,
+            )
+        except JWTError as error :
+            raise GoogleOAuthError(f"Invalid ID token: {error}")
+
+        if claims.get("iss") not in self.issuers :
+            raise GoogleOAuthError("Invalid ID token issuer")
+        return claims
+
+    async def userinfo(self, access_token : str) -> dict :
+        """Fallback for token responses without an ID token"""
+        config = await self.discovery()
+        response = await self.client.get(
+            config["userinfo_endpoint"],
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+        if response.is_error :
+            raise GoogleOAuthError("Failed to fetch user info")
+        return response.json()
+
+    async def authenticate(self, code : str) -> dict :
+        tokens = await self.exchange_code(code)
+        access_token = tokens.get("access_token")
+        if not access_token :
+            raise GoogleOAuthError("No access token")
+
+        id_token = tokens.get("id_token")
+        if id_token :
+            return await self.verify_id_token(id_token, access_token)
+        return await self.userinfo(access_token)
+
+    async def aclose(self) :
+        if self._client is not None :
+            await self._client.aclose()
+            self._client = None
+
+
+google_oauth = GoogleOAuthClient()
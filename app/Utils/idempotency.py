@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Utils.cache import TTLCache
+from app.Vendor.models import IdempotencyKey
+load_dotenv()
+
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 24 * 3600))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 4096))
+IDEMPOTENCY_CACHE_TTL = float(os.getenv("IDEMPOTENCY_CACHE_TTL", 600))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def hash_key(vendor_id : int , key : str) -> str :
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH :
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+        )
+    return sha256(f"{vendor_id}:{key}".encode()).hexdigest()
+
+
+def hash_request(payload) -> str :
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return sha256(canonical.encode()).hexdigest()
+
+
+def replay_response(status_code : int , body) -> JSONResponse :
+    return JSONResponse(content=body, status_code=status_code, headers={"Idempotent-Replayed": "true"})
+
+
+class IdempotencyStore :
+    """
+    Stored responses of idempotent requests.
+
+    Hits are served from an in-process cache , misses cost one primary key
+    lookup. The row is written in the same transaction as the work it
+    describes , so a concurrent retry either sees it or collides on the key.
+    """
+
+    def __init__(self, cache_size : int = IDEMPOTENCY_CACHE_SIZE , cache_ttl : float = IDEMPOTENCY_CACHE_TTL) :
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    @staticmethod
+    def check(request_hash : str , stored_hash : str) :
+        if request_hash != stored_hash :
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request"
+            )
+
+    async def lookup(self, db : AsyncSession , key_hash : str , request_hash : str) -> Optional[JSONResponse] :
+        cached = self.cache.get(key_hash)
+        if cached is not None :
+            stored_hash, status_code, body = cached
+            self.check(request_hash, stored_hash)
+            return replay_response(status_code, body)
+
+        row = await db.get(IdempotencyKey, key_hash)
+        if row is None :
+            return None
+
+        if row.expires_at <= datetime.utcnow() :
+            # expired , the key may be used again
+            await db.execute(delete(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash))
+            return None
+
+        self.check(request_hash, row.request_hash)
+        self.cache.set(key_hash, (row.request_hash, row.status_code, row.response))
+        return replay_response(row.status_code, row.response)
+
+    def save(self, db : AsyncSession , key_hash : str , vendor_id : int , request_hash : str , status_code : int , body) :
+        """Adds the row to the caller's transaction , call `remember` once it committed"""
+        db.add(IdempotencyKey(
+            key_hash=key_hash,
+            vendor_id=vendor_id,
+            request_hash=request_hash,
+            status_code=status_code,
+            response=jsonable_encoder(body),
+            expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL),
+        ))
+
+    def remember(self, key_hash : str , request_hash : str , status_code : int , body) :
+        self.cache.set(key_hash, (request_hash, status_code, jsonable_encoder(body)))
+
+
+idempotency_store = IdempotencyStore()
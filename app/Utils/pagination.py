@@ -0,0 +1,146 @@
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+load_dotenv()
+
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 20))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 100))
+# created_at is set at INSERT , an order committing late can land behind a feed cursor by up to this much
+FEED_LOOKBACK_SECONDS = float(os.getenv("FEED_LOOKBACK_SECONDS", 60))
+
+
+def _encode(parts : list) -> str :
+    raw = json.dumps(parts, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor : str) -> list :
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    return json.loads(raw)
+
+
+def encode_cursor(created_at : datetime , row_id : int) -> str :
+    """Opaque position of a row in a (created_at , id) ordering"""
+    return _encode([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor : str) -> tuple :
+    try :
+        created_at, row_id = _decode(cursor)[:2]
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) :
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def encode_feed_cursor(created_at : datetime , row_id : int , seen : Dict[int, datetime]) -> str :
+    """
+    A position plus the ids already delivered inside the lookback window behind it.
+
+    Ids older than the window are dropped , their age is kept in whole
+    seconds before the position so the cursor stays small.
+    """
+    window_start = created_at - timedelta(seconds=FEED_LOOKBACK_SECONDS)
+    recent = [
+        [seen_id, int((created_at - seen_at).total_seconds())]
+        for seen_id, seen_at in sorted(seen.items())
+        if seen_at >= window_start
+    ]
+    return _encode([created_at.isoformat(), row_id, recent])
+
+
+def decode_feed_cursor(cursor : str) -> tuple :
+    """(created_at , id , {seen id: approximate created_at}) , plain cursors decode with nothing seen"""
+    try :
+        parts = _decode(cursor)
+        created_at, row_id = datetime.fromisoformat(parts[0]), int(parts[1])
+        recent = parts[2] if len(parts) > 2 else []
+        seen = {int(seen_id): created_at - timedelta(seconds=age) for seen_id, age in recent}
+        return created_at, row_id, seen
+    except (ValueError, TypeError, IndexError) :
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def feed_page(query , created_column , id_column , since : str , limit : int) :
+    """
+    Orders after `since` , oldest first , re-reading FEED_LOOKBACK_SECONDS behind it.
+
+    An order whose transaction commits after a newer one was already
+    delivered has a position behind the cursor ; the lookback window picks
+    it up and the ids carried in the cursor keep delivered orders out.
+    Fetches one extra row like `keyset_page`.
+    """
+    created_at, _, seen = decode_feed_cursor(since)
+    query = query.where(created_column >= created_at - timedelta(seconds=FEED_LOOKBACK_SECONDS))
+    if seen :
+        query = query.where(id_column.not_in(list(seen)))
+    return query.order_by(created_column.asc(), id_column.asc()).limit(limit + 1)
+
+
+def feed_result(rows : list , limit : int , since : str) -> tuple :
+    """Trims the look ahead row , returns (rows , next feed cursor , has_more)"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    created_at, row_id, seen = decode_feed_cursor(since)
+    for row in rows :
+        seen[row.id] = row.created_at
+        # late orders sit behind the cursor , it never moves back
+        if (row.created_at, row.id) > (created_at, row_id) :
+            created_at, row_id = row.created_at, row.id
+    return rows, encode_feed_cursor(created_at, row_id, seen), has_more
+
+
+def feed_window(query , created_column , newest_created_at : datetime) :
+    """Narrows `query` to the lookback window behind the newest row of a first page"""
+    return query.where(created_column >= newest_created_at - timedelta(seconds=FEED_LOOKBACK_SECONDS))
+
+
+def latest_feed_cursor(rows : Iterable , window : Iterable = ()) -> str :
+    """
+    Feed cursor for the newest first page , its rows count as delivered.
+
+    When the page is full pass `window` , the (id , created_at) of every row
+    `feed_window` finds ; the ones that did not fit on the page are reached
+    by paging back , so the first poll must not re-send them either. An
+    empty page starts the feed at the current time with nothing seen.
+    """
+    rows = list(rows)
+    if not rows :
+        return encode_feed_cursor(datetime.utcnow(), 0, {})
+    newest = max(rows, key=lambda row: (row.created_at, row.id))
+    seen = {row_id: created_at for row_id, created_at in window}
+    seen.update({row.id: row.created_at for row in rows})
+    return encode_feed_cursor(newest.created_at, newest.id, seen)
+
+
+def keyset_page(query , created_column , id_column , cursor : Optional[str] , limit : int , newest_first : bool = True) :
+    """
+    Orders `query` by (created_at , id) and starts it right after `cursor`.
+
+    One extra row is fetched so the caller can tell whether a next page exists
+    without a COUNT ; pass the rows to `page_result`.
+    """
+    position = tuple_(created_column, id_column)
+    if cursor :
+        after = tuple_(*decode_cursor(cursor))
+        query = query.where(position < after if newest_first else position > after)
+
+    if newest_first :
+        query = query.order_by(created_column.desc(), id_column.desc())
+    else :
+        query = query.order_by(created_column.asc(), id_column.asc())
+    return query.limit(limit + 1)
+
+
+def page_result(rows : list , limit : int) -> tuple :
+    """Trims the look ahead row , returns (rows , cursor of the last row or None)"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return rows, next_cursor
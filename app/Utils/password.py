@@ -0,0 +1,78 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+
+import bcrypt
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+load_dotenv()
+
+
+# bcrypt costs ~250ms of CPU per call , so it never runs on the event loop
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")   # thread | process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 32))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# module level so they can be pickled into a process pool
+def _hash(password : str) -> str :
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def _verify(plain_password : str , hashed_password : str) -> bool :
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher :
+    """
+    Bounded executor for password hashing.
+
+    At most `workers` hashes run at once and `queue_limit` more may wait ;
+    beyond that callers get a 503 instead of piling up behind a login burst.
+    """
+
+    def __init__(self, kind : str = PASSWORD_HASH_EXECUTOR, workers : int = PASSWORD_HASH_WORKERS, queue_limit : int = PASSWORD_HASH_QUEUE_LIMIT) :
+        self.kind = kind
+        self.workers = workers
+        self.capacity = workers + queue_limit
+        self._executor = None
+        self._in_flight = 0
+
+    def _get_executor(self) :
+        if self._executor is None :
+            if self.kind == "process" :
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else :
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, func, *args) :
+        if self._in_flight >= self.capacity :
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy , please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        self._in_flight += 1
+        try :
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally :
+            self._in_flight -= 1
+
+    async def hash(self, password : str) -> str :
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password : str , hashed_password : str) -> bool :
+        return await self._run(_verify, plain_password, hashed_password)
+
+    def shutdown(self) :
+        if self._executor is not None :
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from urllib.parse import unquote, urlparse
+
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+# "memory" keeps responses in this process , "redis" shares them between workers , "none" turns caching off
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 600))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+RESPONSE_CACHE_REDIS_POOL = int(os.getenv("RESPONSE_CACHE_REDIS_POOL", 8))
+RESPONSE_CACHE_REDIS_TIMEOUT = float(os.getenv("RESPONSE_CACHE_REDIS_TIMEOUT", 0.5))
+
+
+class MemoryBackend :
+    """
+    In-process LRU of encoded responses , bounded by the bytes it holds.
+
+    Sized on the values rather than the entry count , one large catalog
+    page should not be able to push the process over its memory budget.
+    """
+
+    def __init__(self, max_bytes : int = RESPONSE_CACHE_MAX_BYTES) :
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+
+    async def get(self, key : str) -> Optional[bytes] :
+        entry = self._data.get(key)
+        if entry is None :
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic() :
+            self._discard(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key : str , value : bytes , ttl : float) :
+        self._discard(key)
+        if len(value) > self.max_bytes :
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self.size += len(value)
+        while self.size > self.max_bytes :
+            oldest = next(iter(self._data))
+            self._discard(oldest)
+
+    def _discard(self, key : str) :
+        entry = self._data.pop(key, None)
+        if entry is not None :
+            self.size -= len(entry[1])
+
+    async def aclose(self) :
+        self._data.clear()
+        self.size = 0
+
+
+class RedisError(Exception) :
+    """Error reply from the server"""
+
+
+class RedisBackend :
+    """
+    Responses shared through any server speaking the Redis protocol (RESP2).
+
+    Only GET and SET EX are needed , so it talks the protocol directly over a
+    small pool of asyncio connections. The cache is best effort : a slow or
+    unreachable server is logged and read as a miss , it never fails the
+    request. A connection that errors or is cancelled mid reply is closed ,
+    so a half read answer can never be handed to the next command.
+    """
+
+    def __init__(self, url : str = RESPONSE_CACHE_REDIS_URL , pool_size : int = RESPONSE_CACHE_REDIS_POOL , timeout : float = RESPONSE_CACHE_REDIS_TIMEOUT) :
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle = []
+
+    @staticmethod
+    def encode(*args) -> bytes :
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args :
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    @classmethod
+    async def read_reply(cls, reader : asyncio.StreamReader) :
+        line = await reader.readline()
+        if not line.endswith(b"\r\n") :
+            raise ConnectionError("Connection closed by the cache server")
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b"+" :
+            return rest
+        if prefix == b"-" :
+            raise RedisError(rest.decode(errors="replace"))
+        if prefix == b":" :
+            return int(rest)
+        if prefix == b"$" :
+            length = int(rest)
+            if length < 0 :
+                return None
+            return (await reader.readexactly(length + 2))[:-2]
+        if prefix == b"*" :
+            count = int(rest)
+            if count < 0 :
+                return None
+            return [await cls.read_reply(reader) for _ in range(count)]
+        raise ConnectionError(f"Unexpected reply from the cache server: {line[:32]!r}")
+
+    async def _call(self, connection , *args) :
+        reader, writer = connection
+        writer.write(self.encode(*args))
+        await writer.drain()
+        return await self.read_reply(reader)
+
+    async def _connect(self) :
+        connection = await asyncio.open_connection(self.host, self.port)
+        if self.password :
+            await self._call(connection, "AUTH", self.password)
+        if self.db :
+            await self._call(connection, "SELECT", self.db)
+        return connection
+
+    async def execute(self, *args) :
+        async with self._slots :
+            connection = self._idle.pop() if self._idle else None
+            try :
+                if connection is None :
+                    connection = await asyncio.wait_for(self._connect(), self.timeout)
+                reply = await asyncio.wait_for(self._call(connection, *args), self.timeout)
+            except BaseException :
+                if connection is not None :
+                    connection[1].close()
+                raise
+            self._idle.append(connection)
+            return reply
+
+    async def get(self, key : str) -> Optional[bytes] :
+        try :
+            return await self.execute("GET", key)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, RedisError) as error :
+            logger.warning("Response cache GET failed , serving a miss: %s", error)
+            return None
+
+    async def set(self, key : str , value : bytes , ttl : float) :
+        try :
+            await self.execute("SET", key, value, "EX", max(1, int(ttl)))
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, RedisError) as error :
+            logger.warning("Response cache SET failed: %s", error)
+
+    async def aclose(self) :
+        while self._idle :
+            reader, writer = self._idle.pop()
+            writer.close()
+
+
+class NullBackend :
+    async def get(self, key : str) -> Optional[bytes] :
+        return None
+
+    async def set(self, key : str , value : bytes , ttl : float) :
+        pass
+
+    async def aclose(self) :
+        pass
+
+
+class SingleFlight :
+    """Concurrent loads of one key share a single call , the rest await its result"""
+
+    def __init__(self) :
+        self._calls = {}
+
+    async def do(self, key : str , load : Callable[[], Awaitable]) :
+        call = self._calls.get(key)
+        if call is None :
+            # a task , so a waiter that gives up does not cancel the load for the others
+            call = asyncio.ensure_future(load())
+            self._calls[key] = call
+            call.add_done_callback(lambda _ : self._calls.pop(key, None))
+        return await asyncio.shield(call)
+
+
+class ResponseCache :
+    """
+    Read-through cache of encoded responses.
+
+    Keys carry the version of the data they were built from , so a write
+    that bumps the version makes readers miss and old entries simply age
+    out ; nothing is ever deleted. A miss is loaded once per process no
+    matter how many requests for the key arrive while it runs.
+    """
+
+    def __init__(self, backend , ttl : float = RESPONSE_CACHE_TTL) :
+        self.backend = backend
+        self.ttl = ttl
+        self.flights = SingleFlight()
+
+    async def get_or_load(self, key : str , load : Callable[[], Awaitable[bytes]]) -> bytes :
+        cached = await self.backend.get(key)
+        if cached is not None :
+            return cached
+
+        async def load_and_store() :
+            value = await load()
+            await self.backend.set(key, value, self.ttl)
+            return value
+
+        return await self.flights.do(key, load_and_store)
+
+    async def aclose(self) :
+        await self.backend.aclose()
+
+
+def build_backend(name : str) :
+    if name == "memory" :
+        return MemoryBackend()
+    if name == "redis" :
+        return RedisBackend()
+    if name == "none" :
+        return NullBackend()
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {name!r} , expected 'memory' , 'redis' or 'none'")
+
+
+response_cache = ResponseCache(build_backend(RESPONSE_CACHE_BACKEND))
@@ -0,0 +1,90 @@
+import os
+from datetime import datetime
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Vendor.models import OrderStatusEnum, OrderStatusEvent, PlaceOrder
+load_dotenv()
+
+
+ORDER_TRANSITION_RETRIES = int(os.getenv("ORDER_TRANSITION_RETRIES", 3))
+
+# every status an order may move to from each status , anything else is refused
+TRANSITIONS = {
+    OrderStatusEnum.PLACED: frozenset({OrderStatusEnum.CONFIRMED, OrderStatusEnum.CANCELLED}),
+    OrderStatusEnum.CONFIRMED: frozenset({OrderStatusEnum.SHIPPED, OrderStatusEnum.CANCELLED}),
+    OrderStatusEnum.SHIPPED: frozenset({OrderStatusEnum.DELIVERED}),
+    OrderStatusEnum.DELIVERED: frozenset(),
+    OrderStatusEnum.CANCELLED: frozenset(),
+}
+
+
+def can_transition(from_status : OrderStatusEnum , to_status : OrderStatusEnum) -> bool :
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def record_event(db : AsyncSession , order_id : int , from_status : Optional[OrderStatusEnum] , to_status : OrderStatusEnum , actor : Optional[str] = None) :
+    """Adds the history row to the caller's transaction , it commits or rolls back with the change"""
+    db.add(OrderStatusEvent(
+        order_id=order_id,
+        from_status=from_status,
+        to_status=to_status,
+        actor=actor,
+    ))
+
+
+async def transition(
+    db : AsyncSession ,
+    order_id : int ,
+    to_status : OrderStatusEnum ,
+    *criteria ,
+    from_statuses : Optional[Iterable[OrderStatusEnum]] = None ,
+    actor : Optional[str] = None ,
+    **values
+) :
+    """
+    Moves an order to `to_status` and logs the change , in the caller's transaction.
+
+    The status read first is repeated in the UPDATE as `order_status =
+    :expected` , so a concurrent change makes the UPDATE match nothing
+    instead of being overwritten ; the new status is then checked again
+    against the machine. `criteria` scope the order to its owner ,
+    `from_statuses` narrows the statuses this caller may move it from and
+    `values` are extra columns written with the status.
+
+    Returns the (id , vendor_id , seller_id , order_status) row. Raises 404
+    when no order matches and 409 when the move is not allowed.
+    """
+    allowed = set(from_statuses) if from_statuses is not None else set(TRANSITIONS)
+    for _ in range(ORDER_TRANSITION_RETRIES) :
+        current = (await db.execute(
+            select(PlaceOrder.order_status).where(PlaceOrder.id == order_id, *criteria)
+        )).scalar_one_or_none()
+        if current is None :
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order Not Found")
+        if current not in allowed or not can_transition(current, to_status) :
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Order cannot move from {current.value} to {to_status.value}"
+            )
+
+        moved = (
+            update(PlaceOrder)
+            .where(PlaceOrder.id == order_id, PlaceOrder.order_status == current)
+            .values(order_status=to_status, updated_at=datetime.utcnow(), **values)
+            .returning(PlaceOrder.id, PlaceOrder.vendor_id, PlaceOrder.seller_id, PlaceOrder.order_status)
+            .execution_options(synchronize_session=False)
+        )
+        row = (await db.execute(moved)).first()
+        if row is not None :
+            record_event(db, order_id, current, to_status, actor)
+            return row
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Order status changed concurrently , try again"
+    )
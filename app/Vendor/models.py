@@ -1,5 +1,5 @@
 from enum import Enum
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Table , Enum as SqlEnum
+from sqlalchemy import JSON, Boolean, Column, Index, Integer, String, Float, ForeignKey, DateTime, Table, Text , Enum as SqlEnum
 from sqlalchemy.orm import relationship
 from app.Utils.database import Base
 from datetime import datetime
@@ -93,6 +93,13 @@ class PlaceOrder(Base):
     # Many-to-many relationship with OrderedProductsDetail
     ordered_products = relationship("OrderedProductsDetail", back_populates="order")
 
+    __table_args__ = (
+        # vendor order history , newest first with id as tie breaker for keyset pages
+        Index("ix_placeorder_vendor_created", vendor_id, created_at.desc(), id.desc()),
+        # incoming order feed of a seller , filtered by status
+        Index("ix_placeorder_seller_status_created", seller_id, order_status, created_at, id),
+    )
+
 
 class OrderedProductsDetail(Base):
     __tablename__ = "product_detail"
@@ -107,3 +114,66 @@ class OrderedProductsDetail(Base):
     
     # Back reference to PlaceOrder
     order = relationship("PlaceOrder", back_populates="ordered_products")
+
+
+class OrderStatusEvent(Base):
+    """Append-only history of order status changes , consumers read it in id order"""
+    __tablename__ = "order_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("placeorder.id"), nullable=False)
+    # None for the event that created the order
+    from_status = Column(SqlEnum(OrderStatusEnum), nullable=True)
+    to_status = Column(SqlEnum(OrderStatusEnum), nullable=False)
+    # principal key of who made the change , e.g. "vendor:3" or "seller:7"
+    actor = Column(String(32), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # history of one order
+        Index("ix_order_events_order", order_id, id),
+    )
+
+
+class IdempotencyKey(Base):
+    """Response of a request made with an Idempotency-Key , replayed to retries until it expires"""
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of principal and client key , the raw key is never stored
+    key_hash = Column(String(64), primary_key=True)
+    vendor_id = Column(Integer, nullable=False)
+    # sha256 of the request body , a reused key with another body is refused
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class EmailStatusEnum(str, Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class EmailOutbox(Base):
+    """One row per recipient , written in the same transaction as the change that triggers the mail"""
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    is_html = Column(Boolean, default=False, nullable=False)
+
+    status = Column(SqlEnum(EmailStatusEnum), default=EmailStatusEnum.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
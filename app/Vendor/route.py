@@ -1,8 +1,11 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from datetime import date
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.Utils.authservice import get_current_user
 from app.Utils.database import get_db
+from app.Utils.export import ExportFormat
+from app.Utils.pagination import MAX_PAGE_SIZE, PAGE_SIZE
 from app.Vendor.schema import *
 from app.Vendor.service import VendorAuthService, VendorOrderService, VendorService
 
@@ -10,27 +13,27 @@ vendor_router = APIRouter()
 
 
 @vendor_router.post("/create", status_code=status.HTTP_201_CREATED)
-async def create_vendor(response : Response , vendor: VendorUserCreate, db: Session = Depends(get_db)):
+async def create_vendor(response : Response , vendor: VendorUserCreate, db: AsyncSession = Depends(get_db)):
     return await VendorService.create_vendor_user(db, vendor , response)
 
 @vendor_router.post("/location/create", status_code=status.HTTP_201_CREATED)
-async def create_location(location: VendorLocationCreate, db: Session = Depends(get_db) , vendor = Depends(get_current_user)):
+async def create_location(location: VendorLocationCreate, db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
     return await VendorService.create_vendor_location(db, location , vendor)
 
 @vendor_router.get("/locations/", status_code=status.HTTP_200_OK , response_model=List[VendorShopLocationResponse])
-async def get_locations(db: Session = Depends(get_db) , vendor = Depends(get_current_user)):
+async def get_locations(db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
     return await VendorService.get_vendor_locations(db , vendor)
 
 @vendor_router.post("/shop/create", status_code=status.HTTP_201_CREATED)
-async def create_shop(shop: VendorShopCreate, db: Session = Depends(get_db) ,  vendor = Depends(get_current_user)):
+async def create_shop(shop: VendorShopCreate, db: AsyncSession = Depends(get_db) ,  vendor = Depends(get_current_user)):
     return await VendorService.save_vendor_shop_details(db, shop , vendor)
 
 @vendor_router.get("/profile/", response_model=VendorUserResponse)
-async def get_profile(db: Session = Depends(get_db) , vendor = Depends(get_current_user)):
+async def get_profile(db: AsyncSession = Depends(get_db) , vendor = Depends(get_current_user)):
     return await VendorService.vendor_profile(db, vendor)
 
 @vendor_router.post("/login", status_code=status.HTTP_200_OK)
-async def login_vendor(response : Response , form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_vendor(response : Response , form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     return await VendorAuthService.authenticate_user(db, form_data.username, form_data.password , response)
 
 @vendor_router.post("/oauth/login", status_code=status.HTTP_200_OK)
@@ -42,26 +45,60 @@ async def get_profile(response : Response):
     return await VendorAuthService.logout(response)
 
 @vendor_router.get("/vendor-status/")
-async def get_vendor_status(request : Request , db: Session = Depends(get_db)):
+async def get_vendor_status(request : Request , db: AsyncSession = Depends(get_db)):
     return await VendorAuthService.vendor_status(db , request)
 
-@vendor_router.post("/placeorder/")
-async def place_order(order: CreateOrderSchema,  db: Session = Depends(get_db),  vendor = Depends(get_current_user)):
-    return await VendorOrderService.place_order(order, db, vendor)
+@vendor_router.post("/placeorder/", response_model=PlaceOrderSchema)
+async def place_order(
+    order: CreateOrderSchema,
+    db: AsyncSession = Depends(get_db),
+    vendor = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description="Retries with the same key return the first response")
+):
+    return await VendorOrderService.place_order(order, db, vendor, idempotency_key)
 
-@vendor_router.get("/orders/", response_model=List[PlaceOrderSchema])
+@vendor_router.get("/orders/", response_model=PlaceOrderPageSchema)
 async def get_my_orders(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    vendor = Depends(get_current_user),
+    order_status: Optional[OrderStatusEnum] = Query(None, description="Filter by order status"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Orders per page"),
+    start_date: Optional[date] = Query(None, description="Orders created on or after this day"),
+    end_date: Optional[date] = Query(None, description="Orders created on or before this day"),
+    seller_id: Optional[int] = Query(None, description="Only orders placed with this seller")
+):
+    return await VendorOrderService.get_vendor_orders(db, vendor, order_status, cursor, limit, start_date, end_date, seller_id)
+
+@vendor_router.get("/orders/export/", status_code=200)
+async def export_my_orders(
     vendor = Depends(get_current_user),
-    order_status: Optional[OrderStatusEnum] = Query(None, description="Filter by order status")
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    order_status: Optional[OrderStatusEnum] = Query(None, description="Filter by order status"),
+    start_date: Optional[date] = Query(None, description="Orders created on or after this day"),
+    end_date: Optional[date] = Query(None, description="Orders created on or before this day"),
+    seller_id: Optional[int] = Query(None, description="Only orders placed with this seller")
 ):
-    return await VendorOrderService.get_vendor_orders(db, vendor, order_status)
+    return await VendorOrderService.export_vendor_orders(vendor, export_format, order_status, start_date, end_date, seller_id)
+
+@vendor_router.post("/orders/{order_id}/cancel/", status_code=200)
+async def cancel_order(order_id: int, db: AsyncSession = Depends(get_db), vendor = Depends(get_current_user)):
+    return await VendorOrderService.cancel_order(db, order_id, vendor)
+
+# live order events of the logged in vendor and its seller account
+@vendor_router.get("/events/")
+async def order_event_stream(request : Request , vendor = Depends(get_current_user)):
+    return await VendorOrderService.order_event_stream(request, vendor)
+
+@vendor_router.get("/orders/{order_id}/invoice/")
+async def download_order_invoice(order_id: int, db: AsyncSession = Depends(get_db), vendor = Depends(get_current_user)):
+    return await VendorOrderService.get_order_invoice(db, order_id, vendor)
 
 # forget password route
 @vendor_router.post("/reset-request/", status_code=200)
-async def generate_password_reset_request(body : PasswordResetRequest , background_tasks : BackgroundTasks ,db : Session = Depends(get_db)) :
-    return await VendorAuthService.create_password_reset_request(body , db , background_tasks)
+async def generate_password_reset_request(body : PasswordResetRequest ,db : AsyncSession = Depends(get_db)) :
+    return await VendorAuthService.create_password_reset_request(body , db)
 
 @vendor_router.post("/reset-password/", status_code=200)
-async def password_reset(body : ResetPasswordSchema ,db : Session = Depends(get_db)) :
+async def password_reset(body : ResetPasswordSchema ,db : AsyncSession = Depends(get_db)) :
     return await VendorAuthService.reset_password(body , db)
@@ -131,6 +131,11 @@ class PlaceOrderSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class PlaceOrderPageSchema(BaseModel):
+    orders: List[PlaceOrderSchema] = []
+    # pass back as `cursor` for the next page , None on the last page
+    next_cursor: Optional[str] = None
+
 class CreateOrderSchema(BaseModel):
     seller_id: int
     factory_id: int
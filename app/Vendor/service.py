@@ -1,20 +1,34 @@
-from datetime import timedelta
+from collections import defaultdict
+from datetime import date, time, timedelta
 from hashlib import sha256
 import secrets
-from fastapi.responses import JSONResponse
-from app.Seller.models import Factory, Product, Seller
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from app.Seller.models import Factory, Location, Product, Seller
 from app.Vendor.models import *
 from app.Vendor.schema import *
-from sqlalchemy.orm import Session
-from fastapi import BackgroundTasks, HTTPException, Request, Response, status 
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import and_, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from fastapi import HTTPException, Request, Response, status 
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from fastapi.security import OAuth2PasswordBearer
-from app.Utils.email import send_email_with_retry
+from app.Seller.stock import cancel_order, order_quantities, reserve_stock
+from app.Vendor.lifecycle import record_event
+from app.Seller.pricing import PLATFORM_FEE, line_total, order_total, price_snapshots
+from app.Utils.authservice import cache_vendor_status, invalidate_vendor_status, vendor_status_cache
+from app.Utils.events import order_event, order_events, principal_keys, stream_order_events
+from app.Utils.export import ExportFormat, csv_chunk, export_response, ndjson_chunk, stream_partitions
+from app.Utils.fastjson import FAST_JSON_RESPONSES, json_response, row_serializer
+from app.Utils.idempotency import hash_key, hash_request, idempotency_store
+from app.Utils.email import email_outbox_worker, enqueue_email
+from app.Utils.google_oauth import GoogleOAuthError, google_oauth
+from app.Utils.generate_invoice import invoice_renderer, load_invoice_payload
+from app.Utils.pagination import PAGE_SIZE, keyset_page, page_result
+from app.Utils.password import password_hasher
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
-import requests
 load_dotenv()
 
 
@@ -24,6 +38,10 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# FAST_JSON_RESPONSES path of the order history
+order_serializer = row_serializer(PlaceOrderSchema, ("ordered_products",))
+ordered_product_serializer = row_serializer(OrderedProductSchema)
+
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM") 
 TIMELIMIT = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
@@ -31,29 +49,29 @@ TIMELIMIT = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
 
 class VendorService :
     @staticmethod
-    async def create_vendor_user(db: Session, vendor: VendorUserCreate , response : Response):
+    async def create_vendor_user(db: AsyncSession, vendor: VendorUserCreate , response : Response):
     # Check if email already exists
         try :
-            existing_vendor = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
+            existing_vendor = (await db.execute(select(Vendoruser).where(Vendoruser.email == vendor.email))).scalar_one_or_none()
             if existing_vendor:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Email already registered"
                 )
             
-            # Hash password
-            hashed_password = bcrypt.hashpw(vendor.password.encode('utf-8'), bcrypt.gensalt())
+            # Hash password on the hashing pool
+            hashed_password = await password_hasher.hash(vendor.password)
             
             # Create new vendor user
             db_vendor = Vendoruser(
                 name=vendor.name,
                 email=vendor.email,
-                password=hashed_password.decode('utf-8'),
+                password=hashed_password,
                 phone=vendor.phone
             )
             db.add(db_vendor)
-            db.commit()
-            db.refresh(db_vendor)
+            await db.commit()
+            await db.refresh(db_vendor)
 
             # Direct Authentication
             access_token = await VendorAuthService.create_access_token(data={"mail": vendor.email, "name": vendor.name})
@@ -69,97 +87,107 @@ class VendorService :
         except SQLAlchemyError  as db_error :
             raise db_error
         except HTTPException as error :
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e :
             raise HTTPException(status_code= 500 , detail= str(e))
         
     @staticmethod
-    async def create_vendor_location(db: Session, location: VendorLocationCreate , vendor):
+    async def create_vendor_location(db: AsyncSession, location: VendorLocationCreate , vendor):
     # Verify shop exists
         try :
-            vendor_detail  = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
-            if not vendor_detail:
+            if not vendor.vendor_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Vendor Is Not Applicable"
                 )
             
             location_dict = location.dict()
-            location_dict["vendor_id"] = vendor_detail.id
+            location_dict["vendor_id"] = vendor.vendor_id
             
             # Create new location
             db_location = VendorShopLocation(**location_dict)
             db.add(db_location)
-            db.commit()
-            db.refresh(db_location)
+            await db.commit()
+            invalidate_vendor_status(email=vendor.email)
+            await db.refresh(db_location)
             return db_location
         
         except SQLAlchemyError  as db_error :
             raise db_error
         except HTTPException as error :
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e :
             raise HTTPException(status_code= 500 , detail= str(e))
         
     @staticmethod
-    async def get_vendor_locations(db: Session , vendor):
+    async def get_vendor_locations(db: AsyncSession , vendor):
     # Verify shop exists
         try :
-            vendor_detail  = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
-            if not vendor_detail:
+            if not vendor.vendor_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Vendor Is Not Applicable"
                 )
             
-            return vendor_detail.locations
+            locations = await db.execute(
+                select(VendorShopLocation).where(VendorShopLocation.vendor_id == vendor.vendor_id)
+            )
+            return locations.scalars().all()
         
         except SQLAlchemyError  as db_error :
             raise db_error
         except HTTPException as error :
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e :
             raise HTTPException(status_code= 500 , detail= str(e))
         
     @staticmethod
-    async def save_vendor_shop_details(db: Session, shop: VendorShopCreate , vendor):
+    async def save_vendor_shop_details(db: AsyncSession, shop: VendorShopCreate , vendor):
     # Verify Detail Exist
         try :
-            vendor_detail  = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
-            if not vendor_detail:
+            if not vendor.vendor_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Vendor Is Not Applicable"
                 )
             
             shop_dict = shop.dict()
-            shop_dict["vendor_id"] = vendor_detail.id
+            shop_dict["vendor_id"] = vendor.vendor_id
             
             # Create new Vendor Shop
             db_shop = VendorShopDetail(**shop_dict)
             db.add(db_shop)
-            db.commit()
-            db.refresh(db_shop)
+            await db.commit()
+            invalidate_vendor_status(email=vendor.email)
+            await db.refresh(db_shop)
             return db_shop
                 
         except SQLAlchemyError  as db_error :
             raise db_error
         except HTTPException as error :
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e :
             raise HTTPException(status_code= 500 , detail= str(e))
     
     @staticmethod
-    async def vendor_profile(db : Session , vendor) :
+    async def vendor_profile(db : AsyncSession , vendor) :
         try :
             if vendor is None :
                 raise HTTPException(status_code= 400 , detail="Error in User Details")
             
-            vendor_detail  = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
+            query = (
+                select(Vendoruser)
+                .options(
+                    selectinload(Vendoruser.shops).selectinload(VendorShopDetail.locations),
+                    selectinload(Vendoruser.locations),
+                )
+                .where(Vendoruser.id == vendor.vendor_id)
+            )
+            vendor_detail  = (await db.execute(query)).scalar_one_or_none()
             if not vendor_detail:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -171,7 +199,7 @@ class VendorService :
         except SQLAlchemyError  as db_error :
             raise db_error
         except HTTPException as error :
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e :
             raise HTTPException(status_code= 500 , detail= str(e))
@@ -181,12 +209,12 @@ class VendorService :
 class VendorAuthService :
 
     @staticmethod
-    def verify_password(plain_password, hashed_password):
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(plain_password, hashed_password):
+        return await password_hasher.verify(plain_password, hashed_password)
 
     @staticmethod
     async def get_password_hash(password):
-        return pwd_context.hash(password)
+        return await password_hasher.hash(password)
 
     @staticmethod
     async def create_access_token(data: dict):
@@ -211,10 +239,10 @@ class VendorAuthService :
 
     
     @staticmethod
-    async def authenticate_user(db: Session, email: str, password: str , response):
-        user = db.query(Vendoruser).filter(Vendoruser.email == email).first()
+    async def authenticate_user(db: AsyncSession, email: str, password: str , response):
+        user = (await db.execute(select(Vendoruser).where(Vendoruser.email == email))).scalar_one_or_none()
         
-        if not user or not VendorAuthService.verify_password(password, user.password):
+        if not user or not await VendorAuthService.verify_password(password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -245,35 +273,12 @@ class VendorAuthService :
             if not code:
                 return JSONResponse({"error": "Missing code"}, status_code=400)
 
-            # Exchange code for tokens
-            token_url = "https://oauth2.googleapis.com/token"
-            token_data = {
-                "code": code,
-                "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-                "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
-                "redirect_uri": os.getenv("GOOGLE_REDIRECT_URI"),
-                "grant_type": "authorization_code"
-            }
-            token_response = requests.post(token_url, data=token_data)
-            if not token_response.ok:
-                return JSONResponse({"error": "Token exchange failed"}, status_code=400)
-
-            tokens = token_response.json()
-            access_token = tokens.get("access_token")
-            if not access_token:
-                return JSONResponse({"error": "No access token"}, status_code=400)
-
-            # Fetch user info
-            userinfo_url = "https://www.googleapis.com/oauth2/v3/userinfo"
-            userinfo_response = requests.get(
-                userinfo_url,
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            if not userinfo_response.ok:
-                return JSONResponse({"error": "Failed to fetch user info"}, status_code=400)
+            # one token exchange over the pooled client , the ID token is verified locally
+            try :
+                userinfo = await google_oauth.authenticate(code.code)
+            except GoogleOAuthError as oauth_error :
+                return JSONResponse({"error": str(oauth_error)}, status_code=400)
 
-            userinfo = userinfo_response.json()
-            print(userinfo)
             return JSONResponse(userinfo)
         
         except HTTPException as http_error :
@@ -286,10 +291,36 @@ class VendorAuthService :
             raise HTTPException(status_code=500 , detail= str(e))
         
     @staticmethod
-    async def vendor_status(db : Session , request : Request) :
+    def vendor_status_query(email : str) :
+        """Profile completion of a vendor and its seller as one row , every check an EXISTS subquery"""
+        factory_exists = select(Factory.id).where(Factory.seller_id == Seller.id)
+        factory_without_location = (
+            select(Factory.id)
+            .where(
+                Factory.seller_id == Seller.id,
+                ~select(Location.id).where(Location.factory_id == Factory.id).exists()
+            )
+        )
+        return (
+            select(
+                Vendoruser.id,
+                select(VendorShopDetail.id).where(VendorShopDetail.vendor_id == Vendoruser.id).exists().label("has_shop"),
+                select(VendorShopLocation.id).where(VendorShopLocation.vendor_id == Vendoruser.id).exists().label("has_location"),
+                Seller.id.label("seller_id"),
+                factory_exists.exists().label("has_factory"),
+                factory_without_location.exists().label("missing_location"),
+                select(Product.id).where(Product.seller_id == Seller.id).exists().label("has_products"),
+            )
+            .outerjoin(Seller, Seller.vendor_id == Vendoruser.id)
+            .where(Vendoruser.email == email)
+            .order_by(Seller.id)
+            .limit(1)
+        )
+
+    @staticmethod
+    async def vendor_status(db : AsyncSession , request : Request) :
         try :
             token = request.cookies.get("access_token")  
-            print(token)
 
             # for profile details
             is_login = False
@@ -305,35 +336,40 @@ class VendorAuthService :
             seller_profile_count = 0
 
             if token :
-                is_login = True
-                profile_count += 1
                 payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
                 email = payload.get("mail")
 
-                vendor_detail  = db.query(Vendoruser).filter(Vendoruser.email == email).first()
+                cached = vendor_status_cache.get(email)
+                if cached is not None :
+                    return cached
+
+                is_login = True
+                profile_count += 1
+
+                row = (await db.execute(VendorAuthService.vendor_status_query(email))).first()
+                if row is None :
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND , detail="Vendor Not Found")
 
                 # add vendor details data
-                if vendor_detail.shops :
+                if row.has_shop :
                     profile_count += 1
                 else :
                     profile_creds.append("shop")
 
-                if vendor_detail.locations :
+                if row.has_location :
                     profile_count += 1
                 else :
                     profile_creds.append("location")
                 
                 profile_dones = (profile_count / 3 ) * 100
-                
-                seller_detail = db.query(Seller).filter(Seller.vendor_id == vendor_detail.id).first() 
 
-                if seller_detail :
+                if row.seller_id is not None :
                     seller_profile_count += 1
                     is_Seller = True
 
-                    if seller_detail.factories:
+                    if row.has_factory :
                         seller_profile_count += 1
-                        if all(factory.location for factory in seller_detail.factories):
+                        if not row.missing_location :
                             seller_profile_count += 1
                         else:
                             seller_profile_creds.append("location")
@@ -341,7 +377,7 @@ class VendorAuthService :
                         seller_profile_creds.append("factories")
                         seller_profile_creds.append("location")
 
-                    if seller_detail.products :
+                    if row.has_products :
                         seller_profile_count += 1
                     else :
                         seller_profile_creds.append("products")
@@ -350,25 +386,30 @@ class VendorAuthService :
                     seller_profile_dones = (seller_profile_count / 4) * 100
                 
 
-            return VendorStatusSChema(
+            vendor_status = VendorStatusSChema(
                 is_login = is_login ,   # TO check if the user is log in or not
                 is_seller = is_Seller,  # To check the user have seller account or not
                 profile_done =  int(profile_dones),  # if have account how much the account creation is done 
                 profile_creds =  profile_creds ,  # which part of the profile creation are pending
                 seller_profile_done = int(seller_profile_dones) , # How much seller account creation is done
                 seller_profile_creds = seller_profile_creds     # which part of the seller profile creation is pending
-            )        
+            )
+            if is_login :
+                cache_vendor_status(email , row.seller_id , vendor_status)
+            return vendor_status
+        except HTTPException as error :
+            raise error
         except JWTError as error :
             raise error
         except Exception as e :
             raise HTTPException(status_code= 500 , detail= str(e))
         
     # Forget password service 
-    async def create_password_reset_request(body : PasswordResetRequest , db : Session , background_tasks : BackgroundTasks ) :
+    async def create_password_reset_request(body : PasswordResetRequest , db : AsyncSession ) :
         try :
             pass
             # fetch the user if exist 
-            user = db.query(Vendoruser).filter(Vendoruser.email == body.email).first()
+            user = (await db.execute(select(Vendoruser).where(Vendoruser.email == body.email))).scalar_one_or_none()
             if not user :
                 raise HTTPException(status_code=400 , detail = f"User with {body.email} id doesnt exist")
             
@@ -376,16 +417,10 @@ class VendorAuthService :
             token = secrets.token_urlsafe(32)  # 32 bytes = strong token
             token_hash = sha256(token.encode()).hexdigest()
 
-            print(token)
-            print(token_hash)
-
             #  save into db
             user.password_reset_token = token_hash
             user.reset_token_expires = datetime.utcnow() + timedelta(minutes=10)
-            db.commit()
-            db.refresh(user)
 
-            # start a background task to send an email
             reset_link = f"http://127.0.0.1:8000/reset-password?token={token}"
 
             # hardcoded for now
@@ -406,15 +441,10 @@ class VendorAuthService :
 
             recipient = str(body.email)
 
-            # added a background task
-            # have to add celery 
-            background_tasks.add_task(
-                send_email_with_retry,
-                recipient=recipient,
-                subject=subject,
-                body=email_body,
-        )   
-            print(reset_link)
+            # queued in the same transaction as the token , the outbox worker sends it
+            enqueue_email(db , recipient=recipient , subject=subject , body=email_body)
+            await db.commit()
+            email_outbox_worker.wake()
 
             return PasswordResetResponse(
                 email = body.email,
@@ -424,30 +454,27 @@ class VendorAuthService :
         except HTTPException as error :
             raise error
         except SQLAlchemyError as db_error :
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=400 , detail= str(db_error))
         except Exception as e :
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code =500 , detail= str(e))
         
-    async def reset_password(body : ResetPasswordSchema , db : Session) :
+    async def reset_password(body : ResetPasswordSchema , db : AsyncSession) :
         try :
             # verify the token 
             hashed_token = sha256(body.token.encode()).hexdigest()
-            print(hashed_token)
-            user = db.query(Vendoruser).filter(
+            user = (await db.execute(select(Vendoruser).where(
                     Vendoruser.password_reset_token == hashed_token ,
                     Vendoruser.reset_token_expires > datetime.utcnow()
-                ).first()
+                ))).scalar_one_or_none()
 
             if not user :
                 raise HTTPException(status_code= 400 , detail="Token Expired")
 
             #  hashe and save the password
-            hashed_password= bcrypt.hashpw(body.new_password.encode('utf-8'), bcrypt.gensalt())
-            print(hashed_password.decode('utf-8'))
-            user.password = hashed_password.decode('utf-8')
-            db.commit()
+            user.password = await password_hasher.hash(body.new_password)
+            await db.commit()
 
             # send success message
             return ResetPasswordSuccessSchema(
@@ -457,63 +484,68 @@ class VendorAuthService :
         except HTTPException as error :
             raise error
         except SQLAlchemyError as db_error :
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=400 , detail= str(db_error))
         except Exception as e :
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code =500 , detail= str(e))
         
 
 class VendorOrderService :
 
     @staticmethod
-    async def place_order(order: CreateOrderSchema, db: Session, vendor):
+    def order_validation_query(seller_id: int, factory_id: int, product_ids: List[int]):
+        """
+        One (id , price) row per requested product of the factory , or a single row with
+        NULL product when none match. No row means the seller does not exist ,
+        a NULL factory means the factory is missing or owned by another seller.
+        """
+        return (
+            select(
+                Seller.id.label("seller_id"),
+                Factory.id.label("factory_id"),
+                Product.id.label("product_id"),
+                Product.price,
+            )
+            .select_from(Seller)
+            .outerjoin(Factory, and_(Factory.id == factory_id, Factory.seller_id == Seller.id))
+            .outerjoin(Product, and_(Product.factory_id == Factory.id, Product.id.in_(product_ids)))
+            .where(Seller.id == seller_id)
+        )
+
+    @staticmethod
+    async def place_order(order: CreateOrderSchema, db: AsyncSession, vendor, idempotency_key: Optional[str] = None):
         try:
             # Validate vendor
             if vendor is None:
                 raise HTTPException(status_code=400, detail="Error in User Details")
             
-            vendor_detail = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
-            if not vendor_detail:
+            if not vendor.vendor_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Vendor Not Found"
                 )
             
-            # Validate seller exists
-            seller = db.query(Seller).filter(Seller.id == order.seller_id).first()
-            if not seller:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Seller Not Found"
-                )
-            
-            # Validate factory exists
-            factory = db.query(Factory).filter(Factory.id == order.factory_id).first()
-            if not factory:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Factory Not Found"
-                )
-            
+            # A retry with the same key gets the stored response , nothing is validated or written again
+            if idempotency_key:
+                key_hash = hash_key(vendor.vendor_id, idempotency_key)
+                request_hash = hash_request(order)
+                replay = await idempotency_store.lookup(db, key_hash, request_hash)
+                if replay is not None:
+                    return replay
+
             # Validate ordered products
             if not order.ordered_products or len(order.ordered_products) == 0:
                 raise HTTPException(
                     status_code=400, 
                     detail="At least one product must be ordered"
                 )
-            
-            # Extract product IDs from ordered products
-            product_ids = [product.product_id for product in order.ordered_products]
-            
-            # Validate all products exist
-            products = db.query(Product).filter(Product.id.in_(product_ids)).all()
-            if len(products) != len(product_ids):
-                existing_product_ids = [p.id for p in products]
-                missing_product_ids = [pid for pid in product_ids if pid not in existing_product_ids]
+
+            # the fee is set by the platform , a client sending another one is refused instead of trusted
+            if "platform_fee" in order.model_fields_set and round(order.platform_fee, 2) != round(PLATFORM_FEE, 2):
                 raise HTTPException(
-                    status_code=400, 
-                    detail=f"Products with IDs {missing_product_ids} not found"
+                    status_code=400,
+                    detail=f"platform_fee must be {PLATFORM_FEE:.2f}"
                 )
             
             # Validate quantities are positive
@@ -521,108 +553,199 @@ class VendorOrderService :
                 if product_detail.quantity <= 0:
                     raise HTTPException(
                         status_code=400,
-                        detail=f"Quantity must be positive for product ID {product_detail.product_id}"
+                        detail=f"Quantity must be positive for product ID {product_detail.product}"
                     )
-                if product_detail.total_price <= 0:
+            
+            # Seller , factory ownership , products of that factory and their prices in one query ,
+            # skipped when the factory's price snapshot already holds every product
+            product_ids = list({product.product for product in order.ordered_products})
+            prices = price_snapshots.lookup(order.seller_id, order.factory_id, product_ids)
+            if prices is None:
+                snapshot_version = price_snapshots.version(order.factory_id)
+                rows = (await db.execute(
+                    VendorOrderService.order_validation_query(order.seller_id, order.factory_id, product_ids)
+                )).all()
+                if not rows:
                     raise HTTPException(
-                        status_code=400,
-                        detail=f"Total price must be positive for product ID {product_detail.product_id}"
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Seller Not Found"
                     )
+                if rows[0].factory_id is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Factory Not Found"
+                    )
+
+                prices = {row.product_id: row.price for row in rows if row.product_id is not None}
+                missing_product_ids = [pid for pid in product_ids if pid not in prices]
+                if missing_product_ids:
+                    raise HTTPException(
+                        status_code=400, 
+                        detail=f"Products with IDs {missing_product_ids} not found"
+                    )
+                price_snapshots.store(order.factory_id, snapshot_version, order.seller_id, prices)
             
-            # Calculate and validate total amounts
-            calculated_product_amount = sum([product.total_price for product in order.ordered_products])
-            calculated_total = calculated_product_amount + order.platform_fee
-            
-            # # Optional: Validate if provided amounts match calculated amounts
-            # if abs(order.product_ammount - calculated_product_amount) > 0.01:  # Allow small floating point differences
-            #     raise HTTPException(
-            #         status_code=400,
-            #         detail=f"Product amount mismatch. Expected: {calculated_product_amount}, Provided: {order.product_ammount}"
-            #     )
+            # Price every line from the catalog , client supplied totals are ignored
+            ordered_products = [
+                OrderedProductSchema(
+                    product=product_detail.product,
+                    quantity=product_detail.quantity,
+                    total_price=line_total(prices[product_detail.product], product_detail.quantity)
+                )
+                for product_detail in order.ordered_products
+            ]
+            calculated_product_amount = round(sum(line.total_price for line in ordered_products), 2)
+            calculated_total = order_total(calculated_product_amount, PLATFORM_FEE)
             
+            # Take the stock in one conditional update , raises 409 when any product ran short
+            await reserve_stock(db, order_quantities(order.ordered_products))
+
             # Create the main order
             db_order = PlaceOrder(
-                vendor_id=vendor_detail.id,
+                vendor_id=vendor.vendor_id,
                 seller_id=order.seller_id,
                 factory_id=order.factory_id,
-                product_ammount=order.product_ammount,
-                platform_fee=order.platform_fee,
+                product_ammount=calculated_product_amount,
+                platform_fee=PLATFORM_FEE,
                 total_amount=calculated_total,
                 remarks=order.remarks
             )
             
             db.add(db_order)
-            db.flush()  # Flush to get the order ID without committing
-            
-            # Create ordered product details
-            ordered_product_records = []
-            for product_detail in order.ordered_products:
-                db_product_detail = OrderedProductsDetail(
-                    product=product_detail.product_id,
-                    quantity=product_detail.quantity,
-                    total_price=product_detail.total_price,
-                    order_id=db_order.id
-                )
-                ordered_product_records.append(db_product_detail)
-                db.add(db_product_detail)
-            
+            await db.flush()  # Flush to get the order ID without committing
+            
+            # first entry of the order's status history , written with the commit
+            record_event(db, db_order.id, None, OrderStatusEnum.PLACED, f"vendor:{vendor.vendor_id}")
+
+            # Every line item in one multi-row insert
+            await db.execute(insert(OrderedProductsDetail).values([
+                {
+                    "product": line.product,
+                    "quantity": line.quantity,
+                    "total_price": line.total_price,
+                    "order_id": db_order.id,
+                }
+                for line in ordered_products
+            ]))
+
+            # Snapshot of the new order , also what a retry with the same key gets back
+            placed_order = PlaceOrderSchema(
+                id=db_order.id,
+                vendor_id=db_order.vendor_id,
+                seller_id=db_order.seller_id,
+                factory_id=db_order.factory_id,
+                order_status=db_order.order_status,
+                payment_method=db_order.payment_method,
+                product_ammount=db_order.product_ammount,
+                platform_fee=db_order.platform_fee,
+                total_amount=db_order.total_amount,
+                remarks=db_order.remarks,
+                created_at=db_order.created_at,
+                updated_at=db_order.updated_at,
+                ordered_products=ordered_products
+            )
+            if idempotency_key:
+                idempotency_store.save(db, key_hash, vendor.vendor_id, request_hash, status.HTTP_200_OK, placed_order)
+
             # Commit all changes
-            db.commit()
-            db.refresh(db_order)
+            await db.commit()
+            if idempotency_key:
+                idempotency_store.remember(key_hash, request_hash, status.HTTP_200_OK, placed_order)
+
+            # push to the open dashboards of both sides
+            await order_events.publish(order_event("order.placed", db_order))
             
             # Return the complete order with products using the response schema
-            return db_order
-            
+            return placed_order
+            
+        except IntegrityError as db_error:
+            await db.rollback()
+            # a concurrent request with the same key committed first , answer with its response
+            if idempotency_key:
+                replay = await idempotency_store.lookup(db, key_hash, request_hash)
+                if replay is not None:
+                    return replay
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database error: {str(db_error)}"
+            )
         except SQLAlchemyError as db_error:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=500,
                 detail=f"Database error: {str(db_error)}"
             )
         except HTTPException as error:
-            db.rollback()
+            await db.rollback()
             raise error
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=500,
                 detail=f"Unexpected error: {str(e)}"
             )
     @staticmethod
+    def order_history_criteria(
+        vendor_id: int,
+        order_status: Optional[OrderStatusEnum] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        seller_id: Optional[int] = None
+    ) -> list:
+        criteria = [PlaceOrder.vendor_id == vendor_id]
+        
+        # Apply filters if provided
+        if order_status:
+            criteria.append(PlaceOrder.order_status == order_status)
+        if seller_id:
+            criteria.append(PlaceOrder.seller_id == seller_id)
+        if start_date:
+            criteria.append(PlaceOrder.created_at >= datetime.combine(start_date, time.min))
+        if end_date:
+            criteria.append(PlaceOrder.created_at < datetime.combine(end_date + timedelta(days=1), time.min))
+        return criteria
+
+    @staticmethod
     async def get_vendor_orders(
-        db: Session, 
+        db: AsyncSession, 
         vendor, 
-        order_status: Optional[OrderStatusEnum] = None
+        order_status: Optional[OrderStatusEnum] = None,
+        cursor: Optional[str] = None,
+        limit: int = PAGE_SIZE,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        seller_id: Optional[int] = None
     ):
         try:
             # Validate vendor
             if vendor is None:
                 raise HTTPException(status_code=400, detail="Error in User Details")
             
-            vendor_detail = db.query(Vendoruser).filter(Vendoruser.email == vendor.email).first()
-            if not vendor_detail:
+            if not vendor.vendor_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Vendor Not Found"
                 )
             
-            # Build query for vendor's orders
-            query = db.query(PlaceOrder).filter(PlaceOrder.vendor_id == vendor_detail.id)
+            criteria = VendorOrderService.order_history_criteria(vendor.vendor_id, order_status, start_date, end_date, seller_id)
             
-            # Apply status filter if provided
-            if order_status:
-                query = query.filter(PlaceOrder.order_status == order_status)
-            
-            # Apply ordering (most recent first)
-            query = query.order_by(PlaceOrder.created_at.desc())
-            
-            # Apply pagination
-            orders = query.all()
+            if FAST_JSON_RESPONSES:
+                return await VendorOrderService.vendor_orders_json(db, criteria, cursor, limit)
+
+            # Build query for vendor's orders , ordered products come in one selectin query per page
+            query = (
+                select(PlaceOrder)
+                .options(selectinload(PlaceOrder.ordered_products))
+                .where(*criteria)
+            )
             
-            # Convert to response schema
+            # Most recent first , resumed after the cursor (walks ix_placeorder_vendor_created)
+            query = keyset_page(query, PlaceOrder.created_at, PlaceOrder.id, cursor, limit)
             
-            print(orders)
-            return orders
+            orders = (await db.execute(query)).scalars().all()
+            orders, next_cursor = page_result(orders, limit)
+
+            return PlaceOrderPageSchema(orders=orders, next_cursor=next_cursor)
             
         except HTTPException as error:
             raise error
@@ -635,4 +758,196 @@ class VendorOrderService :
             raise HTTPException(
                 status_code=500,
                 detail=f"Unexpected error: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    async def vendor_orders_json(db: AsyncSession, criteria: list, cursor: Optional[str], limit: int) -> Response:
+        """
+        FAST_JSON_RESPONSES path of the order history : the same page as
+        PlaceOrderPageSchema , serialized from column tuples in two queries.
+        """
+        query = select(*order_serializer.select_columns(PlaceOrder)).where(*criteria)
+        query = keyset_page(query, PlaceOrder.created_at, PlaceOrder.id, cursor, limit)
+        rows = (await db.execute(query)).all()
+        rows, next_cursor = page_result(rows, limit)
+
+        lines = defaultdict(list)
+        if rows:
+            line_rows = (await db.execute(
+                select(OrderedProductsDetail.order_id, *ordered_product_serializer.select_columns(OrderedProductsDetail))
+                .where(OrderedProductsDetail.order_id.in_([row.id for row in rows]))
+                .order_by(OrderedProductsDetail.id)
+            )).all()
+            for line in line_rows:
+                lines[line[0]].append(ordered_product_serializer.dump(line[1:]))
+
+        return json_response({
+            "orders": [order_serializer.dump(row, ordered_products=lines[row.id]) for row in rows],
+            "next_cursor": next_cursor,
+        })
+
+    @staticmethod
+    async def export_vendor_orders(
+        vendor,
+        export_format: ExportFormat,
+        order_status: Optional[OrderStatusEnum] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        seller_id: Optional[int] = None
+    ):
+        """Streams the whole order history as NDJSON (one order per line) or CSV (one line item per row)"""
+        try:
+            if not vendor.vendor_id:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Vendor Not Found"
+                )
+            if start_date and end_date and end_date < start_date:
+                raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+            criteria = VendorOrderService.order_history_criteria(vendor.vendor_id, order_status, start_date, end_date, seller_id)
+            # newest first like the paged history , line items of an order arrive next to each other
+            query = (
+                select(
+                    *order_serializer.select_columns(PlaceOrder),
+                    *ordered_product_serializer.select_columns(OrderedProductsDetail)
+                )
+                .select_from(PlaceOrder)
+                .outerjoin(OrderedProductsDetail, OrderedProductsDetail.order_id == PlaceOrder.id)
+                .where(*criteria)
+                .order_by(PlaceOrder.created_at.desc(), PlaceOrder.id.desc(), OrderedProductsDetail.id)
+            )
+
+            return export_response(
+                VendorOrderService.order_export_chunks(query, export_format),
+                export_format,
+                f"orders_{vendor.vendor_id}"
+            )
+
+        except HTTPException as error:
+            raise error
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Unexpected error: {str(e)}"
+            )
+
+    @staticmethod
+    async def order_export_chunks(query, export_format: ExportFormat):
+        order_width = len(order_serializer.columns)
+        if export_format == ExportFormat.CSV:
+            yield csv_chunk([order_serializer.columns + ordered_product_serializer.columns])
+            async for rows in stream_partitions(query):
+                yield csv_chunk(rows)
+            return
+
+        # rows of one order are consecutive , so only the order being assembled is held
+        current, lines = None, []
+        async for rows in stream_partitions(query):
+            finished = []
+            for row in rows:
+                if current is not None and row[0] != current[0]:
+                    finished.append(order_serializer.dump(current, ordered_products=lines))
+                    lines = []
+                current = row[:order_width]
+                # an order without line items comes back once with NULL line columns
+                if row[order_width] is not None:
+                    lines.append(ordered_product_serializer.dump(row[order_width:]))
+            if finished:
+                yield ndjson_chunk(finished)
+        if current is not None:
+            yield ndjson_chunk([order_serializer.dump(current, ordered_products=lines)])
+
+    @staticmethod
+    async def cancel_order(db: AsyncSession, order_id: int, vendor):
+        try:
+            if not vendor.vendor_id:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Vendor Not Found"
+                )
+
+            # only orders that have not shipped yet , stock goes back in the same transaction
+            cancelled = await cancel_order(
+                db,
+                order_id,
+                (OrderStatusEnum.PLACED, OrderStatusEnum.CONFIRMED),
+                PlaceOrder.vendor_id == vendor.vendor_id,
+                actor=f"vendor:{vendor.vendor_id}"
+            )
+
+            await db.commit()
+            await order_events.publish(order_event("order.cancelled", cancelled))
+
+            return {"message": "Order cancelled", "order_id": order_id}
+
+        except HTTPException as error:
+            await db.rollback()
+            raise error
+        except SQLAlchemyError as db_error:
+            await db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database error: {str(db_error)}"
+            )
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Unexpected error: {str(e)}"
+            )
+
+    @staticmethod
+    async def order_event_stream(request: Request, vendor):
+        """SSE stream of order events addressed to the vendor or to its seller account"""
+        if not vendor.vendor_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Vendor Not Found"
+            )
+
+        return StreamingResponse(
+            stream_order_events(request, principal_keys(vendor.vendor_id, vendor.seller_id)),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @staticmethod
+    async def get_order_invoice(db: AsyncSession, order_id: int, vendor):
+        try:
+            if not vendor.vendor_id:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Vendor Not Found"
+                )
+
+            invoice = await load_invoice_payload(db, order_id)
+
+            # only the ordering vendor and the receiving seller may download it
+            if not invoice or vendor.vendor_id != invoice["vendor_id"] and vendor.seller_id != invoice["seller_id"]:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Order Detail Not Found"
+                )
+
+            path = await invoice_renderer.get_or_render(invoice)
+
+            # FileResponse streams the cached PDF from disk in chunks
+            return FileResponse(
+                path,
+                media_type="application/pdf",
+                filename=f"invoice_order_{order_id}.pdf"
+            )
+
+        except HTTPException as error:
+            raise error
+        except SQLAlchemyError as db_error:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database error: {str(db_error)}"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Unexpected error: {str(e)}"
+            )
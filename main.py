@@ -1,12 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI , Depends
-from app.Utils.database import engine, Base
+from app.Utils.database import async_engine, engine, Base
+from app.Utils.email import EMAIL_OUTBOX_WORKER, email_outbox_worker
+from app.Utils.events import order_events
+from app.Utils.generate_invoice import invoice_renderer
+from app.Utils.google_oauth import google_oauth
+from app.Utils.password import password_hasher
+from app.Utils.response_cache import response_cache
 import os
 from fastapi.middleware.cors import CORSMiddleware
 from app.Seller.route import seller_router
 from app.Vendor.route import vendor_router
 
 
-app = FastAPI(redirect_slashes=False)
+@asynccontextmanager
+async def lifespan(app : FastAPI):
+    if EMAIL_OUTBOX_WORKER :
+        email_outbox_worker.start()
+    await order_events.start()
+    yield
+    # release pooled async connections and worker pools on shutdown
+    await email_outbox_worker.stop()
+    await order_events.stop()
+    await google_oauth.aclose()
+    await response_cache.aclose()
+    await async_engine.dispose()
+    password_hasher.shutdown()
+    invoice_renderer.shutdown()
+
+
+app = FastAPI(redirect_slashes=False, lifespan=lifespan)
 @app.get("/")
 def read_root():
     return {"Message": "Welcome to the Vendor seller application!"}
@@ -0,0 +1,152 @@
+"""
+Compares the default response path of the product list and the vendor
+order history with the FAST_JSON_RESPONSES path , on the same rows.
+
+The default path is what FastAPI does for a response_model route : load ORM
+objects , validate them into the schema , dump to JSON types and encode
+with json.dumps. The fast path selects column tuples and runs the compiled
+row serializer. Both bodies are decoded and compared before timing. Seed
+rows are deleted afterwards.
+
+    DATABASE_URL=postgresql://... python scripts/bench_json_serialization.py --products 5000 --orders 100 --lines 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import selectinload
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.Seller.models import Factory, FactoryTypeEnum, Product, QuantifiableTypeEnum, Seller
+from app.Seller.schema import ProductResponse
+from app.Seller.service import product_serializer
+from app.Utils.database import AsyncSessions, async_engine
+from app.Utils.fastjson import dumps, orjson
+from app.Utils.pagination import keyset_page, page_result
+from app.Vendor.models import OrderedProductsDetail, PlaceOrder, Vendoruser
+from app.Vendor.schema import PlaceOrderPageSchema
+from app.Vendor.service import VendorOrderService
+
+
+def render(content) -> bytes :
+    # starlette JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+async def seed(products : int , orders : int , lines : int) :
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessions() as db :
+        vendor = Vendoruser(name="bench", email=f"bench-{tag}@example.com", password="x", phone="0000000000")
+        db.add(vendor)
+        await db.flush()
+        seller = Seller(vendor_id=vendor.id, email=f"bench-seller-{tag}@example.com", phone="0000000000")
+        db.add(seller)
+        await db.flush()
+        factory = Factory(seller_id=seller.id, name="bench", factory_type=FactoryTypeEnum.SHOP, contact_number="0000000000")
+        db.add(factory)
+        await db.flush()
+        await db.execute(insert(Product), [
+            {
+                "seller_id": seller.id, "factory_id": factory.id, "name": f"product {n}", "description": "bench product",
+                "price": 10.5 + n, "stock_quantity": n, "qunatity_unit": QuantifiableTypeEnum.UNIT, "category": "bench",
+            }
+            for n in range(products)
+        ])
+        product_ids = (await db.execute(select(Product.id).where(Product.factory_id == factory.id))).scalars().all()
+        for n in range(orders) :
+            order = PlaceOrder(
+                vendor_id=vendor.id, seller_id=seller.id, factory_id=factory.id,
+                product_ammount=lines * 10.5, total_amount=lines * 10.5 + 10, remarks=f"order {n}"
+            )
+            db.add(order)
+            await db.flush()
+            await db.execute(insert(OrderedProductsDetail), [
+                {"product": product_ids[(n + line) % len(product_ids)], "quantity": 1, "total_price": 10.5, "order_id": order.id}
+                for line in range(lines)
+            ])
+        await db.commit()
+        return vendor.id, seller.id, factory.id
+
+
+async def cleanup(vendor_id : int , seller_id : int , factory_id : int) :
+    async with AsyncSessions() as db :
+        order_ids = select(PlaceOrder.id).where(PlaceOrder.vendor_id == vendor_id)
+        await db.execute(delete(OrderedProductsDetail).where(OrderedProductsDetail.order_id.in_(order_ids)))
+        await db.execute(delete(PlaceOrder).where(PlaceOrder.vendor_id == vendor_id))
+        await db.execute(delete(Product).where(Product.factory_id == factory_id))
+        await db.execute(delete(Factory).where(Factory.id == factory_id))
+        await db.execute(delete(Seller).where(Seller.id == seller_id))
+        await db.execute(delete(Vendoruser).where(Vendoruser.id == vendor_id))
+        await db.commit()
+
+
+async def timed(label : str , run , repeat : int) -> bytes :
+    samples = []
+    for _ in range(repeat) :
+        async with AsyncSessions() as db :
+            started = time.perf_counter()
+            body = await run(db)
+            samples.append(time.perf_counter() - started)
+    print(f"  {label:<9} median {statistics.median(samples) * 1000:8.2f}ms  min {min(samples) * 1000:8.2f}ms  {len(body) / 1024:8.1f} KiB")
+    return body
+
+
+async def main(args) :
+    vendor_id, seller_id, factory_id = await seed(args.products, args.orders, args.lines)
+    products_adapter = TypeAdapter(List[ProductResponse])
+    page_adapter = TypeAdapter(PlaceOrderPageSchema)
+    criteria = [PlaceOrder.vendor_id == vendor_id]
+
+    async def products_default(db) :
+        products = (await db.execute(select(Product).where(Product.factory_id == factory_id).order_by(Product.id))).scalars().all()
+        return render(products_adapter.dump_python(products_adapter.validate_python(products, from_attributes=True), mode="json"))
+
+    async def products_fast(db) :
+        query = select(*product_serializer.select_columns(Product)).where(Product.factory_id == factory_id).order_by(Product.id)
+        return dumps([product_serializer.dump(row) for row in (await db.execute(query)).all()])
+
+    async def orders_default(db) :
+        query = select(PlaceOrder).options(selectinload(PlaceOrder.ordered_products)).where(*criteria)
+        orders = (await db.execute(keyset_page(query, PlaceOrder.created_at, PlaceOrder.id, None, args.orders))).scalars().all()
+        orders, next_cursor = page_result(orders, args.orders)
+        # a returned model is dumped and validated again against the response_model
+        page = PlaceOrderPageSchema(orders=orders, next_cursor=next_cursor).model_dump()
+        return render(page_adapter.dump_python(page_adapter.validate_python(page), mode="json"))
+
+    async def orders_fast(db) :
+        return (await VendorOrderService.vendor_orders_json(db, criteria, None, args.orders)).body
+
+    try :
+        print(f"encoder {'orjson' if orjson is not None else 'json'} , {args.repeat} runs each , query included")
+        for name, default, fast in (
+            (f"{args.products} products", products_default, products_fast),
+            (f"{args.orders} orders x {args.lines} lines", orders_default, orders_fast),
+        ) :
+            print(name)
+            default_body = await timed("default", default, args.repeat)
+            fast_body = await timed("fast", fast, args.repeat)
+            if json.loads(default_body) != json.loads(fast_body) :
+                print("  MISMATCH , the fast path does not produce the same document")
+                sys.exit(1)
+            print("  bodies decode to the same document")
+    finally :
+        await cleanup(vendor_id, seller_id, factory_id)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__" :
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
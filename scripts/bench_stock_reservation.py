@@ -0,0 +1,114 @@
+"""
+Fires N concurrent orders at one hot product and reports throughput , how
+many orders got stock and whether the product was oversold. Seed rows are
+deleted afterwards.
+
+    DATABASE_URL=postgresql://... python scripts/bench_stock_reservation.py --orders 500 --stock 200 --concurrency 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+from sqlalchemy import delete, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+
+from app.Seller.models import Factory, FactoryTypeEnum, Product, QuantifiableTypeEnum, Seller
+from app.Seller.schema import CurrentUser
+from app.Utils.database import AsyncSessions, async_engine
+from app.Vendor.models import OrderedProductsDetail, PlaceOrder, Vendoruser
+from app.Vendor.schema import CreateOrderSchema, OrderedProductSchema
+from app.Vendor.service import VendorOrderService
+
+
+async def seed(stock : int) :
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessions() as db :
+        vendor = Vendoruser(name="bench", email=f"bench-{tag}@example.com", password="x", phone="0000000000")
+        db.add(vendor)
+        await db.flush()
+        seller = Seller(vendor_id=vendor.id, email=f"bench-seller-{tag}@example.com", phone="0000000000")
+        db.add(seller)
+        await db.flush()
+        factory = Factory(seller_id=seller.id, name="bench", factory_type=FactoryTypeEnum.SHOP, contact_number="0000000000")
+        db.add(factory)
+        await db.flush()
+        product = Product(
+            seller_id=seller.id, factory_id=factory.id, name="hot product", price=1.0,
+            stock_quantity=stock, qunatity_unit=QuantifiableTypeEnum.UNIT
+        )
+        db.add(product)
+        await db.commit()
+        return vendor, seller, factory, product
+
+
+async def cleanup(vendor , seller , factory , product) :
+    async with AsyncSessions() as db :
+        order_ids = select(PlaceOrder.id).where(PlaceOrder.vendor_id == vendor.id)
+        await db.execute(delete(OrderedProductsDetail).where(OrderedProductsDetail.order_id.in_(order_ids)))
+        await db.execute(delete(PlaceOrder).where(PlaceOrder.vendor_id == vendor.id))
+        await db.execute(delete(Product).where(Product.id == product.id))
+        await db.execute(delete(Factory).where(Factory.id == factory.id))
+        await db.execute(delete(Seller).where(Seller.id == seller.id))
+        await db.execute(delete(Vendoruser).where(Vendoruser.id == vendor.id))
+        await db.commit()
+
+
+async def main(args) :
+    vendor, seller, factory, product = await seed(args.stock)
+    principal = CurrentUser(email=vendor.email, name=vendor.name, vendor_id=vendor.id)
+    order = CreateOrderSchema(
+        seller_id=seller.id,
+        factory_id=factory.id,
+        product_ammount=args.quantity,
+        total_amount=args.quantity + 10,
+        ordered_products=[OrderedProductSchema(product=product.id, quantity=args.quantity, total_price=args.quantity)]
+    )
+
+    limit = asyncio.Semaphore(args.concurrency)
+    outcomes = {"placed": 0, "out_of_stock": 0, "failed": 0}
+    latencies = []
+
+    async def place() :
+        async with limit :
+            started = time.perf_counter()
+            async with AsyncSessions() as db :
+                try :
+                    await VendorOrderService.place_order(order, db, principal)
+                    outcomes["placed"] += 1
+                except HTTPException as error :
+                    outcomes["out_of_stock" if error.status_code == 409 else "failed"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    try :
+        started = time.perf_counter()
+        await asyncio.gather(*(place() for _ in range(args.orders)))
+        elapsed = time.perf_counter() - started
+
+        async with AsyncSessions() as db :
+            remaining = (await db.execute(select(Product.stock_quantity).where(Product.id == product.id))).scalar_one()
+
+        latencies.sort()
+        expected = args.stock - outcomes["placed"] * args.quantity
+        print(f"orders        {args.orders} ({args.concurrency} in flight)")
+        print(f"elapsed       {elapsed:.2f}s , {args.orders / elapsed:.1f} orders/s")
+        print(f"latency       p50 {latencies[len(latencies) // 2] * 1000:.1f}ms , p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms")
+        print(f"outcomes      {outcomes}")
+        print(f"stock         {args.stock} -> {remaining} (expected {expected}) , {'OK' if remaining == expected and remaining >= 0 else 'OVERSOLD'}")
+    finally :
+        await cleanup(vendor, seller, factory, product)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__" :
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+"""
+Checks that the orjson and stdlib paths of app.Utils.fastjson.dumps write
+the same bytes , without a database.
+
+Payloads are the rows the fast list paths serialize plus the types
+`_default` converts (Enum , datetime , date , Decimal). The only accepted
+difference is float exponent notation (orjson writes 1e16 and 0.00001
+where json writes 1e+16 and 1e-05) , those must still decode to the same
+value. Exits non-zero on the first failed check.
+
+    python scripts/check_json_encoders.py
+"""
+import json
+import os
+import sys
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.Seller.models import QuantifiableTypeEnum
+from app.Seller.service import product_serializer
+from app.Utils.fastjson import dumps, dumps_stdlib, orjson
+from app.Vendor.models import OrderStatusEnum, PaymentMethod
+from app.Vendor.service import order_serializer, ordered_product_serializer
+
+
+def check(condition : bool , label : str) :
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    if not condition :
+        sys.exit(1)
+
+
+def payloads() :
+    created = datetime(2026, 10, 18, 11, 12, 25, 685721)
+    product = (1, 2, "Steel rod , 8mm ☃", "line one\nline \"two\"", 10.5, 40, QuantifiableTypeEnum.KILOGRAM, "metal", 7, created)
+    line = (3, 2, 21.0)
+    order = (9, 1, 1, 2, OrderStatusEnum.PLACED, PaymentMethod.COD, None, 21.0, 10.0, 31.0, "ring at the back", date(2026, 10, 20), created, created)
+    yield "product rows", [product_serializer.dump(product) for _ in range(3)]
+    yield "order with line items", order_serializer.dump(order, ordered_products=[ordered_product_serializer.dump(line)])
+    yield "decimal", {"amount": Decimal("1.10"), "fee": Decimal("10")}
+    yield "aware datetime", {"at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)}
+    yield "control characters", {"text": "tab\there \x1f   end"}
+    yield "floats", [0.1, 10.5, 1.0, -0.0, 123456789.123, 1e-05, 1e16, 2.5e-07]
+
+
+def main() :
+    if orjson is None :
+        print("orjson is not installed , only the stdlib path is in use")
+        sys.exit(1)
+
+    for label, payload in payloads() :
+        fast = dumps(payload)
+        stdlib = dumps_stdlib(payload)
+        if fast == stdlib :
+            check(True, f"{label} same bytes")
+        else :
+            check(json.loads(fast) == json.loads(stdlib), f"{label} same document , differs only in float notation")
+
+
+if __name__ == "__main__" :
+    main()
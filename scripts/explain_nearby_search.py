@@ -0,0 +1,157 @@
+"""
+Seeds random sellers/factories/locations inside a transaction , runs
+EXPLAIN (ANALYZE , BUFFERS) for the old geometry-cast search and the
+location_geog candidate query , then rolls everything back.
+
+Each query runs --repeat times ; the last plan of each is printed in full,
+followed by a summary of median execution times. Exits non-zero when the
+database lacks PostGIS or the b7e2c41d9a30 migration , or when the new
+query's plan does not use idx_locations_location_geog.
+
+    DATABASE_URL=postgresql://... python scripts/explain_nearby_search.py --rows 200000
+    DATABASE_URL=postgresql://... python scripts/explain_nearby_search.py --rows 200000 --min-km 10
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.Seller.geo_search import CANDIDATE_QUERY, candidate_filters
+from app.Utils.database import engine
+
+
+LEGACY_QUERY = """
+    WITH filtered_locations AS (
+        SELECT l.id, l.factory_id, l.latitude, l.longitude,
+            ST_Distance(
+                l.location::geography,
+                ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography
+            ) / 1000 AS distance_km
+        FROM locations l
+        WHERE l.location IS NOT NULL AND ST_DWithin(
+            l.location::geography,
+            ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography,
+            :radius_meters
+        )
+        ORDER BY l.location <-> ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)
+        LIMIT :candidate_limit
+    )
+    SELECT DISTINCT ON (s.id) s.id, f.id, fl.distance_km
+    FROM filtered_locations fl
+    JOIN factories f ON fl.factory_id = f.id
+    JOIN sellers s ON f.seller_id = s.id
+    ORDER BY s.id, fl.distance_km
+"""
+
+SEED = """
+    WITH vendor AS (
+        INSERT INTO vendoruser (name, email, password, phone)
+        VALUES ('explain', 'explain-seed@example.com', 'x', '0000000000')
+        RETURNING id
+    ),
+    sellers_seed AS (
+        INSERT INTO sellers (vendor_id, email, phone)
+        SELECT vendor.id, 'explain-' || g || '@example.com', '0000000000'
+        FROM vendor, generate_series(1, :sellers) g
+        RETURNING id
+    ),
+    factories_seed AS (
+        INSERT INTO factories (seller_id, name, factory_type, contact_number)
+        SELECT id, 'factory ' || id, 'SHOP', '0000000000' FROM sellers_seed
+        RETURNING id
+    )
+    INSERT INTO locations (factory_id, address_line1, city, state, country, postal_code, latitude, longitude)
+    SELECT f.id, 'seed', 'Seed City', 'Seed State', 'India', '000000',
+        :latitude + (random() - 0.5) * 10, :longitude + (random() - 0.5) * 10
+    FROM factories_seed f, generate_series(1, :per_factory)
+"""
+
+
+GEOG_INDEX = "idx_locations_location_geog"
+
+
+def fail(message : str) :
+    print(f"FAIL {message}")
+    sys.exit(1)
+
+
+def explain(conn , query : str , params : dict , repeat : int) :
+    """(plan lines of the last run , execution times in ms)"""
+    times = []
+    lines = []
+    for _ in range(repeat) :
+        lines = [line for (line,) in conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + query), params)]
+        for line in lines :
+            match = re.search(r"Execution Time: ([\d.]+) ms", line)
+            if match :
+                times.append(float(match.group(1)))
+    return lines, times
+
+
+def main() :
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--radius-km", type=float, default=50)
+    parser.add_argument("--min-km", type=float, default=0, help="inner ring of the new query , 0 for none")
+    parser.add_argument("--latitude", type=float, default=22.5726)
+    parser.add_argument("--longitude", type=float, default=88.3639)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sellers = max(1, args.rows // 5)
+    params = {
+        "latitude": args.latitude,
+        "longitude": args.longitude,
+        "radius_meters": args.radius_km * 1000,
+        "inner_meters": args.min_km * 1000,
+        "candidate_limit": 500,
+        "candidate_offset": 0,
+    }
+    filters = candidate_filters(SimpleNamespace(inner_km=args.min_km, city=None))
+
+    with engine.connect() as conn :
+        if not conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first() :
+            fail("PostGIS is not installed in this database")
+        if not conn.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": GEOG_INDEX}).first() :
+            fail(f"{GEOG_INDEX} is missing , run alembic upgrade head first")
+
+        transaction = conn.begin()
+        try :
+            conn.execute(text(SEED), {**params, "sellers": sellers, "per_factory": 5})
+            conn.execute(text("ANALYZE locations"))
+
+            results = {}
+            for label, query in (
+                ("geometry cast (before)", LEGACY_QUERY),
+                ("location_geog (after)", CANDIDATE_QUERY.format(filters=filters)),
+            ) :
+                lines, times = explain(conn, query, params, args.repeat)
+                results[label] = (lines, times)
+                print(f"---- {label} ----")
+                for line in lines :
+                    print(line)
+        finally :
+            transaction.rollback()
+
+    print(f"---- {args.rows} seeded locations , radius {args.radius_km} km , min {args.min_km} km , {args.repeat} runs ----")
+    medians = {}
+    for label, (_, times) in results.items() :
+        medians[label] = statistics.median(times)
+        print(f"  {label:<24} median {medians[label]:9.2f} ms  min {min(times):9.2f} ms")
+    before, after = medians.values()
+    print(f"  speedup {before / after:.1f}x")
+
+    after_plan = "\n".join(results["location_geog (after)"][0])
+    if GEOG_INDEX not in after_plan :
+        fail(f"the new query does not use {GEOG_INDEX}")
+    print(f"OK , the new query scans {GEOG_INDEX}")
+
+
+if __name__ == "__main__" :
+    main()
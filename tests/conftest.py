@@ -0,0 +1,46 @@
+"""
+Shared fixtures , the suite runs on a throwaway SQLite file through aiosqlite.
+
+The database URL has to be set before any app module is imported , so it
+is done at the top of this file rather than in a fixture.
+"""
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='vendor-tests-'), 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["EMAIL_OUTBOX_WORKER"] = "false"
+os.environ["EMAIL_FROM"] = "noreply@example.com"
+os.environ["ORDER_EVENTS_TRANSPORT"] = "memory"
+os.environ["RESPONSE_CACHE_BACKEND"] = "memory"
+
+import pytest
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+import app.Seller.models  # noqa: F401 , registers the seller tables
+import app.Vendor.models  # noqa: F401 , registers the vendor tables
+from app.Utils.database import Base, async_engine, engine
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_ , compiler , **kw) :
+    return "JSON"
+
+
+# locations carries PostGIS columns , SQLite without SpatiaLite cannot create it
+TABLES = [table for table in Base.metadata.sorted_tables if table.name != "locations"]
+
+
+@pytest.fixture
+def anyio_backend() :
+    return "asyncio"
+
+
+@pytest.fixture
+async def database(anyio_backend) :
+    """Fresh tables for one test , pooled aiosqlite connections are dropped with the test's event loop"""
+    Base.metadata.drop_all(engine, tables=TABLES)
+    Base.metadata.create_all(engine, tables=TABLES)
+    yield
+    await async_engine.dispose()
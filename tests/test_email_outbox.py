@@ -0,0 +1,248 @@
+"""
+EmailOutboxWorker against an in-process SMTP server.
+
+aiosmtpd runs the stand-in server on its own thread , the worker reaches it
+through the real SMTPSender like it would reach the production relay.
+"""
+import asyncio
+import socket
+from datetime import datetime, timedelta
+from email import message_from_bytes
+
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.Utils.database import AsyncSessions
+from app.Utils.email import EmailOutboxWorker, SMTPSender, enqueue_email
+from app.Vendor.models import EmailOutbox, EmailStatusEnum
+
+pytestmark = pytest.mark.anyio
+
+RESET_LINK = "https://example.com/reset-password?token=s3cret-reset-token"
+
+
+class Mailbox :
+    """aiosmtpd handler keeping every accepted message , replies can be scripted per recipient"""
+
+    def __init__(self) :
+        self.messages = []
+        self.peers = []
+        # recipient -> SMTP reply to RCPT TO , e.g. "550 no such user"
+        self.refuse = {}
+        # reply to DATA instead of accepting the message
+        self.data_reply = None
+
+    async def handle_RCPT(self, server , session , envelope , address , rcpt_options) :
+        if address in self.refuse :
+            return self.refuse[address]
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server , session , envelope) :
+        if self.data_reply :
+            return self.data_reply
+        self.messages.append(message_from_bytes(envelope.content))
+        self.peers.append(session.peer)
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int :
+    with socket.socket() as probe :
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def mailbox() :
+    handler = Mailbox()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    handler.port = controller.port
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+async def worker(database , mailbox) :
+    worker = EmailOutboxWorker(
+        sender=SMTPSender(host="127.0.0.1", port=mailbox.port, user=None, use_tls=False),
+        max_attempts=2,
+        retry_base=30,
+        retention_days=7
+    )
+    yield worker
+    await worker.stop()
+
+
+async def enqueue(recipient , subject : str = "Hello" , body : str = "Body") :
+    async with AsyncSessions() as db :
+        enqueue_email(db, recipient, subject, body)
+        await db.commit()
+
+
+async def outbox_rows() -> list :
+    async with AsyncSessions() as db :
+        return (await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+
+
+def body_of(message) -> str :
+    return message.get_payload()[0].get_payload(decode=True).decode()
+
+
+async def test_delivers_due_rows_over_one_connection(worker , mailbox) :
+    await enqueue(["a@example.com", "b@example.com", "c@example.com"], subject="Welcome")
+
+    assert await worker.process_batch() == 3
+
+    assert [message["To"] for message in mailbox.messages] == ["a@example.com", "b@example.com", "c@example.com"]
+    assert all(message["Subject"] == "Welcome" for message in mailbox.messages)
+    assert len(set(mailbox.peers)) == 1
+    rows = await outbox_rows()
+    assert {row.status for row in rows} == {EmailStatusEnum.SENT}
+    assert all(row.attempts == 1 and row.sent_at is not None and row.last_error is None for row in rows)
+    # nothing left to claim
+    assert await worker.process_batch() == 0
+
+
+async def test_reset_link_is_delivered_then_blanked(worker , mailbox) :
+    await enqueue("user@example.com", subject="Reset your password", body=f"Open {RESET_LINK}")
+
+    await worker.process_batch()
+
+    assert RESET_LINK in body_of(mailbox.messages[0])
+    (row,) = await outbox_rows()
+    assert row.status == EmailStatusEnum.SENT
+    assert row.body == ""
+
+
+async def test_transient_failure_is_retried_with_backoff(worker , mailbox) :
+    mailbox.data_reply = "451 Requested action aborted: local error"
+    await enqueue("user@example.com", body=RESET_LINK)
+
+    started = datetime.utcnow()
+    assert await worker.process_batch() == 1
+
+    (row,) = await outbox_rows()
+    assert row.status == EmailStatusEnum.PENDING
+    assert row.attempts == 1
+    assert "451" in row.last_error
+    assert row.next_attempt_at >= started + timedelta(seconds=30)
+    # kept until it is sent , the retry needs it
+    assert row.body == RESET_LINK
+    # not due yet
+    assert await worker.process_batch() == 0
+
+    mailbox.data_reply = None
+    async with AsyncSessions() as db :
+        (await db.get(EmailOutbox, row.id)).next_attempt_at = datetime.utcnow()
+        await db.commit()
+    assert await worker.process_batch() == 1
+
+    (row,) = await outbox_rows()
+    assert row.status == EmailStatusEnum.SENT
+    assert row.attempts == 2
+    assert len(mailbox.messages) == 1
+
+
+async def test_greylisted_recipient_is_retried(worker , mailbox) :
+    mailbox.refuse["user@example.com"] = "450 Greylisted , try again later"
+    await enqueue("user@example.com")
+
+    await worker.process_batch()
+
+    (row,) = await outbox_rows()
+    assert row.status == EmailStatusEnum.PENDING
+    assert row.attempts == 1
+
+
+async def test_gives_up_after_max_attempts(worker , mailbox) :
+    mailbox.data_reply = "421 Service not available"
+    await enqueue("user@example.com", body=RESET_LINK)
+
+    for _ in range(worker.max_attempts) :
+        async with AsyncSessions() as db :
+            for row in (await db.execute(select(EmailOutbox))).scalars() :
+                row.next_attempt_at = datetime.utcnow()
+            await db.commit()
+        await worker.process_batch()
+
+    (row,) = await outbox_rows()
+    assert row.status == EmailStatusEnum.FAILED
+    assert row.attempts == worker.max_attempts
+    assert row.body == ""
+
+
+async def test_refused_recipient_fails_at_once_without_failing_the_batch(worker , mailbox) :
+    mailbox.refuse["gone@example.com"] = "550 No such user"
+    await enqueue(["gone@example.com", "user@example.com"], body=RESET_LINK)
+
+    assert await worker.process_batch() == 2
+
+    gone, user = await outbox_rows()
+    assert gone.status == EmailStatusEnum.FAILED
+    assert gone.attempts == 1
+    assert "550" in gone.last_error
+    assert gone.body == ""
+    assert user.status == EmailStatusEnum.SENT
+    assert [message["To"] for message in mailbox.messages] == ["user@example.com"]
+
+
+async def test_unreachable_server_keeps_the_whole_batch_pending(database) :
+    worker = EmailOutboxWorker(sender=SMTPSender(host="127.0.0.1", port=free_port(), user=None, use_tls=False))
+    await enqueue(["a@example.com", "b@example.com"])
+
+    assert await worker.process_batch() == 2
+
+    rows = await outbox_rows()
+    assert {row.status for row in rows} == {EmailStatusEnum.PENDING}
+    assert all(row.attempts == 1 and row.last_error for row in rows)
+    await worker.stop()
+
+
+async def test_claims_only_due_pending_rows_with_skip_locked(worker) :
+    statement = str(worker.claim_query().compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in statement
+
+    await enqueue(["due@example.com", "later@example.com", "sent@example.com"])
+    async with AsyncSessions() as db :
+        due, later, sent = (await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+        later.next_attempt_at = datetime.utcnow() + timedelta(hours=1)
+        sent.status = EmailStatusEnum.SENT
+        await db.commit()
+
+    async with AsyncSessions() as db :
+        claimed = (await db.execute(worker.claim_query())).scalars().all()
+    assert [row.recipient for row in claimed] == ["due@example.com"]
+
+
+async def test_purge_deletes_only_finished_rows_past_retention(worker) :
+    old = datetime.utcnow() - timedelta(days=8)
+    recent = datetime.utcnow() - timedelta(days=1)
+    async with AsyncSessions() as db :
+        db.add_all([
+            EmailOutbox(recipient="old-sent@example.com", subject="s", body="", status=EmailStatusEnum.SENT, created_at=old),
+            EmailOutbox(recipient="old-failed@example.com", subject="s", body="", status=EmailStatusEnum.FAILED, created_at=old),
+            EmailOutbox(recipient="old-pending@example.com", subject="s", body="b", status=EmailStatusEnum.PENDING, created_at=old),
+            EmailOutbox(recipient="recent-sent@example.com", subject="s", body="", status=EmailStatusEnum.SENT, created_at=recent),
+        ])
+        await db.commit()
+
+    assert await worker.purge() == 2
+
+    assert sorted(row.recipient for row in await outbox_rows()) == ["old-pending@example.com", "recent-sent@example.com"]
+
+
+async def test_background_loop_sends_on_wake(worker , mailbox) :
+    worker.poll_interval = 60
+    worker.start()
+    await enqueue("user@example.com")
+    worker.wake()
+
+    for _ in range(100) :
+        if mailbox.messages :
+            break
+        await asyncio.sleep(0.05)
+
+    assert [message["To"] for message in mailbox.messages] == ["user@example.com"]
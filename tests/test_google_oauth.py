@@ -0,0 +1,226 @@
+"""
+GoogleOAuthClient against a local stand-in for Google's discovery , JWKS and
+token endpoints.
+
+The stub serves the public half of an RSA key generated per test run , ID
+tokens are signed with the private half exactly like Google signs them.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.Utils import google_oauth as google_oauth_module
+from app.Utils.google_oauth import GoogleOAuthClient, GoogleOAuthError
+
+pytestmark = pytest.mark.anyio
+
+CLIENT_ID = "client-id.apps.googleusercontent.com"
+ISSUER = "https://accounts.google.com"
+
+
+class SigningKey :
+    def __init__(self, kid : str) :
+        self.kid = kid
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        self.public_pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+
+    @property
+    def jwk(self) -> dict :
+        return {**jwk.construct(self.public_pem, "RS256").to_dict(), "kid": self.kid, "use": "sig"}
+
+    def sign(self, **overrides) -> str :
+        return jwt.encode(claims(**overrides), self.private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+
+def claims(**overrides) -> dict :
+    now = int(time.time())
+    return {
+        "iss": ISSUER,
+        "aud": CLIENT_ID,
+        "sub": "1234567890",
+        "email": "user@example.com",
+        "email_verified": True,
+        "name": "Test User",
+        "iat": now,
+        "exp": now + 3600,
+        **overrides,
+    }
+
+
+def b64(data : bytes) -> str :
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def forge(header : dict , secret : bytes = None) -> str :
+    """Token with an arbitrary header , HMAC signed with `secret` or unsigned"""
+    signing_input = f"{b64(json.dumps(header).encode())}.{b64(json.dumps(claims()).encode())}"
+    signature = hmac.new(secret, signing_input.encode(), hashlib.sha256).digest() if secret else b""
+    return f"{signing_input}.{b64(signature)}"
+
+
+class StubGoogle :
+    """Discovery document , JWKS and token endpoint on a local port , counts requests per path"""
+
+    def __init__(self) :
+        self.keys = []
+        self.tokens = {}
+        self.hits = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler) :
+            def log_message(self, *args) :
+                pass
+
+            def reply(self, payload : dict , status : int = 200) :
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "public, max-age=3600")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) :
+                stub.hits[self.path] = stub.hits.get(self.path, 0) + 1
+                if self.path == "/.well-known/openid-configuration" :
+                    self.reply({
+                        "issuer": ISSUER,
+                        "jwks_uri": f"{stub.url}/oauth2/v3/certs",
+                        "token_endpoint": f"{stub.url}/token",
+                        "userinfo_endpoint": f"{stub.url}/userinfo",
+                    })
+                elif self.path == "/oauth2/v3/certs" :
+                    self.reply({"keys": [key.jwk for key in stub.keys]})
+                else :
+                    self.reply({"error": "not_found"}, 404)
+
+            def do_POST(self) :
+                stub.hits[self.path] = stub.hits.get(self.path, 0) + 1
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path == "/token" and stub.tokens :
+                    self.reply(stub.tokens)
+                else :
+                    self.reply({"error": "invalid_grant"}, 400)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) :
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) :
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(scope="module")
+def signing_key() :
+    return SigningKey("key-1")
+
+
+@pytest.fixture
+def google(signing_key) :
+    with StubGoogle() as stub :
+        stub.keys = [signing_key]
+        yield stub
+
+
+@pytest.fixture
+async def client(google , anyio_backend) :
+    client = GoogleOAuthClient(
+        discovery_url=f"{google.url}/.well-known/openid-configuration",
+        client_id=CLIENT_ID,
+        client_secret="secret",
+        redirect_uri="http://localhost/callback"
+    )
+    yield client
+    await client.aclose()
+
+
+async def test_accepts_rs256_token_and_caches_documents(client , google , signing_key) :
+    for _ in range(3) :
+        verified = await client.verify_id_token(signing_key.sign())
+        assert verified["email"] == "user@example.com"
+
+    assert google.hits == {"/.well-known/openid-configuration": 1, "/oauth2/v3/certs": 1}
+
+
+async def test_authenticate_exchanges_code_and_verifies_locally(client , google , signing_key) :
+    google.tokens = {"access_token": "access", "id_token": signing_key.sign(), "token_type": "Bearer"}
+
+    verified = await client.authenticate("auth-code")
+
+    assert verified["sub"] == "1234567890"
+    assert google.hits.get("/token") == 1
+    assert "/userinfo" not in google.hits
+
+
+async def test_rejects_hs256_signed_with_the_public_key(client , signing_key) :
+    # the classic algorithm confusion , the published RSA key used as an HMAC secret
+    token = forge({"alg": "HS256", "typ": "JWT", "kid": signing_key.kid}, signing_key.public_pem.encode())
+
+    with pytest.raises(GoogleOAuthError) :
+        await client.verify_id_token(token)
+
+
+async def test_rejects_unsigned_token(client , signing_key) :
+    token = forge({"alg": "none", "typ": "JWT", "kid": signing_key.kid})
+
+    with pytest.raises(GoogleOAuthError) :
+        await client.verify_id_token(token)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"aud": "someone-else.apps.googleusercontent.com"},
+    {"iss": "https://evil.example.com"},
+    {"exp": int(time.time()) - 60},
+], ids=["audience", "issuer", "expired"])
+async def test_rejects_wrong_claims(client , signing_key , overrides) :
+    with pytest.raises(GoogleOAuthError) :
+        await client.verify_id_token(signing_key.sign(**overrides))
+
+
+async def test_rejects_token_signed_by_another_key_under_a_known_kid(client , signing_key) :
+    impostor = SigningKey(signing_key.kid)
+
+    with pytest.raises(GoogleOAuthError) :
+        await client.verify_id_token(impostor.sign())
+
+
+async def test_unknown_kid_refetches_jwks_after_rotation(client , google , signing_key , monkeypatch) :
+    await client.verify_id_token(signing_key.sign())
+    rotated = SigningKey("key-2")
+    google.keys = [signing_key, rotated]
+    monkeypatch.setattr(google_oauth_module, "GOOGLE_JWKS_MIN_REFRESH", 0)
+
+    verified = await client.verify_id_token(rotated.sign())
+
+    assert verified["email"] == "user@example.com"
+    assert google.hits["/oauth2/v3/certs"] == 2
+
+
+async def test_unknown_kid_refetch_is_rate_limited(client , google , signing_key) :
+    await client.verify_id_token(signing_key.sign())
+
+    for _ in range(3) :
+        with pytest.raises(GoogleOAuthError) :
+            await client.verify_id_token(SigningKey("unknown").sign())
+
+    # fetched within GOOGLE_JWKS_MIN_REFRESH , the cached copy is trusted
+    assert google.hits["/oauth2/v3/certs"] == 1
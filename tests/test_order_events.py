@@ -0,0 +1,122 @@
+"""
+Order events published through the memory transport , read back from the
+SSE stream a principal's /vendor/events/ request would get.
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.Utils import events as events_module
+from app.Utils.events import MemoryTransport, order_event, order_events, principal_keys, stream_order_events
+from app.Vendor.models import OrderStatusEnum, PlaceOrder
+
+pytestmark = pytest.mark.anyio
+
+
+class StubRequest :
+    """The part of starlette's Request the stream uses"""
+
+    def __init__(self) :
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool :
+        return self.disconnected
+
+
+@pytest.fixture
+async def broker(anyio_backend) :
+    assert isinstance(order_events.transport, MemoryTransport)
+    await order_events.start()
+    yield order_events
+    await order_events.stop()
+    assert order_events._subscribers == {}
+
+
+def placed(order_id : int , vendor_id : int , seller_id : int) -> PlaceOrder :
+    return PlaceOrder(id=order_id, vendor_id=vendor_id, seller_id=seller_id, order_status=OrderStatusEnum.PLACED)
+
+
+async def next_chunk(stream) -> str :
+    return await asyncio.wait_for(stream.__anext__(), 1)
+
+
+def parse(chunk : str) -> tuple :
+    event_line, data_line = chunk.strip().split("\n")
+    assert event_line.startswith("event: ") and data_line.startswith("data: ")
+    return event_line[len("event: "):], json.loads(data_line[len("data: "):])
+
+
+async def test_stream_delivers_only_the_sellers_events(broker) :
+    seller_1 = stream_order_events(StubRequest(), principal_keys(seller_id=1))
+    seller_2 = stream_order_events(StubRequest(), principal_keys(seller_id=2))
+    assert await next_chunk(seller_1) == "retry: 3000\n\n"
+    assert await next_chunk(seller_2) == "retry: 3000\n\n"
+
+    await broker.publish(order_event("order.placed", placed(10, vendor_id=7, seller_id=1)))
+    await broker.publish(order_event("order.placed", placed(11, vendor_id=7, seller_id=2)))
+
+    event_type, data = parse(await next_chunk(seller_1))
+    assert event_type == "order.placed"
+    assert data["order_id"] == 10 and data["seller_id"] == 1 and data["order_status"] == "placed"
+    assert "keys" not in data
+    assert parse(await next_chunk(seller_2))[1]["order_id"] == 11
+
+    await seller_1.aclose()
+    await seller_2.aclose()
+
+
+async def test_vendor_with_a_seller_account_gets_each_event_once(broker) :
+    stream = stream_order_events(StubRequest(), principal_keys(vendor_id=7, seller_id=1))
+    await next_chunk(stream)
+
+    # both of the stream's keys match , the vendor placed an order with its own shop
+    await broker.publish(order_event("order.placed", placed(10, vendor_id=7, seller_id=1)))
+    await broker.publish(order_event("order.cancelled", placed(12, vendor_id=7, seller_id=3)))
+
+    assert parse(await next_chunk(stream))[1]["order_id"] == 10
+    assert parse(await next_chunk(stream))[0] == "order.cancelled"
+    (subscription,) = broker._subscribers["vendor:7"]
+    assert subscription.queue.empty()
+    await stream.aclose()
+
+
+async def test_idle_stream_sends_heartbeats(broker , monkeypatch) :
+    monkeypatch.setattr(events_module, "ORDER_EVENTS_HEARTBEAT", 0.05)
+    stream = stream_order_events(StubRequest(), principal_keys(seller_id=1))
+    await next_chunk(stream)
+
+    assert await next_chunk(stream) == ": keepalive\n\n"
+    await stream.aclose()
+
+
+async def test_disconnect_unsubscribes(broker , monkeypatch) :
+    monkeypatch.setattr(events_module, "ORDER_EVENTS_HEARTBEAT", 0.05)
+    request = StubRequest()
+    stream = stream_order_events(request, principal_keys(vendor_id=7, seller_id=1))
+    await next_chunk(stream)
+    assert set(broker._subscribers) == {"vendor:7", "seller:1"}
+
+    request.disconnected = True
+    with pytest.raises(StopAsyncIteration) :
+        while True :
+            await next_chunk(stream)
+
+    assert broker._subscribers == {}
+    # nobody is listening , publishing still succeeds
+    await broker.publish(order_event("order.placed", placed(10, vendor_id=7, seller_id=1)))
+
+
+async def test_closed_stream_unsubscribes(broker) :
+    streams = [stream_order_events(StubRequest(), principal_keys(seller_id=1)) for _ in range(2)]
+    for stream in streams :
+        await next_chunk(stream)
+    assert len(broker._subscribers["seller:1"]) == 2
+
+    # the server closes the generator when the client drops mid wait
+    await streams[0].aclose()
+    assert len(broker._subscribers["seller:1"]) == 1
+
+    await broker.publish(order_event("order.placed", placed(10, vendor_id=7, seller_id=1)))
+    assert parse(await next_chunk(streams[1]))[1]["order_id"] == 10
+    await streams[1].aclose()
@@ -0,0 +1,84 @@
+"""
+Fixes the number of SQL statements one place_order sends.
+
+The count has to stay the same whatever the number of line items , an
+added per line query (N+1) fails this test.
+"""
+import pytest
+from sqlalchemy import event, func, select
+
+from app.Seller.models import Factory, FactoryTypeEnum, Product, QuantifiableTypeEnum, Seller
+from app.Seller.schema import CurrentUser
+from app.Utils.database import AsyncSessions, async_engine
+from app.Vendor.models import OrderedProductsDetail, PlaceOrder, Vendoruser
+from app.Vendor.schema import CreateOrderSchema, OrderedProductSchema
+from app.Vendor.service import VendorOrderService
+
+pytestmark = pytest.mark.anyio
+
+LINE_COUNTS = (1, 10, 100)
+
+
+async def seed(products : int) -> tuple :
+    async with AsyncSessions() as db :
+        vendor = Vendoruser(name="count", email="count@example.com", password="x", phone="0000000000")
+        db.add(vendor)
+        await db.flush()
+        seller = Seller(vendor_id=vendor.id, email="count-seller@example.com", phone="0000000000")
+        db.add(seller)
+        await db.flush()
+        factory = Factory(seller_id=seller.id, name="count", factory_type=FactoryTypeEnum.SHOP, contact_number="0000000000")
+        db.add(factory)
+        await db.flush()
+        db.add_all([
+            Product(
+                seller_id=seller.id, factory_id=factory.id, name=f"product {n}", price=1.0,
+                stock_quantity=1_000_000, qunatity_unit=QuantifiableTypeEnum.UNIT
+            )
+            for n in range(products)
+        ])
+        await db.flush()
+        product_ids = (await db.execute(select(Product.id).where(Product.factory_id == factory.id))).scalars().all()
+        await db.commit()
+        principal = CurrentUser(email=vendor.email, name="count", vendor_id=vendor.id)
+        return principal, seller.id, factory.id, list(product_ids)
+
+
+@pytest.fixture
+def statements() :
+    captured = []
+
+    def count(conn , cursor , statement , parameters , context , executemany) :
+        captured.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    yield captured
+    event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+
+async def test_place_order_statement_count_does_not_grow_with_lines(database , statements) :
+    principal, seller_id, factory_id, product_ids = await seed(max(LINE_COUNTS))
+
+    counts = {}
+    for lines in LINE_COUNTS :
+        order = CreateOrderSchema(
+            seller_id=seller_id,
+            factory_id=factory_id,
+            product_ammount=lines,
+            total_amount=lines + 10,
+            ordered_products=[
+                OrderedProductSchema(product=product_id, quantity=1, total_price=1)
+                for product_id in product_ids[:lines]
+            ]
+        )
+        async with AsyncSessions() as db :
+            statements.clear()
+            await VendorOrderService.place_order(order, db, principal)
+            counts[lines] = len(statements)
+
+    listing = "\n".join(" ".join(statement.split())[:120] for statement in statements)
+    assert len(set(counts.values())) == 1, f"statements per order {counts} , last order sent:\n{listing}"
+
+    async with AsyncSessions() as db :
+        assert await db.scalar(select(func.count()).select_from(PlaceOrder)) == len(LINE_COUNTS)
+        assert await db.scalar(select(func.count()).select_from(OrderedProductsDetail)) == sum(LINE_COUNTS)
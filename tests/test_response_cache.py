@@ -0,0 +1,253 @@
+"""
+app.Utils.response_cache on both backends.
+
+The Redis backend talks to a stand-in server started on the test's event
+loop , it speaks just enough of RESP2 (AUTH , SELECT , GET , SET EX) to
+check the protocol code , the pool and the best effort error handling.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.Seller import service as seller_service
+from app.Seller.catalog import bump_catalog
+from app.Seller.models import Factory, FactoryTypeEnum, Product, QuantifiableTypeEnum, Seller
+from app.Seller.service import SellerService
+from app.Seller.stock import reserve_stock
+from app.Utils.database import AsyncSessions
+from app.Utils.response_cache import MemoryBackend, RedisBackend, ResponseCache, SingleFlight
+from app.Vendor.models import Vendoruser
+
+pytestmark = pytest.mark.anyio
+
+
+class StandInRedis :
+    """Single process key value store answering RESP2 commands"""
+
+    def __init__(self, password : str = None) :
+        self.password = password
+        self.data = {}
+        self.commands = []
+        self.connections = 0
+        self.server = None
+        self.port = None
+
+    async def start(self) :
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) :
+        self.server.close()
+        await self.server.wait_closed()
+
+    def url(self, password : str = None , db : int = 2) -> str :
+        return f"redis://:{password or self.password}@127.0.0.1:{self.port}/{db}"
+
+    async def handle(self, reader , writer) :
+        self.connections += 1
+        authenticated = self.password is None
+        try :
+            while True :
+                command = await RedisBackend.read_reply(reader)
+                self.commands.append(command)
+                name = command[0].upper()
+                if name == b"AUTH" :
+                    authenticated = command[1].decode() == self.password
+                    writer.write(b"+OK\r\n" if authenticated else b"-WRONGPASS invalid password\r\n")
+                elif not authenticated :
+                    writer.write(b"-NOAUTH Authentication required\r\n")
+                elif name in (b"PING", b"SELECT") :
+                    writer.write(b"+OK\r\n")
+                elif name == b"GET" :
+                    entry = self.data.get(command[1])
+                    if entry is None or entry[0] < time.monotonic() :
+                        writer.write(b"$-1\r\n")
+                    else :
+                        writer.write(b"$%d\r\n%s\r\n" % (len(entry[1]), entry[1]))
+                elif name == b"SET" :
+                    ttl = int(command[4]) if len(command) > 4 else 10 ** 9
+                    self.data[command[1]] = (time.monotonic() + ttl, command[2])
+                    writer.write(b"+OK\r\n")
+                else :
+                    writer.write(b"-ERR unknown command\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError) :
+            pass
+        finally :
+            writer.close()
+
+
+@pytest.fixture
+async def redis_server(anyio_backend) :
+    server = StandInRedis(password="secret")
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def backend(request , anyio_backend) :
+    if request.param == "memory" :
+        yield MemoryBackend()
+        return
+    server = StandInRedis(password="secret")
+    await server.start()
+    backend = RedisBackend(server.url(), pool_size=4, timeout=1)
+    yield backend
+    await backend.aclose()
+    await server.stop()
+
+
+class CountingLoad :
+    def __init__(self, value : bytes = b'{"factory": 1}' , delay : float = 0.05) :
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> bytes :
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+async def test_round_trips_binary_values(backend) :
+    await backend.set("k1", b"\x00binary\r\nvalue", 60)
+
+    assert await backend.get("k1") == b"\x00binary\r\nvalue"
+    assert await backend.get("missing") is None
+
+
+async def test_concurrent_misses_render_once(backend) :
+    cache = ResponseCache(backend, ttl=60)
+    load = CountingLoad()
+
+    results = await asyncio.gather(*(cache.get_or_load("factory-detail:1:0:0", load) for _ in range(50)))
+
+    assert load.calls == 1
+    assert set(results) == {b'{"factory": 1}'}
+    await cache.get_or_load("factory-detail:1:0:0", load)
+    assert load.calls == 1
+    await cache.get_or_load("factory-detail:1:1:0", load)
+    assert load.calls == 2
+
+
+async def test_failed_load_is_not_cached(backend) :
+    cache = ResponseCache(backend, ttl=60)
+
+    async def failing() :
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError) :
+        await cache.get_or_load("factory-detail:2:0:0", failing)
+    assert await backend.get("factory-detail:2:0:0") is None
+    assert await cache.get_or_load("factory-detail:2:0:0", CountingLoad(b"ok")) == b"ok"
+
+
+async def test_cancelled_waiter_does_not_cancel_the_shared_load() :
+    flights = SingleFlight()
+    load = CountingLoad(delay=0.1)
+
+    first = asyncio.ensure_future(flights.do("key", load))
+    second = asyncio.ensure_future(flights.do("key", load))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == b'{"factory": 1}'
+    assert load.calls == 1
+
+
+async def test_memory_evicts_least_recently_used_past_its_byte_bound(anyio_backend) :
+    memory = MemoryBackend(max_bytes=100)
+    for n in range(5) :
+        await memory.set(f"page:{n}", b"x" * 30, 60)
+
+    assert memory.size <= 100
+    assert await memory.get("page:0") is None
+    assert await memory.get("page:4") is not None
+
+    await memory.set("huge", b"x" * 101, 60)
+    assert await memory.get("huge") is None
+
+
+async def test_redis_authenticates_selects_and_reuses_connections(redis_server) :
+    redis = RedisBackend(redis_server.url(db=2), pool_size=2, timeout=1)
+
+    await asyncio.gather(*(redis.set(f"k{n}", b"v", 60) for n in range(20)))
+    assert await redis.get("k19") == b"v"
+
+    assert redis_server.connections <= 2
+    assert [b"AUTH", b"secret"] in redis_server.commands
+    assert [b"SELECT", b"2"] in redis_server.commands
+    assert [b"SET", b"k0", b"v", b"EX", b"60"] in redis_server.commands
+    await redis.aclose()
+
+
+async def test_redis_errors_read_as_misses(redis_server) :
+    wrong_password = RedisBackend(redis_server.url(password="wrong"), timeout=1)
+    await wrong_password.set("k1", b"v", 60)
+    assert await wrong_password.get("k1") is None
+    await wrong_password.aclose()
+
+    redis = RedisBackend(redis_server.url(), timeout=1)
+    await redis.set("k1", b"v", 60)
+    await redis_server.stop()
+    await redis.aclose()
+
+    started = time.perf_counter()
+    assert await redis.get("k1") is None
+    assert time.perf_counter() - started < 2
+
+
+async def seed_factory() -> tuple :
+    async with AsyncSessions() as db :
+        vendor = Vendoruser(name="cache", email="cache@example.com", password="x", phone="0000000000")
+        db.add(vendor)
+        await db.flush()
+        seller = Seller(vendor_id=vendor.id, email="cache-seller@example.com", phone="0000000000")
+        db.add(seller)
+        await db.flush()
+        factory = Factory(seller_id=seller.id, name="cache", factory_type=FactoryTypeEnum.SHOP, contact_number="0000000000")
+        db.add(factory)
+        await db.flush()
+        product = Product(
+            seller_id=seller.id, factory_id=factory.id, name="product", price=1.0,
+            stock_quantity=100, qunatity_unit=QuantifiableTypeEnum.UNIT
+        )
+        db.add(product)
+        await db.commit()
+        return factory.id, product.id
+
+
+async def test_factory_detail_is_rendered_again_only_after_a_version_bump(database , backend , monkeypatch) :
+    factory_id, product_id = await seed_factory()
+    monkeypatch.setattr(seller_service, "response_cache", ResponseCache(backend, ttl=60))
+    renders = []
+
+    async def render(factory_id : int) -> bytes :
+        renders.append(factory_id)
+        await asyncio.sleep(0.05)
+        return b'{"render": %d}' % len(renders)
+
+    monkeypatch.setattr(SellerService, "render_factory_details", staticmethod(render))
+
+    async def detail() -> bytes :
+        async with AsyncSessions() as db :
+            return (await SellerService.get_seller_factory_details(db, factory_id)).body
+
+    bodies = await asyncio.gather(*(detail() for _ in range(20)))
+    assert set(bodies) == {b'{"render": 1}'}
+    assert await detail() == b'{"render": 1}'
+
+    async with AsyncSessions() as db :
+        await bump_catalog(db, factory_ids=[factory_id])
+        await db.commit()
+    assert await detail() == b'{"render": 2}'
+    assert await detail() == b'{"render": 2}'
+
+    # stock changes move the key without touching the factory's catalog version
+    async with AsyncSessions() as db :
+        await reserve_stock(db, {product_id: 1})
+        await db.commit()
+    assert await detail() == b'{"render": 3}'
+    assert len(renders) == 3